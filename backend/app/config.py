@@ -1,5 +1,9 @@
+from pathlib import Path
+
 from pydantic_settings import BaseSettings
 
+_BACKEND_DIR = Path(__file__).resolve().parents[1]
+
 
 class Settings(BaseSettings):
     openai_api_key: str = ""
@@ -13,9 +17,99 @@ class Settings(BaseSettings):
     supabase_url: str = ""
     supabase_anon_key: str = ""
     supabase_service_role_key: str = ""
+    supabase_pool_size: int = 20  # max concurrent HTTP connections per worker
+    supabase_keepalive_expiry: float = 30.0
+    supabase_timeout: float = 10.0
+
+    # Auth — local JWT verification (falls back to Supabase Auth when unset)
+    supabase_jwt_secret: str = ""  # HS256 project secret
+    supabase_jwks_url: str = ""  # defaults to <supabase_url>/auth/v1/.well-known/jwks.json
+    auth_cache_size: int = 10_000
+    auth_cache_ttl: int = 300  # seconds; never longer than the token's exp
+
+    # Import the TradingAgents engine in the background right after startup
+    # (otherwise the first job pays for it)
+    preload_engine: bool = True
+
+    # Job queue
+    analysis_workers: int = 2  # concurrent graph runs per API process
+    job_queue_backend: str = "supabase"  # "supabase" (analysis_jobs) | "sqlite"
+    job_queue_path: str = "data/job_queue.db"
+    job_queue_poll_interval: float = 5.0  # seconds between idle polls
+    job_queue_window: int = 50  # oldest pending jobs considered per claim
+    # "thread": graph runs share the API process; "process": a pool of
+    # analysis_workers worker processes, each replaced after process_max_jobs runs
+    analysis_executor: str = "thread"
+    process_max_jobs: int = 20
+
+    # Plan-aware scheduling: weighted-fair share of worker slots by profiles.plan
+    plan_weights: dict[str, float] = {"free": 1.0, "pro": 3.0, "pro_max": 6.0}
+    plan_max_share: dict[str, float] = {"free": 0.5, "pro": 1.0, "pro_max": 1.0}  # of analysis_workers
+    user_max_running: dict[str, int] = {"free": 1, "pro": 2, "pro_max": 3}
+    user_max_active: dict[str, int] = {"free": 2, "pro": 5, "pro_max": 10}  # queued + running, else 429
+
+    # Warm TradingAgentsGraph pool (idle instances kept across all configs)
+    graph_pool_size: int = 8
+
+    # Analyst phase: "parallel" fans selected analysts out concurrently,
+    # "sequential" runs them one after another inside the full graph
+    analyst_execution: str = "parallel"
+    analyst_concurrency: int = 4
+    batch_max_concurrency: int = 4  # children of one batch running at once
+    backtest_max_dates: int = 60
+
+    # Result cache for identical analysis requests
+    result_cache_size: int = 256
+    result_cache_ttl: int = 900  # seconds
+
+    # Live progress stream (SSE)
+    progress_stream_history: int = 1000  # events kept per job for resume
+    progress_stream_keepalive: float = 15.0  # seconds
+    progress_stream_poll: float = 2.0  # seconds between checks of a job not running here
+
+    # Live job state shared across workers: "memory" (single process) | "redis"
+    live_state_backend: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    live_state_ttl: int = 86_400  # seconds a running job's state may live
+
+    # Profile / credit history read cache, dropped on every profile edit and
+    # credit charge or refund: "memory" (per process) | "redis" (shared, redis_url)
+    profile_cache_backend: str = "memory"
+    profile_cache_ttl: float = 60.0  # seconds; bounds staleness from writes made elsewhere
+    profile_cache_size: int = 10_000  # users per process (memory backend)
+
+    # Write-behind persistence of running jobs' progress
+    progress_flush_interval: float = 5.0  # seconds
+    progress_max_dirty: int = 256  # dirty jobs buffered before forcing a flush
+
+    # Checkpoint / resume of graph runs
+    checkpoint_path: str = "data/checkpoints.db"
+    checkpoint_retention: float = 7 * 86_400  # failed / cancelled jobs stay resumable this long
+    checkpoint_prune_interval: float = 3600.0
+    job_max_attempts: int = 2  # in-process retries, each resuming from the checkpoint
+    orphan_timeout: float = 900.0  # running jobs silent this long are requeued
+    orphan_sweep_interval: float = 60.0  # seconds between sweeps for them (and once at startup)
+
+    # Shared market data cache (vendor tool results, per host)
+    market_cache_enabled: bool = True
+    market_cache_path: str = "data/market_cache.db"
+    market_cache_max_mb: int = 512
+
+    # Cancellation / watchdog
+    job_timeout: float = 1800.0      # max wall time of one run
+    step_timeout: float = 600.0      # max time without any progress
+    cancel_grace: float = 30.0       # wait this long for a run to stop before abandoning it
+    job_watchdog_interval: float = 10.0
 
     class Config:
         env_file = ".env"
 
 
 settings = Settings()
+
+
+def data_path(path: str) -> str:
+    """A configured local file path; relative ones are taken from the backend
+    directory, not the working directory of whoever started the process."""
+    p = Path(path)
+    return str(p if p.is_absolute() else _BACKEND_DIR / p)
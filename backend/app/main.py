@@ -1,27 +1,99 @@
 from dotenv import load_dotenv
 
-# Load env vars before any tradingagents imports (they read env at import time)
+# Load env vars before any tradingagents imports (they read env at import time;
+# the engine itself is imported lazily by app.services.engine)
 load_dotenv()
 
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.routes.analysis import router as analysis_router
 from app.routes.profile import router as profile_router
+from app.config import settings
+from app.middleware.auth import auth_cache_stats
+from app.services import metrics
+from app.services.analysis_service import analysis_service
+from app.services.engine import engine_loaded, load_engine
+from app.services.job_queue import job_scheduler
+from app.services.process_pool import process_pool
+from app.services.profile_cache import profile_cache
+from app.services.progress_persister import progress_persister
+from app.services.supabase_client import close_http
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if process_pool is not None:
+        # Workers import the engine while the API finishes starting
+        process_pool.start()
+    elif settings.preload_engine:
+        # Warm in a thread so the worker is ready to serve immediately
+        asyncio.get_running_loop().run_in_executor(None, load_engine)
+    await progress_persister.start()
+    await job_scheduler.start(analysis_service.run_analysis)
+    # Runs orphaned by a crashed worker continue from their checkpoints
+    await analysis_service.recover_orphans()
+    await analysis_service.start_watchdog()
+    yield
+    await analysis_service.stop_watchdog()
+    await job_scheduler.stop()
+    if process_pool is not None:
+        await process_pool.stop()
+    await progress_persister.stop()
+    await close_http()
 
-app = FastAPI(title="TradingAgents API", version="0.1.0")
+
+app = FastAPI(title="TradingAgents API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so /api/analysis/{job_id} is one series
+    route = request.scope.get("route")
+    metrics.http_latency.observe(
+        time.perf_counter() - t0, request.method,
+        getattr(route, "path", "unmatched"), str(response.status_code),
+    )
+    return response
+
+
 app.include_router(analysis_router)
 app.include_router(profile_router)
 
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "engine_loaded": engine_loaded()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body = metrics.render({
+        "jobs": analysis_service.job_stats(),
+        "queue": await job_scheduler.stats(),
+        "auth_cache": auth_cache_stats(),
+        "result_cache": analysis_service.result_cache_stats(),
+        "storage": analysis_service.storage_stats(),
+        "graph_pool": analysis_service.graph_pool_stats(),
+        "process_pool": analysis_service.process_pool_stats() or {},
+        "market_data": analysis_service.market_data_stats() or {},
+        "signal": analysis_service.signal_stats(),
+        "progress_persister": progress_persister.stats(),
+        "profile_cache": profile_cache.stats(),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
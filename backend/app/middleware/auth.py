@@ -1,9 +1,95 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import time
+
+import jwt
 from fastapi import Depends, HTTPException, Header
 
 from app.config import settings
-from app.services.supabase_client import get_supabase
+from app.services.cache import TTLCache
+from app.services.supabase_client import get_auth_user
+
+# Verified token → user id. Keyed by sha256(token) so raw tokens never sit in memory.
+_token_cache: TTLCache[str] = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl)
+
+# Counters for how cache misses were resolved
+_verify_counts = {"local": 0, "remote": 0}
+
+_ASYMMETRIC_ALGS = {"RS256", "ES256"}
+
+_jwks_client: jwt.PyJWKClient | None = None
+
+
+def _get_jwks_client() -> jwt.PyJWKClient:
+    global _jwks_client
+    if _jwks_client is None:
+        url = settings.supabase_jwks_url or (
+            f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        )
+        _jwks_client = jwt.PyJWKClient(url, cache_keys=True)
+    return _jwks_client
+
+
+def _cache_ttl(exp: float | None) -> float:
+    """Never cache a token beyond its own expiry."""
+    if exp is None:
+        return settings.auth_cache_ttl
+    return min(settings.auth_cache_ttl, exp - time.time())
+
+
+def _verify_hs256(token: str) -> dict:
+    return jwt.decode(
+        token,
+        settings.supabase_jwt_secret,
+        algorithms=["HS256"],
+        audience="authenticated",
+        options={"require": ["exp", "sub"]},
+    )
+
+
+def _verify_asymmetric(token: str, alg: str) -> dict:
+    # Signing keys are cached by PyJWKClient; only the first lookup hits the network.
+    key = _get_jwks_client().get_signing_key_from_jwt(token).key
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[alg],
+        audience="authenticated",
+        options={"require": ["exp", "sub"]},
+    )
+
+
+async def _verify_locally(token: str) -> dict | None:
+    """Check signature and expiry without calling Supabase Auth.
+
+    Returns the verified claims, or None when local verification is not
+    possible for this token (no secret configured, JWKS unreachable) and the
+    caller should fall back to the remote check. Raises jwt.InvalidTokenError
+    for tokens that are definitely invalid.
+    """
+    alg = jwt.get_unverified_header(token).get("alg")
+    if alg == "HS256":
+        if not settings.supabase_jwt_secret:
+            return None
+        return _verify_hs256(token)
+    if alg in _ASYMMETRIC_ALGS:
+        if not (settings.supabase_jwks_url or settings.supabase_url):
+            return None
+        try:
+            return await asyncio.to_thread(_verify_asymmetric, token, alg)
+        except jwt.PyJWKClientError:
+            return None
+    raise jwt.InvalidAlgorithmError(f"Unsupported algorithm: {alg}")
+
+
+async def _verify_remotely(token: str) -> str:
+    """Fallback: ask Supabase Auth over the pooled async client."""
+    user = await get_auth_user(token)
+    if not user or not user.get("id"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return str(user["id"])
 
 
 async def get_current_user_id(
@@ -19,18 +105,33 @@ async def get_current_user_id(
         raise HTTPException(status_code=401, detail="Invalid Authorization header")
 
     token = parts[1]
-    sb = get_supabase()
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        resp = sb.auth.get_user(token)
-        if resp is None or resp.user is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return str(resp.user.id)
+        claims = await _verify_locally(token)
+        if claims is not None:
+            _verify_counts["local"] += 1
+            user_id = str(claims["sub"])
+            exp = float(claims["exp"])
+        else:
+            _verify_counts["remote"] += 1
+            user_id = await _verify_remotely(token)
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
     except HTTPException:
         raise
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
     except Exception:
         raise HTTPException(status_code=401, detail="Token verification failed")
 
+    _token_cache.set(cache_key, user_id, ttl=_cache_ttl(exp))
+    return user_id
+
 
 async def optional_user_id(
     authorization: str | None = Header(default=None),
@@ -45,3 +146,9 @@ async def optional_user_id(
         return await get_current_user_id(authorization)
     except HTTPException:
         return None
+
+
+def auth_cache_stats() -> dict:
+    """Token cache hit/miss counters plus how misses were verified."""
+    return {**_token_cache.stats(), "verified_local": _verify_counts["local"],
+            "verified_remote": _verify_counts["remote"]}
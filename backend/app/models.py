@@ -4,7 +4,7 @@ import enum
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AnalystType(str, enum.Enum):
@@ -24,6 +24,7 @@ class JobStatus(str, enum.Enum):
     running = "running"
     completed = "completed"
     failed = "failed"
+    cancelled = "cancelled"
 
 
 class StepStatus(str, enum.Enum):
@@ -32,11 +33,25 @@ class StepStatus(str, enum.Enum):
     done = "done"
 
 
+class StepMetrics(BaseModel):
+    wall_seconds: float = 0.0  # time spent inside this step's graph nodes
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0  # estimated from list prices
+    tool_calls: int = 0
+    tool_seconds: float = 0.0
+    retries: int = 0
+    errors: int = 0
+    build_seconds: float = 0.0  # constructing this step's own graph; not in wall_seconds
+
+
 class ProgressStep(BaseModel):
     key: str
     label: str
     status: StepStatus = StepStatus.pending
     content: Optional[str] = None  # 該步驟產出的內容（報告、辯論等）
+    metrics: Optional[StepMetrics] = None
 
 
 # ── Request ──────────────────────────────────────────────────────────────────
@@ -53,6 +68,41 @@ class AnalysisRequest(BaseModel):
     max_debate_rounds: int = 1
     max_risk_discuss_rounds: int = 1
     llm_provider: LLMProvider = LLMProvider.openai
+    use_cache: bool = True  # False → always run fresh, never reuse/attach
+
+
+class BatchAnalysisRequest(BaseModel):
+    tickers: list[str] = Field(min_length=1, max_length=50)
+    date: str  # YYYY-MM-DD, shared by every ticker
+    analysts: list[AnalystType] = [
+        AnalystType.market,
+        AnalystType.social,
+        AnalystType.news,
+        AnalystType.fundamentals,
+    ]
+    max_debate_rounds: int = 1
+    max_risk_discuss_rounds: int = 1
+    llm_provider: LLMProvider = LLMProvider.openai
+    use_cache: bool = True
+    concurrency: int = Field(default=4, ge=1)  # children running at once
+
+
+class BacktestRequest(BaseModel):
+    ticker: str
+    start_date: str  # YYYY-MM-DD
+    end_date: str    # YYYY-MM-DD, inclusive
+    step_days: int = Field(default=1, ge=1)     # analyze every Nth trading day
+    horizon_days: int = Field(default=5, ge=1)  # trading days each signal is held
+    analysts: list[AnalystType] = [
+        AnalystType.market,
+        AnalystType.social,
+        AnalystType.news,
+        AnalystType.fundamentals,
+    ]
+    max_debate_rounds: int = 1
+    max_risk_discuss_rounds: int = 1
+    llm_provider: LLMProvider = LLMProvider.openai
+    concurrency: int = Field(default=4, ge=1)
 
 
 # ── Nested result models ─────────────────────────────────────────────────────
@@ -102,6 +152,30 @@ class AnalysisJob(BaseModel):
     result: Optional[AnalysisResult] = None
     error: Optional[str] = None
     progress: Optional[list[ProgressStep]] = None
+    batch_id: Optional[str] = None  # parent batch, if any
+
+
+# ── Incremental job view (GET /api/analysis/{id}?since=N) ────────────────────
+
+class StepDelta(BaseModel):
+    key: str
+    status: StepStatus
+    version: int = 0
+    offset: Optional[int] = None  # `append` continues the content at this length
+    append: Optional[str] = None
+    content: Optional[str] = None  # full content (rewritten, or on reset)
+    metrics: Optional[StepMetrics] = None
+
+
+class AnalysisJobDelta(BaseModel):
+    id: str
+    status: JobStatus
+    version: int  # pass back as ?since= on the next poll
+    reset: bool = False  # steps carry full state; replace the local copy
+    steps: list[StepDelta] = []
+    completed_at: Optional[datetime] = None
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
 
 
 # ── Response summaries ───────────────────────────────────────────────────────
@@ -117,3 +191,61 @@ class JobSummary(BaseModel):
     created_at: datetime
     completed_at: Optional[datetime] = None
     error: Optional[str] = None
+
+
+# ── Batch view (GET /api/analysis/batch/{id}) ────────────────────────────────
+
+class BatchItem(BaseModel):
+    ticker: str
+    job_id: Optional[str] = None  # None: not created (ran out of credits)
+    status: Optional[JobStatus] = None
+    signal: Optional[str] = None
+    error: Optional[str] = None
+    completed_at: Optional[datetime] = None
+
+
+class BatchJob(BaseModel):
+    id: str
+    date: str
+    status: JobStatus  # running until every child has finished
+    total: int
+    counts: dict[str, int]  # children per status
+    items: list[BatchItem]  # one row per ticker: the signal table
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+# ── Backtest view (GET /api/analysis/backtest/{id}) ──────────────────────────
+
+class BacktestItem(BaseModel):
+    date: str
+    job_id: Optional[str] = None
+    status: Optional[JobStatus] = None
+    signal: Optional[str] = None
+    forward_return: Optional[float] = None  # close-to-close over the horizon
+
+
+class BacktestMetrics(BaseModel):
+    evaluated: int          # dates with a signal and a realized forward return
+    trades: int             # of those, BUY or SELL
+    hit_rate: Optional[float] = None  # trades whose direction was right
+    avg_trade_return: Optional[float] = None
+    cumulative_return: float = 0.0    # sum of per-signal returns (long/short/flat)
+    max_drawdown: float = 0.0         # on the cumulative return curve
+    buy_and_hold_return: Optional[float] = None
+    dates_per_minute: Optional[float] = None
+
+
+class BacktestJob(BaseModel):
+    id: str
+    ticker: str
+    start_date: str
+    end_date: str
+    horizon_days: int
+    status: JobStatus
+    total: int
+    counts: dict[str, int]
+    items: list[BacktestItem]
+    metrics: Optional[BacktestMetrics] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
@@ -1,34 +1,224 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.models import AnalysisRequest, AnalysisJob, JobSummary
+from app.models import (
+    AnalysisRequest,
+    AnalysisJob,
+    AnalysisJobDelta,
+    BacktestJob,
+    BacktestRequest,
+    BatchAnalysisRequest,
+    BatchJob,
+    JobStatus,
+    JobSummary,
+)
 from app.services.analysis_service import analysis_service
+from app.services.job_queue import TooManyJobsError, job_scheduler
+from app.services.repository import (
+    InsufficientCreditsError,
+    JobNotCancellableError,
+    JobNotResumableError,
+)
 from app.middleware.auth import get_current_user_id
 
 router = APIRouter(prefix="/api/analysis", tags=["analysis"])
 
 
+def _too_many_jobs(e: TooManyJobsError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many queued or running analyses for your plan",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _etag_value(header: str | None) -> str | None:
+    """Opaque part of an If-None-Match header (weak prefix and quotes removed)."""
+    if not header:
+        return None
+    value = header.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    return value.strip('"')
+
+
 @router.post("", status_code=202, response_model=AnalysisJob)
 async def start_analysis(
     req: AnalysisRequest,
-    bg: BackgroundTasks,
     user_id: str = Depends(get_current_user_id),
 ):
-    job = analysis_service.create_job(req, user_id=user_id)
-    bg.add_task(analysis_service.run_analysis, job.id)
+    try:
+        await job_scheduler.admit(user_id)
+        job = await analysis_service.create_job(req, user_id=user_id)
+    except TooManyJobsError as e:
+        raise _too_many_jobs(e)
+    except InsufficientCreditsError:
+        raise HTTPException(status_code=402, detail="Insufficient credits")
+    if job.status == JobStatus.pending:
+        await job_scheduler.submit(job.id, user_id)
     return job
 
 
 @router.get("", response_model=list[JobSummary])
-async def list_analyses(user_id: str = Depends(get_current_user_id)):
-    return analysis_service.list_jobs(user_id=user_id)
+async def list_analyses(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    ticker: str | None = None,
+    status: JobStatus | None = None,
+    signal: str | None = None,
+    date_from: str | None = Query(default=None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    date_to: str | None = Query(default=None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Job history, newest first; pass the X-Next-Cursor header back as `cursor` for more."""
+    try:
+        jobs, next_cursor = await analysis_service.list_jobs(
+            user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            ticker=ticker.strip().upper() if ticker else None,
+            status=status.value if status else None,
+            signal=signal.strip().upper() if signal else None,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return jobs
+
+
+@router.get("/queue")
+async def queue_stats(user_id: str = Depends(get_current_user_id)):
+    """Queue depth, busy worker slots and observed queue wait times."""
+    return await job_scheduler.stats()
+
+
+@router.post("/batch", status_code=202, response_model=BatchJob)
+async def start_batch(
+    req: BatchAnalysisRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Analyze a watchlist for one date; each ticker is a child job (1 credit each)."""
+    try:
+        await job_scheduler.admit(user_id)
+        return await analysis_service.create_batch(req, user_id=user_id)
+    except TooManyJobsError as e:
+        raise _too_many_jobs(e)
+    except InsufficientCreditsError:
+        raise HTTPException(status_code=402, detail="Insufficient credits")
+
+
+@router.get("/batch/{batch_id}", response_model=BatchJob)
+async def get_batch(
+    batch_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    batch = await analysis_service.get_batch(batch_id, user_id=user_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
+@router.post("/backtest", status_code=202, response_model=BacktestJob)
+async def start_backtest(
+    req: BacktestRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Run one ticker over a date range and score the signals (1 credit per date)."""
+    try:
+        await job_scheduler.admit(user_id)
+        return await analysis_service.create_backtest(req, user_id=user_id)
+    except TooManyJobsError as e:
+        raise _too_many_jobs(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except InsufficientCreditsError:
+        raise HTTPException(status_code=402, detail="Insufficient credits")
+
+
+@router.get("/backtest/{batch_id}", response_model=BacktestJob)
+async def get_backtest(
+    batch_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    report = await analysis_service.get_backtest(batch_id, user_id=user_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Backtest not found")
+    return report
 
 
-@router.get("/{job_id}", response_model=AnalysisJob)
+@router.get("/{job_id}", response_model=AnalysisJob | AnalysisJobDelta)
 async def get_analysis(
+    job_id: str,
+    since: int | None = Query(default=None, ge=0,
+                              description="Only return changes after this version"),
+    if_none_match: str | None = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+):
+    found = await analysis_service.get_job_versioned(
+        job_id, user_id, since=since,
+        if_none_match=_etag_value(if_none_match),
+    )
+    if found is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    revision, body = found
+    headers = {"ETag": f'"{revision}"', "Cache-Control": "no-cache"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body.model_dump(mode="json"), headers=headers)
+
+
+@router.post("/{job_id}/cancel", status_code=202, response_model=AnalysisJob)
+async def cancel_analysis(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Stop a pending or running job; unused credit is refunded."""
+    try:
+        job = await analysis_service.cancel_job(job_id, user_id=user_id)
+    except JobNotCancellableError:
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/resume", status_code=202, response_model=AnalysisJob)
+async def resume_analysis(
     job_id: str,
     user_id: str = Depends(get_current_user_id),
 ):
-    job = analysis_service.get_job(job_id, user_id=user_id)
+    """Retry a failed or cancelled job from its last checkpoint (charges 1 credit again)."""
+    try:
+        await job_scheduler.admit(user_id)
+        job = await analysis_service.resume_job(job_id, user_id=user_id)
+    except TooManyJobsError as e:
+        raise _too_many_jobs(e)
+    except InsufficientCreditsError:
+        raise HTTPException(status_code=402, detail="Insufficient credits")
+    except JobNotResumableError:
+        raise HTTPException(status_code=409, detail="Only failed or cancelled jobs can be resumed")
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    await job_scheduler.submit(job.id, user_id, job.batch_id)
     return job
+
+
+@router.get("/{job_id}/events")
+async def stream_analysis(
+    job_id: str,
+    last_event_id: int | None = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Live progress as Server-Sent Events (resumable via Last-Event-ID)."""
+    events = await analysis_service.open_stream(job_id, user_id, last_event_id)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 
-from app.services.supabase_client import get_supabase
+from app.services.profile_cache import profile_cache
+from app.services.repository import profile_repo
 from app.middleware.auth import get_current_user_id
 
 router = APIRouter(prefix="/api/profile", tags=["profile"])
 
 
+def _cached_response(etag: str, body, if_none_match: str | None) -> Response:
+    """200 with an ETag, or 304 when the client already holds this version."""
+    # Private: the body is per user; no-cache: revalidate on every use
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
 class ProfileResponse(BaseModel):
     id: str
     display_name: str
@@ -26,12 +39,16 @@ class ProfileUpdate(BaseModel):
 
 
 @router.get("", response_model=ProfileResponse)
-async def get_profile(user_id: str = Depends(get_current_user_id)):
-    sb = get_supabase()
-    resp = sb.table("profiles").select("*").eq("id", user_id).single().execute()
-    if not resp.data:
+async def get_profile(
+    if_none_match: str | None = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+):
+    found = await profile_cache.profile(user_id)
+    if not found:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return resp.data
+    etag, profile = found
+    body = ProfileResponse.model_validate(profile).model_dump(mode="json")
+    return _cached_response(etag, body, if_none_match)
 
 
 @router.patch("", response_model=ProfileResponse)
@@ -43,11 +60,11 @@ async def update_profile(
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    sb = get_supabase()
-    resp = sb.table("profiles").update(updates).eq("id", user_id).execute()
-    if not resp.data:
+    profile = await profile_repo.update(user_id, updates)
+    await profile_cache.invalidate(user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return resp.data[0]
+    return profile
 
 
 class CreditTransaction(BaseModel):
@@ -60,14 +77,10 @@ class CreditTransaction(BaseModel):
 
 
 @router.get("/credits", response_model=list[CreditTransaction])
-async def get_credit_history(user_id: str = Depends(get_current_user_id)):
-    sb = get_supabase()
-    resp = (
-        sb.table("credit_transactions")
-        .select("*")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .limit(50)
-        .execute()
-    )
-    return resp.data
+async def get_credit_history(
+    if_none_match: str | None = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+):
+    etag, rows = await profile_cache.credits(user_id)
+    body = [CreditTransaction.model_validate(r).model_dump(mode="json") for r in rows]
+    return _cached_response(etag, body, if_none_match)
@@ -1,27 +1,77 @@
 from __future__ import annotations
 
 import uuid
+import json
 import asyncio
+import time
+import hashlib
+import logging
+import threading
 import traceback
-from datetime import datetime
-from typing import Dict
-
-from tradingagents.graph.trading_graph import TradingAgentsGraph
-from tradingagents.default_config import DEFAULT_CONFIG
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date as date_type, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator
 
 from app.models import (
+    AnalystType,
     AnalysisJob,
+    AnalysisJobDelta,
     AnalysisRequest,
     AnalysisResult,
+    BacktestItem,
+    BacktestJob,
+    BacktestMetrics,
+    BacktestRequest,
+    BatchAnalysisRequest,
+    BatchItem,
+    BatchJob,
     InvestDebateResult,
     RiskDebateResult,
     LLMProvider,
     JobStatus,
     JobSummary,
     ProgressStep,
+    StepDelta,
     StepStatus,
 )
-from app.services.supabase_client import get_supabase
+from app.config import settings
+from app.services import backtest
+from app.services.cache import TTLCache
+from app.services.engine import (
+    checkpoint_threads,
+    delete_checkpoints,
+    get_checkpointer,
+    load_engine,
+)
+from app.services.graph_pool import GraphPool
+from app.services.job_queue import job_scheduler
+from app.services.live_state import live_state
+from app.services.market_cache import get_market_cache
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.process_pool import process_pool
+from app.services.profile_cache import profile_cache
+from app.services.progress_persister import progress_persister
+from app.services.progress_store import ProgressStore
+from app.services.progress_stream import ProgressEvent, progress_broker
+from app.services.signal import signal_extractor
+from app.services.storage_codec import is_packed, storage_codec
+from app.services.repository import (
+    InsufficientCreditsError,
+    JobNotCancellableError,
+    batch_repo,
+    job_repo,
+    ledger_repo,
+    profile_repo,
+)
+
+if TYPE_CHECKING:
+    from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+    from app.services.tracing import JobTracer
+
+logger = logging.getLogger(__name__)
 
 
 # ── Progress step definitions ────────────────────────────────────────────────
@@ -61,36 +111,37 @@ def _build_progress(analysts: list) -> list[ProgressStep]:
     return steps
 
 
-def _update_step(job: AnalysisJob, key: str, status: StepStatus,
-                 content: str | None = None) -> None:
-    """Thread-safe step update via atomic list replacement."""
-    if job.progress is None:
-        return
-    new_progress = [s.model_copy() for s in job.progress]
-    for s in new_progress:
-        if s.key == key:
-            s.status = status
-            if content is not None:
-                s.content = content
-            break
-    job.progress = new_progress
+def _restore_progress(saved: list[ProgressStep] | None) -> list[ProgressStep] | None:
+    """Progress of an interrupted run to continue from (None if nothing finished).
+
+    Finished steps are kept; anything that was mid-flight goes back to pending.
+    """
+    if not saved or not any(s.status == StepStatus.done for s in saved):
+        return None
+    return [
+        s if s.status == StepStatus.done
+        else s.model_copy(update={"status": StepStatus.pending})
+        for s in saved
+    ]
 
 
-def _mark_next_running(job: AnalysisJob, after_key: str) -> None:
+def _completed_keys(progress: ProgressStore) -> set:
+    return {k for k in progress.keys() if progress.status_of(k) == StepStatus.done}
+
+
+def _mark_next_running(progress: ProgressStore, after_key: str) -> None:
     """Mark the first pending step after `after_key` as running."""
-    if job.progress is None:
-        return
     found = False
-    for s in job.progress:
-        if s.key == after_key:
+    for key in progress.keys():
+        if key == after_key:
             found = True
             continue
-        if found and s.status == StepStatus.pending:
-            _update_step(job, s.key, StepStatus.running)
+        if found and progress.status_of(key) == StepStatus.pending:
+            progress.update(key, StepStatus.running)
             break
 
 
-def _detect_and_apply(job: AnalysisJob, prev: dict, curr: dict,
+def _detect_and_apply(progress: ProgressStore, prev: dict, curr: dict,
                       completed_keys: set) -> None:
     """Diff two state snapshots and update job progress accordingly."""
 
@@ -100,8 +151,8 @@ def _detect_and_apply(job: AnalysisJob, prev: dict, curr: dict,
     # Analyst reports
     for step_key, field in _STEP_CONTENT_FIELD.items():
         if step_key not in completed_keys and _new(field):
-            _update_step(job, step_key, StepStatus.done, curr.get(field, ""))
-            _mark_next_running(job, step_key)
+            progress.update(step_key, StepStatus.done, curr.get(field, ""))
+            _mark_next_running(progress, step_key)
             completed_keys.add(step_key)
 
     # Investment debate
@@ -111,36 +162,33 @@ def _detect_and_apply(job: AnalysisJob, prev: dict, curr: dict,
     if "invest_debate" not in completed_keys:
         if curr_inv.get("count", 0) > prev_inv.get("count", 0):
             history = curr_inv.get("history", "")
-            _update_step(job, "invest_debate", StepStatus.running, history)
+            progress.update("invest_debate", StepStatus.running, history)
             completed_keys.discard("invest_debate")  # keep running
 
     if "research_manager" not in completed_keys:
         if curr_inv.get("judge_decision") and not prev_inv.get("judge_decision"):
             # Mark debate done with final history
-            _update_step(job, "invest_debate", StepStatus.done,
+            progress.update("invest_debate", StepStatus.done,
                          curr_inv.get("history", ""))
             completed_keys.add("invest_debate")
             # Mark research manager done
-            _update_step(job, "research_manager", StepStatus.done,
+            progress.update("research_manager", StepStatus.done,
                          curr_inv.get("judge_decision", ""))
-            _mark_next_running(job, "research_manager")
+            _mark_next_running(progress, "research_manager")
             completed_keys.add("research_manager")
 
     # Investment plan (part of research_manager output)
     if _new("investment_plan") and "research_manager" in completed_keys:
         # Update research_manager content to include investment plan
-        for s in (job.progress or []):
-            if s.key == "research_manager":
-                plan = curr.get("investment_plan", "")
-                combined = (s.content or "") + "\n\n---\n\n**投資計畫：**\n" + plan
-                _update_step(job, "research_manager", StepStatus.done, combined)
-                break
+        plan = curr.get("investment_plan", "")
+        combined = (progress.content_of("research_manager") or "") + "\n\n---\n\n**投資計畫：**\n" + plan
+        progress.update("research_manager", StepStatus.done, combined)
 
     # Trader
     if "trader" not in completed_keys and _new("trader_investment_plan"):
-        _update_step(job, "trader", StepStatus.done,
+        progress.update("trader", StepStatus.done,
                      curr.get("trader_investment_plan", ""))
-        _mark_next_running(job, "trader")
+        _mark_next_running(progress, "trader")
         completed_keys.add("trader")
 
     # Risk debate
@@ -150,23 +198,73 @@ def _detect_and_apply(job: AnalysisJob, prev: dict, curr: dict,
     if "risk_debate" not in completed_keys:
         if curr_risk.get("count", 0) > prev_risk.get("count", 0):
             history = curr_risk.get("history", "")
-            _update_step(job, "risk_debate", StepStatus.running, history)
+            progress.update("risk_debate", StepStatus.running, history)
 
     if "final_decision" not in completed_keys:
         if curr_risk.get("judge_decision") and not prev_risk.get("judge_decision"):
-            _update_step(job, "risk_debate", StepStatus.done,
+            progress.update("risk_debate", StepStatus.done,
                          curr_risk.get("history", ""))
             completed_keys.add("risk_debate")
 
     # Final decision
     if "final_decision" not in completed_keys and _new("final_trade_decision"):
-        _update_step(job, "final_decision", StepStatus.done,
+        progress.update("final_decision", StepStatus.done,
                      curr.get("final_trade_decision", ""))
         completed_keys.add("final_decision")
 
 
+# ── Cancellation ─────────────────────────────────────────────────────────────
+
+class _Cancelled(Exception):
+    def __init__(self, reason: str, by_user: bool) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.by_user = by_user
+
+
+class _CancelToken:
+    """Stop request for a running job, checked by the graph thread between chunks."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason = ""
+        self.by_user = False
+
+    def stop(self, reason: str, by_user: bool = False) -> None:
+        if not self._event.is_set():
+            self.reason, self.by_user = reason, by_user
+            self._event.set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise _Cancelled(self.reason, self.by_user)
+
+
+def _cancel_refund(steps: list[ProgressStep] | None, cost: int) -> int:
+    """Credits returned for a run cancelled by its user: all of `cost` until a step finishes.
+
+    Credits are whole units and a job costs one, so there is no smaller
+    share to give back once the analysis has produced anything.
+    """
+    if any(s.status == StepStatus.done for s in steps or ()):
+        return 0
+    return cost
+
+
+def _is_orphaned(row: dict) -> bool:
+    """A running row whose progress (or heartbeat) stopped `orphan_timeout` ago."""
+    last = row.get("progress_updated_at") or row["created_at"]
+    return _utc(last) < datetime.now(timezone.utc) - timedelta(seconds=settings.orphan_timeout)
+
+
 # ── Supabase helpers ─────────────────────────────────────────────────────────
 
+_FINISHED = (JobStatus.completed, JobStatus.failed, JobStatus.cancelled)
+
+
 def _row_to_job(row: dict) -> AnalysisJob:
     """Convert a Supabase row dict into an AnalysisJob model."""
     from app.models import AnalystType
@@ -175,12 +273,15 @@ def _row_to_job(row: dict) -> AnalysisJob:
     analysts = [AnalystType(a) for a in analysts_raw]
 
     result = None
-    if row.get("result"):
-        result = AnalysisResult(**row["result"])
-
     progress = None
-    if row.get("progress"):
-        progress = [ProgressStep(**p) for p in row["progress"]]
+    if is_packed(row.get("result")):
+        # Finished jobs store result and progress together (see storage_codec)
+        result, progress = storage_codec.unpack(row["result"])
+    else:
+        if row.get("result"):
+            result = AnalysisResult(**row["result"])
+        if row.get("progress"):
+            progress = [ProgressStep(**p) for p in row["progress"]]
 
     return AnalysisJob(
         id=row["id"],
@@ -196,6 +297,7 @@ def _row_to_job(row: dict) -> AnalysisJob:
         result=result,
         error=row.get("error"),
         progress=progress,
+        batch_id=row.get("batch_id"),
     )
 
 
@@ -220,16 +322,95 @@ def _row_to_summary(row: dict) -> JobSummary:
     )
 
 
+def _completed_fields(result: AnalysisResult, progress: list[ProgressStep]) -> dict:
+    """Row update that marks a job completed with the given result."""
+    return {
+        "status": "completed",
+        "signal": result.signal,
+        "result": storage_codec.pack(result, progress),
+        "progress": None,  # packed into `result`
+        "completed_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _utc(ts: str) -> datetime:
+    """Parse a stored timestamp (naive ones are UTC)."""
+    parsed = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _cache_key(ticker: str, date: str, analysts: list, provider: LLMProvider,
+               debate_rounds: int, risk_rounds: int) -> str:
+    """Content address of an analysis: identical inputs → identical key."""
+    payload = json.dumps({
+        "ticker": ticker.strip().upper(),
+        "date": date,
+        "analysts": sorted({a.value for a in analysts}),
+        "provider": provider.value,
+        "debate_rounds": debate_rounds,
+        "risk_rounds": risk_rounds,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _request_key(req: AnalysisRequest) -> str:
+    return _cache_key(req.ticker, req.date, req.analysts, req.llm_provider,
+                      req.max_debate_rounds, req.max_risk_discuss_rounds)
+
+
+def _job_key(job: AnalysisJob) -> str:
+    return _cache_key(job.ticker, job.date, job.analysts, job.llm_provider,
+                      job.max_debate_rounds, job.max_risk_discuss_rounds)
+
+
 class AnalysisService:
     """Supabase-backed job store and TradingAgentsGraph runner."""
 
     # In-memory cache for running jobs only (progress updates during analysis)
     def __init__(self) -> None:
         self._running_jobs: Dict[str, AnalysisJob] = {}
+        self._progress: Dict[str, ProgressStore] = {}
+        # Owner of each live job (running or attached), for access checks
+        self._owners: Dict[str, str] = {}
+        # Dedicated pool sized to the scheduler's worker slots so graph runs
+        # never compete with the default executor used by request handlers
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.analysis_workers,
+            thread_name_prefix="analysis",
+        )
+        # Warm TradingAgentsGraph instances reused across jobs
+        self._graphs = GraphPool(max_idle=settings.graph_pool_size)
+        # Completed results by request key: (result, final progress)
+        self._result_cache: TTLCache[tuple[AnalysisResult, list[ProgressStep]]] = TTLCache(
+            settings.result_cache_size, settings.result_cache_ttl,
+        )
+        # Single-flight: request key → job id of the run doing the work,
+        # and that run's attached followers (job id → user id)
+        self._inflight: Dict[str, str] = {}
+        self._followers: Dict[str, Dict[str, str]] = {}
+        self._leader_of: Dict[str, str] = {}
+        # Jobs submitted with use_cache=False
+        self._bypass_cache: set[str] = set()
+        self._coalesced = 0
+        # Stop tokens of jobs running here, with start / last-progress times
+        # (clocks start once the graph gets a thread or worker process)
+        self._cancel: Dict[str, _CancelToken] = {}
+        self._started: Dict[str, float] = {}
+        self._touched: Dict[str, float] = {}
+        # Runs given up on by the watchdog whose threads are still running
+        self._abandoned: set[asyncio.Future] = set()
+        self._watchdog: asyncio.Task | None = None
 
     # ── public API ────────────────────────────────────────────────────────
 
-    def create_job(self, req: AnalysisRequest, user_id: str) -> AnalysisJob:
+    async def create_job(self, req: AnalysisRequest, user_id: str,
+                         batch_id: str | None = None) -> AnalysisJob:
+        """Insert a job and charge for it.
+
+        Returns a `pending` job that still has to be scheduled, or — unless
+        the request opted out of caching — a job that was completed from the
+        result cache or attached to an identical in-flight run.
+        """
         job_id = uuid.uuid4().hex[:12]
         now = datetime.utcnow().isoformat()
 
@@ -245,124 +426,889 @@ class AnalysisService:
             "llm_provider": req.llm_provider.value,
             "created_at": now,
         }
+        if batch_id is not None:
+            row["batch_id"] = batch_id
+
+        key = _request_key(req)
+        cached = self._result_cache.get(key) if req.use_cache else None
+        leader_id = self._inflight.get(key) if req.use_cache else None
+        if cached is None and leader_id is None and req.use_cache:
+            cached = await self._stored_result(req, key)
+        if cached is not None:
+            result, progress = cached
+            row.update(_completed_fields(result, progress))
+        elif leader_id is not None:
+            # Never queued: the leader's run finishes it
+            row["status"] = "running"
+
+        # Insert + charge 1 credit in one transaction
+        # (raises InsufficientCreditsError without creating the job)
+        inserted = await ledger_repo.create_job(row, cost=1)
+        await profile_cache.invalidate(user_id)
+
+        if not req.use_cache:
+            self._bypass_cache.add(job_id)
+        elif cached is None and leader_id is not None:
+            # The leader may have finished while the row was being inserted
+            current = self._inflight.get(key)
+            if current is not None:
+                self._attach(job_id, user_id, current)
+                await job_repo.update(job_id, {"leader_id": current})
+            else:
+                return await self._settle_late_follower(job_id, key, inserted)
+
+        return _row_to_job(inserted)
 
-        sb = get_supabase()
-        resp = sb.table("analysis_jobs").insert(row).execute()
-        inserted = resp.data[0]
+    async def _settle_late_follower(self, job_id: str, key: str, row: dict) -> AnalysisJob:
+        """A job inserted as a follower of a run that ended before it could attach.
+
+        It is completed from the result cache if that run succeeded, and
+        otherwise put back to `pending` to run on its own.
+        """
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            fields = _completed_fields(*cached)
+            await job_repo.update(job_id, fields)
+            return _row_to_job({**row, **fields})
+        if await job_repo.requeue(job_id):
+            return _row_to_job({**row, "status": "pending"})
+        return _row_to_job(row)
+
+    async def _stored_result(self, req: AnalysisRequest,
+                             key: str) -> tuple[AnalysisResult, list[ProgressStep]] | None:
+        """A completed run of the same request for a past date, from the database.
+
+        Analyses of past dates don't go stale, so they are reused however
+        old they are (and put back in the result cache).
+        """
+        if req.date >= date_type.today().isoformat():
+            return None
+        for row in await job_repo.find_completed(req.ticker.upper(), req.date,
+                                                 req.llm_provider.value):
+            job = _row_to_job({**row, "id": "", "status": "completed", "ticker": req.ticker,
+                               "date": req.date, "created_at": datetime.utcnow()})
+            if _job_key(job) == key and job.result is not None:
+                found = (job.result, job.progress or [])
+                self._result_cache.set(key, found)
+                return found
+        return None
+
+    async def get_job(self, job_id: str, user_id: str | None = None) -> AnalysisJob | None:
+        # If job is currently running, return in-memory version (has live progress)
+        live = self._live_job(job_id)
+        if live is not None and (user_id is None or self._owners.get(job_id) == user_id):
+            return live
+
+        row = await job_repo.get(job_id, user_id=user_id)
+        if row is None:
+            return None
+
+        job = _row_to_job(row)
+        # Followers mirror their leader's live progress
+        leader = self._live_job(self._leader_of.get(job_id, ""))
+        if leader is not None:
+            job.status = leader.status
+            job.progress = leader.progress
+        else:
+            await self._overlay_shared_progress(job)
+        return job
+
+    async def _overlay_shared_progress(self, job: AnalysisJob) -> int:
+        """Fill in live progress for a job running on another worker.
+
+        Returns the shared state's version (0 when there is none).
+        """
+        if job.status != JobStatus.running:
+            return 0
+        snap = await live_state.load(job.id)
+        if snap is None:
+            return 0
+        job.progress = snap.steps
+        return snap.version
+
+    def _live_job(self, job_id: str) -> AnalysisJob | None:
+        job = self._running_jobs.get(job_id)
+        if job is None:
+            return None
+        progress = self._progress.get(job_id)
+        if progress is None:
+            return job
+        return job.model_copy(update={"progress": progress.snapshot()})
+
+    async def get_job_versioned(
+        self,
+        job_id: str,
+        user_id: str,
+        since: int | None = None,
+        if_none_match: str | None = None,
+    ) -> tuple[str, AnalysisJob | AnalysisJobDelta | None] | None:
+        """The job — or only what changed after revision `since` — plus its revision tag.
+
+        The body is None when `if_none_match` already names the current
+        revision. Returns None if the job doesn't exist for this user.
+        """
+        live_id = self._leader_of.get(job_id, job_id)
+        live = self._running_jobs.get(live_id)
+        progress = self._progress.get(live_id)
+        if live is not None and progress is not None and self._owners.get(job_id) == user_id:
+            revision = f"{job_id}-{live.status.value}-{progress.version}"
+            if revision == if_none_match:
+                return revision, None
+            if since is None:
+                return revision, await self.get_job(job_id, user_id=user_id)
+            return revision, AnalysisJobDelta(
+                id=job_id,
+                status=live.status,
+                version=progress.version,
+                steps=[StepDelta(**c) for c in progress.changes_since(since)],
+            )
+
+        row = await job_repo.get(job_id, user_id=user_id)
+        if row is None:
+            return None
+        job = _row_to_job(row)
+        shared_version = await self._overlay_shared_progress(job)
+        stamp = (int(job.completed_at.timestamp()) if job.completed_at
+                 else shared_version or row.get("progress_version", 0))
+        revision = f"{job_id}-{job.status.value}-{stamp}"
+        if revision == if_none_match:
+            return revision, None
+        if since is None:
+            return revision, job
+        return revision, AnalysisJobDelta(
+            id=job_id,
+            status=job.status,
+            version=0,
+            reset=True,
+            steps=[StepDelta(key=p.key, status=p.status, content=p.content)
+                   for p in job.progress or []],
+            completed_at=job.completed_at,
+            result=job.result,
+            error=job.error,
+        )
 
-        # Deduct 1 credit
-        sb.table("credit_transactions").insert({
+    async def list_jobs(self, user_id: str, limit: int = 50, cursor: str | None = None,
+                        **filters: str | None) -> tuple[list[JobSummary], str | None]:
+        """A page of the user's history and the cursor of the next one (None on the last page).
+
+        Raises ValueError for a cursor this service didn't issue.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        rows = await job_repo.list_for_user(user_id, limit + 1, after, **filters)
+        page = rows[:limit]
+        next_cursor = (encode_cursor(page[-1]["created_at"], page[-1]["id"])
+                       if len(rows) > limit else None)
+        return [_row_to_summary(row) for row in page], next_cursor
+
+    # ── batches ───────────────────────────────────────────────────────────
+
+    async def create_batch(self, req: BatchAnalysisRequest, user_id: str) -> BatchJob:
+        """Create a parent batch with one child job per ticker and queue the children.
+
+        Children are charged, cached and coalesced exactly like single jobs,
+        and take the scheduler's worker slots at most `concurrency` at a
+        time. Raises InsufficientCreditsError up front if the balance can't
+        cover every ticker.
+        """
+        tickers = list(dict.fromkeys(t.strip().upper() for t in req.tickers if t.strip()))
+        profile = await profile_repo.get(user_id)
+        if profile is None or profile.get("credits", 0) < len(tickers):
+            raise InsufficientCreditsError(user_id)
+
+        batch_id = uuid.uuid4().hex[:12]
+        concurrency = min(req.concurrency, settings.batch_max_concurrency)
+        await batch_repo.insert({
+            "id": batch_id,
             "user_id": user_id,
-            "amount": -1,
-            "reason": "analysis",
-            "job_id": job_id,
-        }).execute()
-        profile = sb.table("profiles").select("credits").eq("id", user_id).single().execute()
-        new_credits = profile.data["credits"] - 1
-        sb.table("profiles").update({"credits": new_credits}).eq("id", user_id).execute()
+            "date": req.date,
+            "tickers": tickers,
+            "concurrency": concurrency,
+            "created_at": datetime.utcnow().isoformat(),
+        })
+
+        shared = req.model_dump(exclude={"tickers", "concurrency"})
+        for ticker in tickers:
+            try:
+                job = await self.create_job(AnalysisRequest(ticker=ticker, **shared),
+                                            user_id, batch_id=batch_id)
+            except InsufficientCreditsError:
+                # Balance changed since the check; the rest stay uncreated
+                logger.warning("Batch %s: out of credits at %s", batch_id, ticker)
+                break
+            if job.status == JobStatus.pending:
+                await job_scheduler.submit(job.id, user_id, batch_id)
 
-        return _row_to_job(inserted)
+        return await self.get_batch(batch_id, user_id)
 
-    def get_job(self, job_id: str, user_id: str | None = None) -> AnalysisJob | None:
-        # If job is currently running, return in-memory version (has live progress)
-        if job_id in self._running_jobs:
-            return self._running_jobs[job_id]
+    async def get_batch(self, batch_id: str, user_id: str) -> BatchJob | None:
+        """Aggregate progress and the per-ticker signal table of a batch."""
+        batch = await batch_repo.get(batch_id, user_id=user_id)
+        if batch is None or batch.get("kind", "watchlist") != "watchlist":
+            return None
+        rows = {r["ticker"]: r for r in await job_repo.list_for_batch(batch_id)}
+
+        items = []
+        for ticker in batch["tickers"]:
+            row = rows.get(ticker)
+            if row is None:
+                items.append(BatchItem(ticker=ticker))
+                continue
+            items.append(BatchItem(
+                ticker=ticker,
+                job_id=row["id"],
+                status=JobStatus(row["status"]),
+                signal=row.get("signal"),
+                error=row.get("error"),
+                completed_at=row.get("completed_at"),
+            ))
+
+        counts = Counter(i.status.value for i in items if i.status is not None)
+        done = not (counts[JobStatus.pending.value] or counts[JobStatus.running.value])
+        finished = [i.completed_at for i in items if i.completed_at is not None]
+        return BatchJob(
+            id=batch_id,
+            date=batch["date"],
+            status=JobStatus.completed if done else JobStatus.running,
+            total=len(items),
+            counts=dict(counts),
+            items=items,
+            created_at=batch["created_at"],
+            completed_at=max(finished) if done and finished else None,
+        )
 
-        sb = get_supabase()
-        query = sb.table("analysis_jobs").select("*").eq("id", job_id)
-        if user_id:
-            query = query.eq("user_id", user_id)
-        resp = query.execute()
+    async def create_backtest(self, req: BacktestRequest, user_id: str) -> BacktestJob:
+        """A batch over trading dates for one ticker, evaluated against prices.
+
+        Dates already analyzed with the same settings are reused. Raises
+        ValueError for an empty or too long range, InsufficientCreditsError
+        if the balance can't cover every date.
+        """
+        dates = backtest.trading_dates(req.start_date, req.end_date, req.step_days)
+        if not dates:
+            raise ValueError("No trading days in range")
+        if len(dates) > settings.backtest_max_dates:
+            raise ValueError(f"At most {settings.backtest_max_dates} dates per backtest")
+        profile = await profile_repo.get(user_id)
+        if profile is None or profile.get("credits", 0) < len(dates):
+            raise InsufficientCreditsError(user_id)
+
+        ticker = req.ticker.strip().upper()
+        batch_id = uuid.uuid4().hex[:12]
+        concurrency = min(req.concurrency, settings.batch_max_concurrency)
+        await batch_repo.insert({
+            "id": batch_id,
+            "user_id": user_id,
+            "kind": "backtest",
+            "tickers": [ticker],
+            "params": {
+                "start_date": req.start_date,
+                "end_date": req.end_date,
+                "step_days": req.step_days,
+                "horizon_days": req.horizon_days,
+            },
+            "concurrency": concurrency,
+            "created_at": datetime.utcnow().isoformat(),
+        })
+
+        shared = req.model_dump(include={"analysts", "max_debate_rounds",
+                                         "max_risk_discuss_rounds", "llm_provider"})
+        for day in dates:
+            try:
+                job = await self.create_job(AnalysisRequest(ticker=ticker, date=day, **shared),
+                                            user_id, batch_id=batch_id)
+            except InsufficientCreditsError:
+                logger.warning("Backtest %s: out of credits at %s", batch_id, day)
+                break
+            if job.status == JobStatus.pending:
+                await job_scheduler.submit(job.id, user_id, batch_id)
+
+        return await self.get_backtest(batch_id, user_id)
 
-        if not resp.data:
+    async def get_backtest(self, batch_id: str, user_id: str) -> BacktestJob | None:
+        """Per-date signals and, once any have completed, P&L and hit rate."""
+        batch = await batch_repo.get(batch_id, user_id=user_id)
+        if batch is None or batch.get("kind") != "backtest":
             return None
-        return _row_to_job(resp.data[0])
-
-    def list_jobs(self, user_id: str) -> list[JobSummary]:
-        sb = get_supabase()
-        resp = (
-            sb.table("analysis_jobs")
-            .select("id, status, ticker, date, analysts, llm_provider, signal, created_at, completed_at, error")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
-            .execute()
+        params = batch["params"]
+        ticker = batch["tickers"][0]
+        dates = backtest.trading_dates(params["start_date"], params["end_date"],
+                                       params["step_days"])
+        rows = {r["date"]: r for r in await job_repo.list_for_batch(batch_id)}
+
+        signals = {d: rows[d]["signal"] for d in dates
+                   if d in rows and rows[d]["status"] == "completed" and rows[d].get("signal")}
+        returns: dict = {}
+        metrics = None
+        if signals:
+            horizon = params["horizon_days"]
+            # Enough calendar days past the last date to cover the holding horizon
+            until = (date_type.fromisoformat(max(signals))
+                     + timedelta(days=horizon * 2 + 7)).isoformat()
+            closes = await asyncio.to_thread(backtest.load_closes, ticker, min(signals), until)
+            returns, scores = backtest.evaluate(signals, closes, horizon)
+            metrics = BacktestMetrics(**scores)
+
+        items = [
+            BacktestItem(
+                date=d,
+                job_id=rows[d]["id"] if d in rows else None,
+                status=JobStatus(rows[d]["status"]) if d in rows else None,
+                signal=rows[d].get("signal") if d in rows else None,
+                forward_return=returns.get(d),
+            )
+            for d in dates
+        ]
+        counts = Counter(i.status.value for i in items if i.status is not None)
+        done = not (counts[JobStatus.pending.value] or counts[JobStatus.running.value])
+        finished = [rows[d]["completed_at"] for d in rows if rows[d].get("completed_at")]
+        completed_at = max(finished) if finished else None
+
+        if metrics is not None and completed_at is not None:
+            minutes = (_utc(completed_at) - _utc(batch["created_at"])).total_seconds() / 60
+            if minutes > 0:
+                metrics.dates_per_minute = round(counts[JobStatus.completed.value] / minutes, 3)
+
+        return BacktestJob(
+            id=batch_id,
+            ticker=ticker,
+            start_date=params["start_date"],
+            end_date=params["end_date"],
+            horizon_days=params["horizon_days"],
+            status=JobStatus.completed if done else JobStatus.running,
+            total=len(items),
+            counts=dict(counts),
+            items=items,
+            metrics=metrics,
+            created_at=batch["created_at"],
+            completed_at=completed_at if done else None,
         )
-        return [_row_to_summary(row) for row in resp.data]
 
-    # ── background runner (called from BackgroundTasks) ───────────────────
+    # ── cancellation ──────────────────────────────────────────────────────
 
-    async def run_analysis(self, job_id: str) -> None:
-        sb = get_supabase()
-        resp = sb.table("analysis_jobs").select("*").eq("id", job_id).execute()
-        if not resp.data:
+    async def cancel_job(self, job_id: str, user_id: str) -> AnalysisJob | None:
+        """Stop a pending or running job.
+
+        Pending jobs (and jobs attached to another run) are cancelled and
+        refunded right away. Running jobs stop at their next graph chunk and
+        are refunded in full unless a step has finished; the worker running
+        them does that, or this call if no worker does. Returns None if the job
+        doesn't exist for this user; raises JobNotCancellableError once it
+        has finished.
+        """
+        row = await job_repo.get(job_id, user_id=user_id)
+        if row is None:
+            return None
+        status = JobStatus(row["status"])
+
+        token = self._cancel.get(job_id)
+        if token is not None:
+            token.stop("cancelled by user", by_user=True)
+            return await self.get_job(job_id, user_id=user_id)
+
+        leader_id = self._leader_of.get(job_id)
+        if leader_id is not None:
+            # Attached to someone else's run: just let go of it
+            self._followers.get(leader_id, {}).pop(job_id, None)
+            self._leader_of.pop(job_id, None)
+            self._owners.pop(job_id, None)
+            status = JobStatus.running
+
+        if status not in (JobStatus.pending, JobStatus.running):
+            raise JobNotCancellableError(job_id)
+        # A running job owned by another worker sees the status on its next
+        # watchdog pass and refunds it there
+        if not await job_repo.cancel(job_id, from_status=status.value):
+            raise JobNotCancellableError(job_id)
+        if status == JobStatus.pending or leader_id is not None or row.get("leader_id"):
+            refund = 1  # never ran on its own
+        elif _is_orphaned(row):
+            refund = _cancel_refund(_row_to_job(row).progress, cost=1)  # no worker left to do it
+        else:
+            refund = 0
+        if refund:
+            await ledger_repo.refund(job_id, amount=refund)
+            await profile_cache.invalidate(user_id)
+        return await self.get_job(job_id, user_id=user_id)
+
+    async def start_watchdog(self) -> None:
+        self._watchdog = asyncio.create_task(self._watch(), name="job-watchdog")
+
+    async def stop_watchdog(self) -> None:
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            await asyncio.gather(self._watchdog, return_exceptions=True)
+            self._watchdog = None
+
+    async def _watch(self) -> None:
+        last_sweep = time.monotonic()
+        last_prune = 0.0
+        while True:
+            await asyncio.sleep(settings.job_watchdog_interval)
+            try:
+                await self._check_running()
+            except Exception:
+                logger.exception("Job watchdog pass failed")
+            if time.monotonic() - last_sweep >= settings.orphan_sweep_interval:
+                last_sweep = time.monotonic()
+                try:
+                    await self.recover_orphans()
+                except Exception:
+                    logger.exception("Orphan sweep failed")
+            if time.monotonic() - last_prune >= settings.checkpoint_prune_interval:
+                last_prune = time.monotonic()
+                try:
+                    await self.prune_checkpoints()
+                except Exception:
+                    logger.exception("Checkpoint pruning failed")
+
+    async def _check_running(self) -> None:
+        """Enforce run / step timeouts and pick up cancels made on other workers."""
+        now = time.monotonic()
+        for job_id, token in list(self._cancel.items()):
+            started = self._started.get(job_id)
+            if token.is_set() or started is None:
+                continue  # stopping, or still waiting for a thread / worker
+            if now - started > settings.job_timeout:
+                token.stop(f"run exceeded {settings.job_timeout:.0f}s")
+            elif now - self._touched.get(job_id, now) > settings.step_timeout:
+                token.stop(f"no progress for {settings.step_timeout:.0f}s")
+
+        live = [jid for jid, token in self._cancel.items() if not token.is_set()]
+        if live:
+            for row in await job_repo.statuses(live):
+                if row["status"] == JobStatus.cancelled.value and row["id"] in self._cancel:
+                    self._cancel[row["id"]].stop("cancelled by user", by_user=True)
+
+    async def _await_run(self, job_id: str, fut: asyncio.Future,
+                         token: _CancelToken) -> AnalysisResult:
+        """Wait for the graph thread; once stopped, give it `cancel_grace` to notice.
+
+        A run stuck inside a blocking call is abandoned after the grace
+        period so it stops holding the job's worker slot. Its thread can't be
+        killed, so the thread pool is replaced to keep every slot backed by
+        a free thread.
+        """
+        deadline = None
+        while True:
+            done, _ = await asyncio.wait({fut}, timeout=1.0)
+            if done:
+                return fut.result()
+            if token.is_set():
+                deadline = deadline or time.monotonic() + settings.cancel_grace
+                if time.monotonic() >= deadline:
+                    logger.warning("Job %s: abandoning unresponsive run (%s)", job_id, token.reason)
+                    if process_pool is None:  # worker processes are killed by the pool
+                        self._abandon(fut)
+                    raise _Cancelled(token.reason, token.by_user)
+
+    def _abandon(self, fut: asyncio.Future) -> None:
+        self._abandoned.add(fut)
+        fut.add_done_callback(self._reap)
+        old, self._executor = self._executor, ThreadPoolExecutor(
+            max_workers=settings.analysis_workers,
+            thread_name_prefix="analysis",
+        )
+        # Other runs on the old pool finish normally; its threads exit after them
+        old.shutdown(wait=False)
+
+    def _reap(self, fut: asyncio.Future) -> None:
+        self._abandoned.discard(fut)
+        if not fut.cancelled() and fut.exception() is not None:
+            logger.info("Abandoned run ended: %s", fut.exception())
+
+    def _clock_start(self, job_id: str, token: _CancelToken) -> None:
+        """Start a run's timeout clocks, now that its graph is actually executing."""
+        if self._cancel.get(job_id) is token:
+            now = time.monotonic()
+            self._started.setdefault(job_id, now)
+            self._touched[job_id] = now
+
+    def _start_run(self, job: AnalysisJob, progress: ProgressStore,
+                   token: _CancelToken) -> asyncio.Future:
+        """The graph run: a worker process if configured, else this process's thread pool."""
+        if process_pool is not None:
+            return asyncio.ensure_future(self._run_in_process(job, progress, token))
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run_sync, job, progress, token,
+        )
+
+    async def _run_in_process(self, job: AnalysisJob, progress: ProgressStore,
+                              token: _CancelToken) -> AnalysisResult:
+        result = await process_pool.run(job, progress, token,
+                                        on_start=lambda: self._clock_start(job.id, token))
+        if result is None:
+            raise _Cancelled(token.reason, token.by_user)
+        return AnalysisResult.model_validate(result)
+
+    async def _reschedule(self, job_id: str) -> None:
+        """Put a job whose leader was cancelled back in line to run on its own."""
+        row = await job_repo.get(job_id)
+        if row is None or not await job_repo.requeue(job_id):
             return
+        await job_scheduler.submit(job_id, row["user_id"], row.get("batch_id"))
+
+    # ── resume ────────────────────────────────────────────────────────────
+
+    async def resume_job(self, job_id: str, user_id: str) -> AnalysisJob | None:
+        """Requeue a failed job, charging for the new attempt.
+
+        The run continues from its last checkpoint (kept for
+        `checkpoint_retention`, after that it starts over). Returns None if the job
+        doesn't exist for this user; raises JobNotResumableError unless it
+        failed, InsufficientCreditsError if the user can't pay.
+        """
+        if await job_repo.get(job_id, user_id=user_id) is None:
+            return None
+        job = _row_to_job(await ledger_repo.resume_job(job_id, cost=1))
+        await profile_cache.invalidate(user_id)
+        return job
+
+    async def recover_orphans(self) -> int:
+        """Requeue running jobs whose worker died and schedule them again.
+
+        A job counts as orphaned once its progress (or heartbeat) hasn't been
+        written for `orphan_timeout` seconds. Its next run resumes from the
+        checkpoint rather than starting over. Runs at startup and then from
+        the watchdog, so runs of a worker that died just before a restart or
+        during a rolling deploy are picked up once they go stale. Attached
+        followers write no heartbeat of their own; they are orphaned only
+        once their leader is. Returns the number of jobs requeued.
+        """
+        before = (datetime.utcnow() - timedelta(seconds=settings.orphan_timeout)).isoformat()
+        rows = await job_repo.list_stale_running(before)
+        stale = {row["id"] for row in rows}
+        leaders = list({row["leader_id"] for row in rows if row.get("leader_id")} - stale)
+        live_leaders = {r["id"] for r in await job_repo.statuses(leaders)
+                        if r["status"] == JobStatus.running.value} if leaders else set()
+        recovered = []
+        for row in rows:
+            job_id = row["id"]
+            if job_id in self._running_jobs or job_id in self._leader_of:
+                continue
+            if row.get("leader_id") in live_leaders:
+                continue  # its leader is still running on some worker
+            if not await job_repo.requeue(job_id):
+                continue  # another worker's sweep got it
+            recovered.append(job_id)
+            await job_scheduler.submit(job_id, row["user_id"], row.get("batch_id"))
+        if recovered:
+            logger.warning("Requeued %d orphaned job(s): %s", len(recovered), ", ".join(recovered))
+        return len(recovered)
+
+    async def prune_checkpoints(self) -> int:
+        """Delete checkpoints no run will resume from; returns how many jobs' were dropped.
+
+        Queued and running jobs keep theirs, and failed or cancelled jobs
+        keep theirs for `checkpoint_retention` after they stopped so they can
+        still be resumed. Completed jobs (normally cleaned up as they finish),
+        expired failures and jobs that no longer exist lose them.
+        """
+        threads = await asyncio.to_thread(checkpoint_threads)
+        if not threads:
+            return 0
+        rows: dict[str, dict] = {}
+        for i in range(0, len(threads), 100):
+            for row in await job_repo.statuses(threads[i:i + 100]):
+                rows[row["id"]] = row
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.checkpoint_retention)
+        stale = []
+        for thread_id in threads:
+            row = rows.get(thread_id)
+            if row is None or row["status"] == JobStatus.completed.value:
+                stale.append(thread_id)
+            elif (row["status"] in (JobStatus.failed.value, JobStatus.cancelled.value)
+                  and row.get("completed_at") and _utc(row["completed_at"]) < cutoff):
+                stale.append(thread_id)
+        if stale:
+            await asyncio.to_thread(delete_checkpoints, stale)
+            logger.info("Pruned checkpoints of %d job(s)", len(stale))
+        return len(stale)
+
+    async def open_stream(self, job_id: str, user_id: str,
+                          last_event_id: int | None = None) -> AsyncIterator[str] | None:
+        """Server-Sent Events for a job's progress; None if the job isn't visible.
+
+        A fresh connection (or one whose Last-Event-ID is too old) starts with
+        a `snapshot` of the whole job, then receives only step transitions and
+        content deltas until the terminal `end` event. While the job is queued
+        or running on another worker it is polled instead, with a new
+        `snapshot` whenever it changed, until it starts here or finishes.
+        """
+        row = await job_repo.get(job_id, user_id=user_id)
+        if row is None:
+            return None
+
+        keepalive = settings.progress_stream_keepalive
+
+        async def _events() -> AsyncIterator[str]:
+            resume_from = last_event_id
+            revision = None
+            quiet = 0.0
+            while True:
+                channel = self._leader_of.get(job_id, job_id)
+                sub = progress_broker.subscribe(channel, resume_from, keepalive=keepalive)
+                if sub is not None:
+                    seq, resumed, events = sub
+                    if not resumed:
+                        job = await self.get_job(job_id, user_id=user_id)
+                        yield ProgressEvent(seq, "snapshot", job.model_dump(mode="json")).encode()
+                    async for event in events:
+                        if event is None:
+                            yield ": keep-alive\n\n"
+                        elif event.type == "end" and channel != job_id:
+                            break  # the leader ended; this job's own row says how
+                        else:
+                            yield event.encode()
+                            if event.type == "end":
+                                return
+                    # Interrupted run or a leader that ended: follow the row again
+                    resume_from, revision = None, None
+
+                versioned = await self.get_job_versioned(job_id, user_id, if_none_match=revision)
+                if versioned is None:
+                    return  # deleted
+                revision, job = versioned
+                if job is not None:
+                    quiet = 0.0
+                    yield ProgressEvent(0, "snapshot", job.model_dump(mode="json")).encode()
+                    if job.status in _FINISHED:
+                        yield ProgressEvent(0, "end", {
+                            "status": job.status.value,
+                            "signal": job.result.signal if job.result else None,
+                        }).encode()
+                        return
+                elif quiet >= keepalive:
+                    quiet = 0.0
+                    yield ": keep-alive\n\n"
+                await asyncio.sleep(settings.progress_stream_poll)
+                quiet += settings.progress_stream_poll
+
+        return _events()
+
+    def job_stats(self) -> dict:
+        return {
+            "running": len(self._running_jobs),
+            "attached": len(self._leader_of),
+            "abandoned_threads": len(self._abandoned),
+        }
 
-        job = _row_to_job(resp.data[0])
+    def process_pool_stats(self) -> dict | None:
+        return process_pool.stats() if process_pool is not None else None
 
-        # Initialize progress steps
-        job.progress = _build_progress(job.analysts)
-        if job.progress:
-            _update_step(job, job.progress[0].key, StepStatus.running)
+    def graph_pool_stats(self) -> dict:
+        """Pool reuse plus total/average graph construction vs execution time."""
+        return self._graphs.stats()
+
+    def market_data_stats(self) -> dict | None:
+        """Vendor data cache size and per-tool hit rate / latency."""
+        market_cache = get_market_cache()
+        return market_cache.stats() if market_cache is not None else None
+
+    def signal_stats(self) -> dict:
+        """Local vs LLM signal extraction counts and the time saved."""
+        return signal_extractor.stats()
+
+    def storage_stats(self) -> dict:
+        return storage_codec.stats()
+
+    def result_cache_stats(self) -> dict:
+        return {
+            **self._result_cache.stats(),
+            "inflight": len(self._inflight),
+            "coalesced": self._coalesced,
+        }
+
+    def _publish_step(self, job_id: str, event: dict) -> None:
+        """Fan a ProgressStore change out to local streams and shared state."""
+        if job_id in self._started:
+            self._touched[job_id] = time.monotonic()
+        progress_broker.publish(job_id, "step", event)
+        progress = self._progress.get(job_id)
+        # The full content lets the shared copy repair itself after a lost write
+        live_state.apply(job_id, event,
+                         progress.content_of(event["key"]) if progress is not None else None)
+        # Step completions are flushed right away; metrics ride the next flush
+        urgent = event["status"] == StepStatus.done.value and "metrics" not in event
+        progress_persister.mark(job_id, urgent=urgent)
+
+    # ── single-flight ─────────────────────────────────────────────────────
+
+    def _attach(self, job_id: str, user_id: str, leader_id: str) -> None:
+        self._followers.setdefault(leader_id, {})[job_id] = user_id
+        self._leader_of[job_id] = leader_id
+        self._owners[job_id] = user_id
+        self._coalesced += 1
+
+    def _detach_followers(self, leader_id: str) -> Dict[str, str]:
+        followers = self._followers.pop(leader_id, {})
+        for fid in followers:
+            self._leader_of.pop(fid, None)
+            self._owners.pop(fid, None)
+        return followers
+
+    # ── background runner (called from the job scheduler) ─────────────────
+
+    async def run_analysis(self, job_id: str) -> None:
+        row = await job_repo.get(job_id)
+        if row is None:
+            return
+
+        if row["status"] == JobStatus.cancelled.value:
+            return  # cancelled while queued
+        job = _row_to_job(row)
+        user_id = row["user_id"]
+        key = _job_key(job)
+
+        # An identical job may have finished or started while this one was queued
+        if job_id not in self._bypass_cache:
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                await job_repo.update(job_id, _completed_fields(*cached))
+                return
+            leader_id = self._inflight.get(key)
+            if leader_id is not None:
+                self._attach(job_id, user_id, leader_id)
+                await job_repo.update(job_id, {"leader_id": leader_id})
+                return
+        self._bypass_cache.discard(job_id)
+
+        self._inflight[key] = job_id
+        progress_broker.open(job_id)
+
+        # Initialize progress steps — or pick up where an interrupted run stopped
+        restored = _restore_progress(job.progress)
+        if restored is not None:
+            logger.info("Job %s: resuming from checkpoint", job_id)
+        progress = ProgressStore(
+            restored or _build_progress(job.analysts),
+            on_change=lambda event: self._publish_step(job_id, event),
+        )
+        keys = progress.keys()
+        pending = [k for k in keys if progress.status_of(k) == StepStatus.pending]
+        if pending:
+            progress.update(pending[0], StepStatus.running)
 
         job.status = JobStatus.running
+        progress_broker.publish(job_id, "job", {"status": job.status.value})
+        live_state.start(job_id, progress.snapshot(), job.status)
 
         # Keep in memory for live progress polling
         self._running_jobs[job_id] = job
-
-        # Persist running status + initial progress
-        sb.table("analysis_jobs").update({
-            "status": "running",
-            "progress": [s.model_dump() for s in job.progress] if job.progress else None,
-        }).eq("id", job_id).execute()
+        self._progress[job_id] = progress
+        self._owners[job_id] = user_id
+        token = self._cancel[job_id] = _CancelToken()
 
         try:
-            result = await asyncio.to_thread(self._run_sync, job)
+            # Persist running status + initial progress
+            await job_repo.update(job_id, {
+                "status": "running",
+                "progress": [s.model_dump() for s in progress.snapshot()] or None,
+                "progress_version": progress.version,
+                "progress_updated_at": datetime.utcnow().isoformat(),
+                "attempts": row.get("attempts", 0) + 1,
+                "leader_id": None,  # runs on its own now
+            })
+            # From here on intermediate progress is written behind, throttled
+            progress_persister.track(job_id, progress)
+
+            for attempt in range(1, settings.job_max_attempts + 1):
+                try:
+                    result = await self._await_run(
+                        job_id, self._start_run(job, progress, token), token,
+                    )
+                    break
+                except _Cancelled:
+                    raise
+                except Exception:
+                    if attempt >= settings.job_max_attempts:
+                        raise
+                    logger.warning("Job %s failed (attempt %d), resuming from checkpoint",
+                                   job_id, attempt, exc_info=True)
             job.result = result
             job.status = JobStatus.completed
             # Ensure all steps marked done
-            if job.progress:
-                for s in job.progress:
-                    if s.status != StepStatus.done:
-                        _update_step(job, s.key, StepStatus.done)
-
-            # Persist final result
-            now = datetime.utcnow().isoformat()
-            sb.table("analysis_jobs").update({
-                "status": "completed",
-                "signal": result.signal,
-                "result": result.model_dump(),
-                "progress": [s.model_dump() for s in job.progress] if job.progress else None,
-                "completed_at": now,
-            }).eq("id", job_id).execute()
+            for k in keys:
+                if progress.status_of(k) != StepStatus.done:
+                    progress.update(k, StepStatus.done)
+
+            job.progress = progress.snapshot()
+            self._result_cache.set(key, (result, job.progress))
+
+            # Persist final result for this job and everyone attached to it
+            self._inflight.pop(key, None)
+            followers = self._detach_followers(job_id)
+            completed = _completed_fields(result, job.progress)
+            for jid in (job_id, *followers):
+                await job_repo.update(jid, completed)
+
+        except _Cancelled as stop:
+            job.progress = progress.snapshot()
+            self._inflight.pop(key, None)
+            followers = self._detach_followers(job_id)
+            if not stop.by_user:
+                logger.warning("Job %s stopped by watchdog: %s", job_id, stop.reason)
+                await self._fail(job, {job_id: user_id, **followers}, f"Timed out: {stop.reason}")
+            else:
+                job.status = JobStatus.cancelled
+                await job_repo.update(job_id, {
+                    "status": "cancelled",
+                    "progress": [s.model_dump() for s in job.progress] if job.progress else None,
+                    "completed_at": datetime.utcnow().isoformat(),
+                })
+                refund = _cancel_refund(progress.snapshot(), cost=1)
+                if refund:
+                    await ledger_repo.refund(job_id, amount=refund)
+                    await profile_cache.invalidate(user_id)
+                # Attached jobs didn't ask to stop — run them on their own
+                for fid in followers:
+                    await self._reschedule(fid)
 
         except Exception:
-            error_msg = traceback.format_exc()
-            job.error = error_msg
-            job.status = JobStatus.failed
+            job.progress = progress.snapshot()
+            self._inflight.pop(key, None)
+            followers = self._detach_followers(job_id)
+            await self._fail(job, {job_id: user_id, **followers}, traceback.format_exc())
+
+        finally:
+            if job.status == JobStatus.running:
+                # Interrupted (shutdown): keep how far it got for the resume
+                await progress_persister.flush([job_id])
+            progress_persister.untrack(job_id)
+            live_state.finish(job_id, job.status)
+            if job.status == JobStatus.running:
+                progress_broker.discard(job_id)
+            else:
+                progress_broker.close(job_id, {
+                    "status": job.status.value,
+                    "signal": job.result.signal if job.result else None,
+                })
+            # Remove from in-memory cache
+            self._running_jobs.pop(job_id, None)
+            self._progress.pop(job_id, None)
+            self._owners.pop(job_id, None)
+            self._cancel.pop(job_id, None)
+            self._started.pop(job_id, None)
+            self._touched.pop(job_id, None)
+            if self._inflight.get(key) == job_id:
+                del self._inflight[key]
 
+    @staticmethod
+    async def _fail(job: AnalysisJob, owners: Dict[str, str], error_msg: str) -> None:
+        """Mark a run and the jobs attached to it (job id → user) failed, refunding each."""
+        job.error = error_msg
+        job.status = JobStatus.failed
+        for jid, owner in owners.items():
             now = datetime.utcnow().isoformat()
-            sb.table("analysis_jobs").update({
+            await job_repo.update(jid, {
                 "status": "failed",
                 "error": error_msg,
                 "progress": [s.model_dump() for s in job.progress] if job.progress else None,
                 "completed_at": now,
-            }).eq("id", job_id).execute()
+            })
 
             # Refund credit on failure
-            user_id = resp.data[0]["user_id"]
-            sb.table("credit_transactions").insert({
-                "user_id": user_id,
-                "amount": 1,
-                "reason": "refund",
-                "job_id": job_id,
-            }).execute()
-            profile = sb.table("profiles").select("credits").eq("id", user_id).single().execute()
-            new_credits = profile.data["credits"] + 1
-            sb.table("profiles").update({"credits": new_credits}).eq("id", user_id).execute()
-
-        finally:
-            # Remove from in-memory cache
-            self._running_jobs.pop(job_id, None)
+            await ledger_repo.refund(jid, amount=1)
+            await profile_cache.invalidate(owner)
 
     # ── sync wrapper executed in thread pool ──────────────────────────────
 
@@ -383,8 +1329,18 @@ class AnalysisService:
     }
 
     @staticmethod
-    def _run_sync(job: AnalysisJob) -> AnalysisResult:
-        config = DEFAULT_CONFIG.copy()
+    def _graph_key(job: AnalysisJob) -> tuple:
+        return (
+            job.llm_provider.value,
+            tuple(a.value for a in job.analysts),
+            job.max_debate_rounds,
+            job.max_risk_discuss_rounds,
+        )
+
+    @staticmethod
+    def _build_graph(job: AnalysisJob) -> TradingAgentsGraph:
+        engine = load_engine()
+        config = engine.DEFAULT_CONFIG.copy()
         config["max_debate_rounds"] = job.max_debate_rounds
         config["max_risk_discuss_rounds"] = job.max_risk_discuss_rounds
 
@@ -392,34 +1348,194 @@ class AnalysisService:
         provider_defaults = AnalysisService._PROVIDER_DEFAULTS.get(job.llm_provider, {})
         config.update(provider_defaults)
 
-        graph = TradingAgentsGraph(
+        return engine.TradingAgentsGraph(
             selected_analysts=[a.value for a in job.analysts],
             config=config,
         )
 
-        # Use graph.stream() instead of graph.propagate() to get
-        # intermediate states for progress tracking
-        init_state = graph.propagator.create_initial_state(job.ticker, job.date)
+    @staticmethod
+    def _thread_args(graph: TradingAgentsGraph, job: AnalysisJob,
+                     callbacks: list) -> tuple[dict, dict]:
+        """(config, other stream kwargs) with the job id as the checkpoint thread."""
         args = graph.propagator.get_graph_args()
+        config = {**args.get("config", {}), "configurable": {"thread_id": job.id},
+                  "callbacks": callbacks}
+        return config, {k: v for k, v in args.items() if k != "config"}
 
-        prev_state = init_state
-        final_state = None
-        completed_keys: set = set()
+    @staticmethod
+    @contextmanager
+    def _checkpointed(graph: TradingAgentsGraph) -> Iterator:
+        """Persist the graph's state after every node while leased to a job."""
+        compiled = graph.graph
+        compiled.checkpointer = get_checkpointer()
+        try:
+            yield compiled
+        finally:
+            compiled.checkpointer = None
+
+    @staticmethod
+    def _forget_checkpoint(job_id: str) -> None:
+        delete = getattr(get_checkpointer(), "delete_thread", None)
+        if delete is not None:
+            try:
+                delete(job_id)
+            except Exception:
+                logger.exception("Could not delete checkpoint for job %s", job_id)
+
+    def _run_sync(self, job: AnalysisJob, progress: ProgressStore,
+                  token: _CancelToken) -> AnalysisResult:
+        # Pulls in langchain_core, so imported with the engine rather than at startup
+        from app.services.tracing import JobTracer
+
+        # Queued behind an abandoned run until now; don't start one that was stopped meanwhile
+        token.check()
+        self._clock_start(job.id, token)
+        tracer = JobTracer(progress)
+        try:
+            with self._graphs.lease(self._graph_key(job), lambda: self._build_graph(job)) as (graph, build_s):
+                tracer.graph_built(None, build_s)
+                t0 = time.perf_counter()
+                if settings.analyst_execution == "parallel" and len(job.analysts) > 1:
+                    final_state = self._stream_parallel(graph, job, progress, tracer, token)
+                else:
+                    final_state = self._stream_sequential(graph, job, progress, [tracer], token)
+                token.check()
+
+                # Replicate propagate() post-processing
+                graph.ticker = job.ticker
+                graph.curr_state = final_state
+                graph._log_state(job.date, final_state)
+                # Read BUY/SELL/HOLD locally; the LLM only sees ambiguous decisions
+                signal = signal_extractor.extract(final_state["final_trade_decision"],
+                                                  graph.process_signal)
+
+                # Analyst graphs built during the run (parallel mode) are
+                # construction too, not the analysts' execution
+                building = tracer.build_wall()
+                logger.info("Job %s: graph construction %.2fs, execution %.2fs", job.id,
+                            building, time.perf_counter() - t0 - (building - build_s))
+                result = _extract_result(final_state, signal)
+        finally:
+            usage = tracer.flush()
+            logger.info("Job %s: %d LLM calls, %d prompt + %d completion tokens, ~$%.4f",
+                        job.id, usage.llm_calls, usage.prompt_tokens,
+                        usage.completion_tokens, usage.cost_usd)
+        self._forget_checkpoint(job.id)
+        return result
 
-        for chunk in graph.graph.stream(init_state, **args):
-            final_state = chunk
-            _detect_and_apply(job, prev_state, chunk, completed_keys)
-            prev_state = chunk
+    @staticmethod
+    def _stream_sequential(graph: TradingAgentsGraph, job: AnalysisJob,
+                           progress: ProgressStore, callbacks: list,
+                           token: _CancelToken) -> dict:
+        # Use graph.stream() instead of graph.propagate() to get
+        # intermediate states for progress tracking
+        config, stream_args = AnalysisService._thread_args(graph, job, callbacks)
+        completed_keys = _completed_keys(progress)
+
+        with AnalysisService._checkpointed(graph) as compiled:
+            saved = compiled.get_state(config)
+            if saved.values and not saved.next:
+                return dict(saved.values)  # finished before the last attempt failed
+            if saved.next:
+                # Continue after the last checkpointed node
+                inputs, prev_state = None, dict(saved.values)
+            else:
+                inputs = prev_state = graph.propagator.create_initial_state(job.ticker, job.date)
+
+            final_state = None
+            for chunk in compiled.stream(inputs, config, **stream_args):
+                token.check()
+                final_state = chunk
+                _detect_and_apply(progress, prev_state, chunk, completed_keys)
+                prev_state = chunk
 
         if final_state is None:
             raise RuntimeError("Graph stream produced no output")
+        return final_state
+
+    # ── parallel analyst fan-out ──────────────────────────────────────────
+
+    def _run_analyst(self, job: AnalysisJob, analyst: AnalystType, progress: ProgressStore,
+                     tracer: JobTracer, token: _CancelToken) -> tuple[str, str]:
+        """Run one analyst on its own single-analyst graph; returns (field, report)."""
+        step_key, _ = _ANALYST_STEPS[analyst.value]
+        field = _STEP_CONTENT_FIELD[step_key]
+        solo = job.model_copy(update={"analysts": [analyst]})
+
+        report = ""
+        with self._graphs.lease(self._graph_key(solo), lambda: self._build_graph(solo)) as (graph, build_s):
+            tracer.graph_built(step_key, build_s)
+            init_state = graph.propagator.create_initial_state(job.ticker, job.date)
+            args = graph.propagator.get_graph_args()
+            args["config"] = {**args.get("config", {}), "callbacks": [tracer]}
+            for chunk in graph.graph.stream(init_state, **args):
+                token.check()
+                report = chunk.get(field) or ""
+                if report:
+                    break  # report is in — stop before the debate stage
+
+        if not report:
+            raise RuntimeError(f"{analyst.value} analyst produced no report")
+        progress.update(step_key, StepStatus.done, report)
+        return field, report
+
+    def _stream_parallel(self, graph: TradingAgentsGraph, job: AnalysisJob,
+                         progress: ProgressStore, tracer: JobTracer,
+                         token: _CancelToken) -> dict:
+        """Run the analysts concurrently, then the rest of the graph once.
+
+        Analysts only write their own report field, so they can gather data
+        side by side. Their merged reports are written into the full graph as
+        if its last Msg Clear node had just run, and streaming resumes from
+        the Bull Researcher. On a resumed run, reports that already finished
+        are taken from progress, and a checkpointed debate stage continues
+        where it stopped.
+        """
+        config, stream_args = self._thread_args(graph, job, [tracer])
+        last_clear = f"Msg Clear {job.analysts[-1].value.capitalize()}"
+
+        with self._checkpointed(graph) as compiled:
+            saved = compiled.get_state(config)
+            if saved.values and not saved.next:
+                return dict(saved.values)  # finished before the last attempt failed
+
+            if saved.next:
+                prev_state = dict(saved.values)
+            else:
+                state = dict(graph.propagator.create_initial_state(job.ticker, job.date))
+                todo = []
+                for a in job.analysts:
+                    step_key = _ANALYST_STEPS[a.value][0]
+                    report = progress.content_of(step_key)
+                    if progress.status_of(step_key) == StepStatus.done and report:
+                        state[_STEP_CONTENT_FIELD[step_key]] = report
+                    else:
+                        progress.update(step_key, StepStatus.running)
+                        todo.append(a)
+
+                workers = max(1, min(settings.analyst_concurrency, len(todo) or 1))
+                with ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix=f"analyst-{job.id}") as pool:
+                    for field, report in pool.map(
+                        lambda a: self._run_analyst(job, a, progress, tracer, token), todo,
+                    ):
+                        state[field] = report
+
+                progress.update("invest_debate", StepStatus.running)
+                compiled.update_state(config, state, as_node=last_clear)
+                prev_state = state
+
+            final_state = None
+            completed_keys = _completed_keys(progress)
+            for chunk in compiled.stream(None, config, **stream_args):
+                token.check()
+                final_state = chunk
+                _detect_and_apply(progress, prev_state, chunk, completed_keys)
+                prev_state = chunk
 
-        # Replicate propagate() post-processing
-        graph.curr_state = final_state
-        graph._log_state(job.date, final_state)
-        signal = graph.process_signal(final_state["final_trade_decision"])
-
-        return _extract_result(final_state, signal)
+        if final_state is None:
+            raise RuntimeError("Graph stream produced no output")
+        return final_state
 
 
 # ── helpers ───────────────────────────────────────────────────────────────────
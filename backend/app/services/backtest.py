@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+from app.services.cache import TTLCache
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Long / short / flat exposure for each signal
+_POSITION = {"BUY": 1.0, "SELL": -1.0, "HOLD": 0.0}
+
+# Price history by (ticker, start, end); backtest views are polled
+_closes: TTLCache["pd.Series"] = TTLCache(maxsize=64, ttl=3600)
+
+
+def trading_dates(start: str, end: str, step: int) -> list[str]:
+    """Every `step`-th business day from `start` to `end` inclusive."""
+    import pandas as pd
+
+    return [d.strftime("%Y-%m-%d") for d in pd.bdate_range(start, end)[::step]]
+
+
+def load_closes(ticker: str, start: str, end: str) -> "pd.Series":
+    """Daily closes (adjusted) from Yahoo Finance. Blocking — call from a thread."""
+    key = (ticker, start, end)
+    closes = _closes.get(key)
+    if closes is not None:
+        return closes
+
+    import pandas as pd
+    import yfinance as yf
+
+    frame = yf.download(ticker, start=start, end=end, auto_adjust=True, progress=False)
+    closes = frame["Close"]
+    if isinstance(closes, pd.DataFrame):  # multi-ticker column layout
+        closes = closes.iloc[:, 0]
+    closes = closes.dropna().sort_index()
+    if closes.index.tz is not None:
+        closes.index = closes.index.tz_localize(None)
+    _closes.set(key, closes)
+    return closes
+
+
+def evaluate(signals: dict[str, str], closes: "pd.Series",
+             horizon: int) -> tuple[dict[str, Optional[float]], dict]:
+    """Score signals against realized prices.
+
+    Each signal takes a position (BUY +1, SELL −1, HOLD 0) at the close of
+    its date — or the next trading day — and holds it for `horizon` trading
+    days. Returns (forward return per date, metrics).
+    """
+    import numpy as np
+    import pandas as pd
+
+    dates = sorted(signals)
+    if not dates or closes.empty:
+        return {d: None for d in dates}, {"evaluated": 0, "trades": 0}
+
+    prices = closes.to_numpy(dtype=float)
+    forward = np.full(len(prices), np.nan)
+    if len(prices) > horizon:
+        forward[:-horizon] = prices[horizon:] / prices[:-horizon] - 1
+
+    at = closes.index.searchsorted(pd.to_datetime(dates))
+    inside = at < len(prices)
+    realized = np.full(len(dates), np.nan)
+    realized[inside] = forward[at[inside]]
+    position = np.array([_POSITION.get((signals[d] or "").upper(), 0.0) for d in dates])
+
+    evaluated = ~np.isnan(realized)
+    traded = evaluated & (position != 0)
+    pnl = position[evaluated] * realized[evaluated]
+    curve = np.cumsum(pnl)
+    drawdown = curve - np.maximum.accumulate(curve) if len(curve) else np.zeros(1)
+
+    trade_pnl = position[traded] * realized[traded]
+    first, last = at[0], min(at[-1] + horizon, len(prices) - 1)
+    metrics = {
+        "evaluated": int(evaluated.sum()),
+        "trades": int(traded.sum()),
+        "hit_rate": float((trade_pnl > 0).mean()) if traded.any() else None,
+        "avg_trade_return": float(trade_pnl.mean()) if traded.any() else None,
+        "cumulative_return": float(curve[-1]) if len(curve) else 0.0,
+        "max_drawdown": float(drawdown.min()),
+        "buy_and_hold_return": (float(prices[last] / prices[first] - 1)
+                                if first < len(prices) else None),
+    }
+    returns = {d: (None if np.isnan(r) else float(r)) for d, r in zip(dates, realized)}
+    return returns, metrics
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from app.config import data_path, settings
+
+logger = logging.getLogger(__name__)
+
+# The TradingAgents engine pulls in langchain, langgraph, chromadb, pandas,
+# yfinance, stockstats… Importing it eagerly made every API process pay that
+# cost at boot, even ones only serving /api/health or /api/profile. It is now
+# imported on first use (or warmed in the background after startup).
+_engine: SimpleNamespace | None = None
+_checkpointer: Any = None
+_lock = threading.Lock()
+
+
+def load_engine() -> SimpleNamespace:
+    """Import the graph engine once per process and return its entry points."""
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _lock:
+        if _engine is None:
+            t0 = time.perf_counter()
+            from langgraph.checkpoint.sqlite import SqliteSaver
+            from tradingagents.default_config import DEFAULT_CONFIG
+            from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+            from app.services.market_cache import get_market_cache, install
+
+            market_cache = get_market_cache()
+            if market_cache is not None:
+                install(market_cache)
+
+            _engine = SimpleNamespace(
+                TradingAgentsGraph=TradingAgentsGraph,
+                DEFAULT_CONFIG=DEFAULT_CONFIG,
+                SqliteSaver=SqliteSaver,
+            )
+            logger.info("TradingAgents engine imported in %.2fs", time.perf_counter() - t0)
+    return _engine
+
+
+def engine_loaded() -> bool:
+    return _engine is not None
+
+
+def get_checkpointer() -> Any:
+    """Process-wide langgraph checkpointer (SQLite) shared by all graph runs.
+
+    Runs are keyed by thread_id = job id, so a failed or orphaned job can be
+    resumed from its last completed node.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        engine = load_engine()
+        with _lock:
+            if _checkpointer is None:
+                path = data_path(settings.checkpoint_path)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                conn = sqlite3.connect(path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                _checkpointer = engine.SqliteSaver(conn)
+    return _checkpointer
+
+
+# Checkpoint housekeeping works on the database file directly, so the API
+# process can prune without importing the engine.
+
+def _checkpoint_db() -> sqlite3.Connection | None:
+    path = data_path(settings.checkpoint_path)
+    if not os.path.exists(path):
+        return None
+    return sqlite3.connect(path, timeout=30)
+
+
+def checkpoint_threads() -> list[str]:
+    """Job ids (langgraph thread ids) that have checkpoints stored."""
+    conn = _checkpoint_db()
+    if conn is None:
+        return []
+    try:
+        return [r[0] for r in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+    except sqlite3.OperationalError:  # no run has been checkpointed yet
+        return []
+    finally:
+        conn.close()
+
+
+def delete_checkpoints(thread_ids: list[str]) -> None:
+    """Drop the checkpoints and pending writes of these jobs."""
+    conn = _checkpoint_db()
+    if conn is None or not thread_ids:
+        return
+    try:
+        with conn:
+            for table in ("checkpoints", "writes"):
+                conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?",
+                                 [(t,) for t in thread_ids])
+    finally:
+        conn.close()
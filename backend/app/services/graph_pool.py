@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator
+
+
+def _reset_graph(graph: Any) -> None:
+    """Clear per-run state so a pooled TradingAgentsGraph can take a new job.
+
+    LLM clients, tool nodes, the compiled workflow and the memories are kept;
+    those are what make construction expensive.
+    """
+    graph.curr_state = None
+    graph.ticker = None
+    graph.log_states_dict = {}
+
+
+class GraphPool:
+    """Warm, bounded pool of TradingAgentsGraph instances.
+
+    Instances are keyed by everything that shapes their construction
+    (provider, selected analysts, round limits). A job leases an idle
+    instance for its key or builds a new one; on success the instance goes
+    back to the pool. At most `max_idle` instances are kept across all keys,
+    evicting the least recently used key first, which bounds memory.
+    """
+
+    def __init__(self, max_idle: int) -> None:
+        self.max_idle = max_idle
+        self._idle: OrderedDict[Hashable, list[Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.runs = 0
+        self.run_seconds = 0.0
+
+    def _idle_count(self) -> int:
+        return sum(len(v) for v in self._idle.values())
+
+    def _take(self, key: Hashable) -> Any | None:
+        with self._lock:
+            bucket = self._idle.get(key)
+            if not bucket:
+                self.misses += 1
+                return None
+            self.hits += 1
+            graph = bucket.pop()
+            if not bucket:
+                del self._idle[key]
+            return graph
+
+    def _give_back(self, key: Hashable, graph: Any) -> None:
+        if self.max_idle <= 0:
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append(graph)
+            self._idle.move_to_end(key)
+            while self._idle_count() > self.max_idle:
+                oldest_key = next(iter(self._idle))
+                bucket = self._idle[oldest_key]
+                bucket.pop(0)
+                if not bucket:
+                    del self._idle[oldest_key]
+
+    @contextmanager
+    def lease(self, key: Hashable, build: Callable[[], Any]) -> Iterator[tuple[Any, float]]:
+        """Yield (graph, seconds spent constructing it — 0.0 when reused).
+
+        Instances whose run raised are dropped instead of being returned.
+        """
+        graph = self._take(key)
+        build_seconds = 0.0
+        if graph is None:
+            t0 = time.perf_counter()
+            graph = build()
+            build_seconds = time.perf_counter() - t0
+            with self._lock:
+                self.builds += 1
+                self.build_seconds += build_seconds
+
+        t0 = time.perf_counter()
+        yield graph, build_seconds
+        run_seconds = time.perf_counter() - t0
+        with self._lock:
+            self.runs += 1
+            self.run_seconds += run_seconds
+        _reset_graph(graph)
+        self._give_back(key, graph)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle": self._idle_count(),
+                "max_idle": self.max_idle,
+                "hits": self.hits,
+                "misses": self.misses,
+                "builds": self.builds,
+                "build_seconds_total": self.build_seconds,
+                "build_seconds_avg": (self.build_seconds / self.builds) if self.builds else 0.0,
+                "runs": self.runs,
+                "run_seconds_total": self.run_seconds,
+                "run_seconds_avg": (self.run_seconds / self.runs) if self.runs else 0.0,
+            }
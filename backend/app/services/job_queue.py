@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional, Protocol
+
+from app.config import data_path, settings
+from app.services.cache import TTLCache
+from app.services.repository import batch_repo, job_repo, profile_repo
+
+logger = logging.getLogger(__name__)
+
+
+# ── Queue stores ─────────────────────────────────────────────────────────────
+
+class QueueStore(Protocol):
+    async def recover(self) -> None: ...
+    async def enqueue(self, job_id: str, user_id: str, batch_id: str | None = None) -> None: ...
+    async def candidates(self, limit: int) -> list[tuple[str, str, str | None, float]]: ...
+    async def claim(self, job_id: str) -> bool: ...
+    async def complete(self, job_id: str) -> None: ...
+    async def depth(self) -> int: ...
+
+
+def _age_seconds(created_at: str) -> float:
+    ts = datetime.fromisoformat(created_at)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - ts).total_seconds())
+
+
+class SupabaseQueueStore:
+    """Uses the `analysis_jobs` table itself as the queue.
+
+    A job is queued while its row is `pending`; claiming is a conditional
+    pending → running update, so several processes can share the table.
+    """
+
+    async def recover(self) -> None:
+        # Pending rows survive restarts in the table; nothing to rebuild.
+        return None
+
+    async def enqueue(self, job_id: str, user_id: str, batch_id: str | None = None) -> None:
+        # create_job already inserted the row as `pending`
+        return None
+
+    async def candidates(self, limit: int) -> list[tuple[str, str, str | None, float]]:
+        rows = await job_repo.pending_window(limit)
+        return [(r["id"], r["user_id"], r.get("batch_id"), _age_seconds(r["created_at"]))
+                for r in rows]
+
+    async def claim(self, job_id: str) -> bool:
+        return await job_repo.claim(job_id)
+
+    async def complete(self, job_id: str) -> None:
+        return None
+
+    async def depth(self) -> int:
+        return await job_repo.count_pending()
+
+
+class SqliteQueueStore:
+    """Local file-backed queue for single-host deployments and development."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_queue ("
+            " job_id TEXT PRIMARY KEY,"
+            " enqueued_at REAL NOT NULL,"
+            " claimed_at REAL)"
+        )
+        # Queue files created before plan-aware scheduling / batch caps
+        for column in ("user_id", "batch_id"):
+            try:
+                self._conn.execute(f"ALTER TABLE job_queue ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                pass
+        self._lock = threading.Lock()
+
+    def _recover(self) -> None:
+        # Claimed-but-unfinished rows belong to a process that died
+        with self._lock:
+            self._conn.execute("UPDATE job_queue SET claimed_at = NULL")
+
+    def _enqueue(self, job_id: str, user_id: str, batch_id: str | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO job_queue (job_id, user_id, batch_id, enqueued_at)"
+                " VALUES (?, ?, ?, ?)",
+                (job_id, user_id, batch_id, time.time()),
+            )
+
+    def _candidates(self, limit: int) -> list[tuple[str, str, str | None, float]]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, user_id, batch_id, enqueued_at FROM job_queue"
+                " WHERE claimed_at IS NULL ORDER BY enqueued_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(job_id, user_id or "", batch_id, now - enqueued)
+                for job_id, user_id, batch_id, enqueued in rows]
+
+    def _claim(self, job_id: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE job_queue SET claimed_at = ? WHERE job_id = ? AND claimed_at IS NULL",
+                (time.time(), job_id),
+            )
+        return cur.rowcount == 1
+
+    def _complete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+
+    def _depth(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM job_queue WHERE claimed_at IS NULL"
+            ).fetchone()[0]
+
+    async def recover(self) -> None:
+        await asyncio.to_thread(self._recover)
+
+    async def enqueue(self, job_id: str, user_id: str, batch_id: str | None = None) -> None:
+        await asyncio.to_thread(self._enqueue, job_id, user_id, batch_id)
+
+    async def candidates(self, limit: int) -> list[tuple[str, str, str | None, float]]:
+        return await asyncio.to_thread(self._candidates, limit)
+
+    async def claim(self, job_id: str) -> bool:
+        return await asyncio.to_thread(self._claim, job_id)
+
+    async def complete(self, job_id: str) -> None:
+        await asyncio.to_thread(self._complete, job_id)
+
+    async def depth(self) -> int:
+        return await asyncio.to_thread(self._depth)
+
+
+def _make_store() -> QueueStore:
+    if settings.job_queue_backend == "sqlite":
+        return SqliteQueueStore(data_path(settings.job_queue_path))
+    return SupabaseQueueStore()
+
+
+# ── Scheduler ────────────────────────────────────────────────────────────────
+
+# Assumed run length until the scheduler has timed a few jobs
+_DEFAULT_RUN_SECONDS = 300.0
+
+
+class TooManyJobsError(Exception):
+    """The user already has their plan's number of queued and running jobs."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """Fixed number of worker slots draining a persistent job queue.
+
+    A burst of submissions turns into queue depth instead of concurrent graph
+    runs; pending jobs left over from a previous process are picked up on
+    start.
+
+    Slots are shared between plans by start-time fair queueing: each plan
+    has a virtual clock advanced by 1/weight per job it is given, and the
+    next slot goes to the oldest job of the plan that is furthest behind. A
+    plan may hold at most its share of the slots and a user their plan's
+    number of concurrent runs, so a burst from one tier or one account
+    queues behind itself instead of ahead of everyone else. The share is
+    not a reservation: slots no other plan has work for are lent past it,
+    so the share alone never leaves a worker idle, and a job of another plan
+    arriving meanwhile waits for the next run to finish. Batch children
+    queue here too, under the same caps and also no more than their batch's
+    `concurrency` at a time.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, window: int,
+                 weights: dict[str, float], plan_share: dict[str, float],
+                 user_running: dict[str, int], user_active: dict[str, int]) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.window = window
+        self.weights = weights
+        self.plan_share = plan_share
+        self.user_running = user_running
+        self.user_active = user_active
+        self._store: QueueStore | None = None
+        self._runner: Callable[[str], Awaitable[None]] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._pick_lock = asyncio.Lock()
+        self._plans: TTLCache[str] = TTLCache(maxsize=4096, ttl=60)
+        self._batch_caps: TTLCache[int] = TTLCache(maxsize=1024, ttl=300)
+        self._vtime = 0.0
+        self._finish: dict[str, float] = defaultdict(float)
+        self._by_user: dict[str, int] = defaultdict(int)
+        self._by_plan: dict[str, int] = defaultdict(int)
+        self._by_batch: dict[str, int] = defaultdict(int)
+        self._run_avg: float | None = None
+        self._running = 0
+        self._claimed = 0
+        self._borrowed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._last_wait = 0.0
+        # plan → [claimed, wait total, wait max]
+        self._plan_waits: dict[str, list] = defaultdict(lambda: [0, 0.0, 0.0])
+
+    @property
+    def store(self) -> QueueStore:
+        if self._store is None:
+            self._store = _make_store()
+        return self._store
+
+    async def start(self, runner: Callable[[str], Awaitable[None]]) -> None:
+        self._runner = runner
+        self._stopping = False
+        await self.store.recover()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"analysis-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        # wait_for() can swallow a cancel that races a wakeup; the flag ends the loop anyway
+        self._stopping = True
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job_id: str, user_id: str, batch_id: str | None = None) -> None:
+        await self.store.enqueue(job_id, user_id, batch_id)
+        self._wakeup.set()
+
+    # ── admission ─────────────────────────────────────────────────────────
+
+    async def admit(self, user_id: str) -> None:
+        """Raise TooManyJobsError if the user can't queue another job right now.
+
+        A batch or backtest is admitted like one more job; its children then
+        count as active, so the user's next submission waits for them.
+        """
+        plan = await self._plan_of(user_id)
+        limit = self.user_active.get(plan, 1)
+        active = await job_repo.count_active(user_id)
+        if active >= limit:
+            raise TooManyJobsError(self.retry_after(plan, active - limit + 1))
+
+    def retry_after(self, plan: str, ahead: int) -> int:
+        """Seconds until `ahead` of a user's jobs have finished, at their plan's parallelism."""
+        rounds = math.ceil(ahead / max(1, self.user_running.get(plan, 1)))
+        return max(1, math.ceil(rounds * (self._run_avg or _DEFAULT_RUN_SECONDS)))
+
+    async def _plan_of(self, user_id: str) -> str:
+        plan = self._plans.get(user_id)
+        if plan is None:
+            profile = await profile_repo.get(user_id) if user_id else None
+            plan = (profile or {}).get("plan") or "free"
+            self._plans.set(user_id, plan)
+        return plan
+
+    async def _batch_cap(self, batch_id: str) -> int:
+        cap = self._batch_caps.get(batch_id)
+        if cap is None:
+            batch = await batch_repo.get(batch_id)
+            cap = max(1, min((batch or {}).get("concurrency") or 1, settings.batch_max_concurrency))
+            self._batch_caps.set(batch_id, cap)
+        return cap
+
+    # ── slot assignment ───────────────────────────────────────────────────
+
+    def _has_room(self, user_id: str, plan: str, batch_id: str | None, batch_cap: int,
+                  borrow: bool = False) -> bool:
+        plan_cap = max(1, int(self.workers * self.plan_share.get(plan, 1.0)))
+        if self._by_plan[plan] >= plan_cap and not borrow:
+            return False
+        if batch_id is not None and self._by_batch[batch_id] >= batch_cap:
+            return False
+        return self._by_user[user_id] < self.user_running.get(plan, 1)
+
+    def _start_tag(self, plan: str) -> float:
+        # An idle plan doesn't bank credit: it rejoins at the current virtual time
+        return max(self._vtime, self._finish[plan])
+
+    async def _pick(self) -> Optional[tuple[str, str, str | None, str, float]]:
+        """Claim the next job by plan fairness and caps: (job_id, user_id, batch_id, plan, waited)."""
+        async with self._pick_lock:
+            while True:
+                rows = await self.store.candidates(self.window)
+                users = list(dict.fromkeys(user_id for _, user_id, _, _ in rows))
+                plans = dict(zip(users, await asyncio.gather(*map(self._plan_of, users))))
+                batch_ids = list(dict.fromkeys(b for _, _, b, _ in rows if b is not None))
+                caps = dict(zip(batch_ids, await asyncio.gather(*map(self._batch_cap, batch_ids))))
+                # Oldest eligible job of each plan. A plan at its share may
+                # borrow a slot only when no other plan has work for it.
+                for borrow in (False, True):
+                    heads: dict[str, tuple[str, str, str | None, float]] = {}
+                    for job_id, user_id, batch_id, waited in rows:
+                        plan = plans[user_id]
+                        if plan not in heads and self._has_room(user_id, plan, batch_id,
+                                                                caps.get(batch_id, 1), borrow):
+                            heads[plan] = (job_id, user_id, batch_id, waited)
+                    if heads:
+                        break
+                else:
+                    return None
+                plan = min(heads, key=lambda p: (self._start_tag(p), -self.weights.get(p, 1.0)))
+                job_id, user_id, batch_id, waited = heads[plan]
+                if await self.store.claim(job_id):
+                    start = self._start_tag(plan)
+                    self._vtime = start
+                    self._finish[plan] = start + 1.0 / self.weights.get(plan, 1.0)
+                    if batch_id is not None:
+                        self._by_batch[batch_id] += 1
+                    self._by_user[user_id] += 1
+                    self._by_plan[plan] += 1
+                    self._borrowed += borrow
+                    return job_id, user_id, batch_id, plan, waited
+                # Lost the race to another process — look again
+
+    def _release(self, user_id: str, batch_id: str | None, plan: str, seconds: float) -> None:
+        for counts, key in ((self._by_user, user_id), (self._by_batch, batch_id)):
+            if key is None:
+                continue
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
+        self._by_plan[plan] -= 1
+        self._run_avg = seconds if self._run_avg is None else 0.8 * self._run_avg + 0.2 * seconds
+
+    async def _worker(self, slot: int) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                picked = await self._pick()
+            except Exception:
+                logger.exception("Job queue claim failed (slot %d)", slot)
+                picked = None
+            if picked is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, user_id, batch_id, plan, waited = picked
+            self._record_wait(plan, waited)
+            self._running += 1
+            t0 = time.monotonic()
+            try:
+                await self._runner(job_id)
+            except Exception:
+                logger.exception("Job %s crashed in worker slot %d", job_id, slot)
+            finally:
+                self._running -= 1
+                self._release(user_id, batch_id, plan, time.monotonic() - t0)
+                await self.store.complete(job_id)
+                # A freed plan / user cap may make a skipped job eligible
+                self._wakeup.set()
+
+    def _record_wait(self, plan: str, waited: float) -> None:
+        self._claimed += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._last_wait = waited
+        waits = self._plan_waits[plan]
+        waits[0] += 1
+        waits[1] += waited
+        waits[2] = max(waits[2], waited)
+
+    async def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "depth": await self.store.depth(),
+            "claimed_total": self._claimed,
+            "borrowed_total": self._borrowed,
+            "wait_seconds_last": self._last_wait,
+            "wait_seconds_avg": (self._wait_total / self._claimed) if self._claimed else 0.0,
+            "wait_seconds_max": self._wait_max,
+            "run_seconds_avg": self._run_avg or 0.0,
+            "plans": {
+                plan: {
+                    "running": self._by_plan.get(plan, 0),
+                    "claimed": claimed,
+                    "wait_seconds_avg": total / claimed if claimed else 0.0,
+                    "wait_seconds_max": worst,
+                }
+                for plan, (claimed, total, worst) in self._plan_waits.items()
+            },
+        }
+
+
+# Singleton
+job_scheduler = JobScheduler(
+    workers=settings.analysis_workers,
+    poll_interval=settings.job_queue_poll_interval,
+    window=settings.job_queue_window,
+    weights=settings.plan_weights,
+    plan_share=settings.plan_max_share,
+    user_running=settings.user_max_running,
+    user_active=settings.user_max_active,
+)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from app.config import settings
+from app.models import JobStatus, ProgressStep, StepStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LiveSnapshot:
+    status: JobStatus
+    version: int
+    steps: list[ProgressStep]
+
+
+class LiveStateBackend(Protocol):
+    """Where running jobs publish progress so any worker can serve it."""
+
+    def start(self, job_id: str, steps: list[ProgressStep], status: JobStatus) -> None: ...
+    def apply(self, job_id: str, event: dict, content: Optional[str] = None) -> None: ...
+    def finish(self, job_id: str, status: JobStatus) -> None: ...
+    async def load(self, job_id: str) -> Optional[LiveSnapshot]: ...
+
+
+class MemoryLiveState:
+    """Single-process deployments: the owning worker already holds live state."""
+
+    def start(self, job_id: str, steps: list[ProgressStep], status: JobStatus) -> None:
+        return None
+
+    def apply(self, job_id: str, event: dict, content: Optional[str] = None) -> None:
+        return None
+
+    def finish(self, job_id: str, status: JobStatus) -> None:
+        return None
+
+    async def load(self, job_id: str) -> Optional[LiveSnapshot]:
+        return None
+
+
+class RedisLiveState:
+    """Live progress in Redis, shared by every uvicorn worker.
+
+    Layout per job (all keys expire):
+      live:{job}            hash — status, version, order, and per step
+                            `s:{key}` status / `l:{key}` label / `v:{key}` version
+      live:{job}:c:{key}    step content; growth is written with APPEND
+
+    Publishing never blocks the graph thread: events go onto a queue drained
+    by a writer thread that pipelines whatever has accumulated, so a content
+    delta costs one APPEND rather than rewriting the whole step. The writer
+    tracks how many characters of each step Redis holds; an append whose
+    `offset` doesn't match (a dropped or failed write, a key left by a crashed
+    run) rewrites the step from the full content passed with the event.
+    """
+
+    def __init__(self, url: str, ttl: int, finished_ttl: int = 300) -> None:
+        import redis
+        import redis.asyncio as aredis
+
+        self._sync = redis.Redis.from_url(url)
+        self._async = aredis.Redis.from_url(url)
+        self._ttl = ttl
+        self._finished_ttl = finished_ttl
+        self._queue: queue.Queue = queue.Queue(maxsize=10_000)
+        # Characters of each step's content held in Redis (-1: unknown), per
+        # started job; touched only by the writer thread
+        self._lengths: dict[str, dict[str, int]] = {}
+        self._writer = threading.Thread(target=self._drain, name="live-state-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"live:{job_id}"
+
+    def _content_key(self, job_id: str, step_key: str) -> str:
+        return f"{self._key(job_id)}:c:{step_key}"
+
+    def _put(self, op: tuple) -> None:
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            logger.warning("Live state queue full; dropping %s for job %s", op[0], op[1])
+
+    def start(self, job_id: str, steps: list[ProgressStep], status: JobStatus) -> None:
+        self._put(("start", job_id, steps, status))
+
+    def apply(self, job_id: str, event: dict, content: Optional[str] = None) -> None:
+        self._put(("apply", job_id, event, content))
+
+    def finish(self, job_id: str, status: JobStatus) -> None:
+        self._put(("finish", job_id, status))
+
+    def _write(self, pipe, op: tuple) -> None:
+        kind, job_id = op[0], op[1]
+        key = self._key(job_id)
+        if kind == "start":
+            steps, status = op[2], op[3]
+            mapping = {"status": status.value, "version": 0,
+                       "order": json.dumps([s.key for s in steps])}
+            lengths = self._lengths[job_id] = {}
+            for s in steps:
+                mapping[f"s:{s.key}"] = s.status.value
+                mapping[f"l:{s.key}"] = s.label
+                mapping[f"v:{s.key}"] = 0
+                # A resumed job starts with content; a crashed run may have left some
+                ckey = self._content_key(job_id, s.key)
+                if s.content is None:
+                    pipe.delete(ckey)
+                else:
+                    pipe.set(ckey, s.content, ex=self._ttl)
+                lengths[s.key] = len(s.content or "")
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self._ttl)
+        elif kind == "apply":
+            event = op[2]
+            step = event["key"]
+            pipe.hset(key, mapping={
+                f"s:{step}": event["status"],
+                f"v:{step}": event["version"],
+                "version": event["version"],
+            })
+            ckey = self._content_key(job_id, step)
+            lengths = self._lengths.setdefault(job_id, {})
+            if "append" in event and lengths.get(step) == event["offset"]:
+                pipe.append(ckey, event["append"])
+                pipe.expire(ckey, self._ttl)
+                lengths[step] += len(event["append"])
+            elif "append" in event or "content" in event:
+                text = event.get("content", op[3])
+                if text is None:  # nothing to repair from; leave it for the next rewrite
+                    lengths[step] = -1
+                else:
+                    pipe.set(ckey, text, ex=self._ttl)
+                    lengths[step] = len(text)
+        elif kind == "finish":
+            pipe.hset(key, "status", op[2].value)
+            pipe.expire(key, self._finished_ttl)
+            # The step keys are the job's `order` (kept here since its start)
+            for step in self._lengths.pop(job_id, ()):
+                pipe.expire(self._content_key(job_id, step), self._finished_ttl)
+
+    def _drain(self) -> None:
+        while True:
+            ops = [self._queue.get()]
+            while True:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                pipe = self._sync.pipeline(transaction=False)
+                for op in ops:
+                    self._write(pipe, op)
+                pipe.execute()
+            except Exception:
+                logger.exception("Live state write failed (%d ops dropped)", len(ops))
+                # What Redis holds for these steps is unknown now
+                for op in ops:
+                    if op[0] == "apply" and op[1] in self._lengths:
+                        self._lengths[op[1]][op[2]["key"]] = -1
+
+    async def load(self, job_id: str) -> Optional[LiveSnapshot]:
+        key = self._key(job_id)
+        raw = await self._async.hgetall(key)
+        if not raw:
+            return None
+        meta = {k.decode(): v.decode() for k, v in raw.items()}
+        order = json.loads(meta.get("order", "[]"))
+        contents = await self._async.mget([self._content_key(job_id, k) for k in order]) if order else []
+        steps = [
+            ProgressStep(
+                key=k,
+                label=meta.get(f"l:{k}", k),
+                status=StepStatus(meta.get(f"s:{k}", "pending")),
+                content=c.decode() if c is not None else None,
+            )
+            for k, c in zip(order, contents)
+        ]
+        return LiveSnapshot(
+            status=JobStatus(meta.get("status", "running")),
+            version=int(meta.get("version", 0)),
+            steps=steps,
+        )
+
+
+def _make_backend() -> LiveStateBackend:
+    if settings.live_state_backend == "redis":
+        return RedisLiveState(settings.redis_url, ttl=settings.live_state_ttl)
+    return MemoryLiveState()
+
+
+# Singleton
+live_state: LiveStateBackend = _make_backend()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+from app.config import data_path, settings
+
+logger = logging.getLogger(__name__)
+
+# How long each kind of vendor data stays fresh (seconds)
+_TTL_BY_METHOD = {
+    "get_stock_data":        6 * 3600,
+    "get_indicators":        6 * 3600,
+    "get_fundamentals":      24 * 3600,
+    "get_balance_sheet":     24 * 3600,
+    "get_cashflow":          24 * 3600,
+    "get_income_statement":  24 * 3600,
+    "get_insider_sentiment": 6 * 3600,
+    "get_insider_transactions": 6 * 3600,
+    "get_news":              3600,
+    "get_global_news":       3600,
+}
+_DEFAULT_TTL = 3600
+
+# Vendors report failures and empty results as ordinary strings ("Error
+# fetching ...", "No data found for ...", rate-limit notices). Those are kept
+# just long enough to spare a batch's other jobs the same failing call.
+_FAILURE_TTL = 60
+_FAILURE = re.compile(
+    r"^\s*(?:error\b|failed\b|exception\b|no (?:\w+ ){0,3}(?:data|news|results?)\b"
+    r"|invalid api call)|rate limit|too many requests|api call frequency",
+    re.I,
+)
+
+
+def _looks_failed(value: str) -> bool:
+    # Only the head: a real report may well discuss "errors" further down
+    return _FAILURE.search(value[:300]) is not None
+
+
+class MarketDataCache:
+    """Disk-backed cache of vendor tool results shared by every job on the host.
+
+    TradingAgents' tools all go through `route_to_vendor(method, *args)`, so
+    a wrapped router caches their (string) results keyed by method, vendor
+    and arguments — symbol, date range, indicator. Entries expire per data
+    type and the least recently used are evicted once the file passes
+    `max_bytes`. Concurrent misses for the same key wait for one fetch.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS market_cache ("
+            " key TEXT PRIMARY KEY, method TEXT NOT NULL, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS market_cache_lru ON market_cache (last_used)"
+        )
+        self._conn.commit()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetching: Dict[str, threading.Lock] = {}
+        self._bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM market_cache"
+        ).fetchone()[0]
+        self.evictions = 0
+        self.failures = 0
+        # method → [hits, misses, hit seconds, miss seconds]
+        self._calls: Dict[str, list] = defaultdict(lambda: [0, 0, 0.0, 0.0])
+
+    @staticmethod
+    def key(method: str, vendor: str, args: tuple, kwargs: dict) -> str:
+        payload = json.dumps([method, vendor, args, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM market_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._delete(key)
+                return None
+            self._conn.execute("UPDATE market_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, method: str, value: str, ttl: float | None = None) -> None:
+        now = time.time()
+        size = len(value.encode())
+        if ttl is None:
+            ttl = _TTL_BY_METHOD.get(method, _DEFAULT_TTL)
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO market_cache (key, method, value, size, expires_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, value, size, now + ttl, now),
+            )
+            self._bytes += size
+            self._evict(now)
+            self._conn.commit()
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("SELECT size FROM market_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM market_cache WHERE key = ?", (key,))
+            self._bytes -= row[0]
+
+    def _evict(self, now: float) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        self._conn.execute("DELETE FROM market_cache WHERE expires_at <= ?", (now,))
+        self._bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM market_cache"
+        ).fetchone()[0]
+        # Then least recently used, down to 90% so we don't evict on every write
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM market_cache ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM market_cache WHERE key = ?", (key,))
+                self._bytes -= size
+                self.evictions += 1
+                if self._bytes <= target:
+                    break
+
+    def fetch(self, method: str, vendor: str, args: tuple, kwargs: dict,
+              load: Callable[[], Any]) -> Any:
+        """Cached result of `load()` for this call, fetching it at most once at a time."""
+        key = self.key(method, vendor, args, kwargs)
+        t0 = time.perf_counter()
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                gate = self._fetching.setdefault(key, threading.Lock())
+            try:
+                with gate:
+                    value = self.get(key)  # another thread may have just fetched it
+                    if value is None:
+                        value = load()
+                        if isinstance(value, str) and value:
+                            if _looks_failed(value):
+                                with self._lock:
+                                    self.failures += 1
+                                self.set(key, method, value, ttl=_FAILURE_TTL)
+                            else:
+                                self.set(key, method, value)
+                        self._record(method, hit=False, seconds=time.perf_counter() - t0)
+                        return value
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+        self._record(method, hit=True, seconds=time.perf_counter() - t0)
+        return value
+
+    def _record(self, method: str, hit: bool, seconds: float) -> None:
+        with self._lock:
+            calls = self._calls[method]
+            calls[0 if hit else 1] += 1
+            calls[2 if hit else 3] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            methods = {
+                m: {
+                    "hits": h,
+                    "misses": mi,
+                    "avg_hit_ms": round(hs / h * 1000, 2) if h else None,
+                    "avg_miss_ms": round(ms / mi * 1000, 2) if mi else None,
+                }
+                for m, (h, mi, hs, ms) in self._calls.items()
+            }
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "failures": self.failures,
+                "methods": methods,
+            }
+
+
+def _vendor_for(interface: Any, method: str) -> str:
+    """Vendor TradingAgents' config routes `method` to (part of the cache key)."""
+    try:
+        category = interface.get_category_for_method(method)
+        return str(interface.get_vendor(category, method))
+    except Exception:
+        return "default"
+
+
+def install(cache: MarketDataCache) -> bool:
+    """Route every TradingAgents tool through the cache.
+
+    Tool modules import `route_to_vendor` by name, so each module-level
+    reference to it is replaced. Returns False if this tradingagents build
+    has no vendor router.
+    """
+    try:
+        from tradingagents.dataflows import interface
+    except ImportError:
+        return False
+    original = getattr(interface, "route_to_vendor", None)
+    if original is None or getattr(original, "__wrapped__", None) is not None:
+        return original is not None
+
+    @functools.wraps(original)
+    def route_to_vendor(method: str, *args, **kwargs):
+        return cache.fetch(method, _vendor_for(interface, method), args, kwargs,
+                           lambda: original(method, *args, **kwargs))
+
+    for name, module in list(sys.modules.items()):
+        if name.startswith("tradingagents") and getattr(module, "route_to_vendor", None) is original:
+            module.route_to_vendor = route_to_vendor
+    logger.info("Market data cache installed at %s", cache.path)
+    return True
+
+
+# Opened on first use rather than at import, so importing the app never
+# creates the database file
+_market_cache: MarketDataCache | None = None
+_market_cache_lock = threading.Lock()
+
+
+def get_market_cache() -> MarketDataCache | None:
+    """The host's market data cache, or None if disabled."""
+    global _market_cache
+    if not settings.market_cache_enabled:
+        return None
+    if _market_cache is None:
+        with _market_cache_lock:
+            if _market_cache is None:
+                _market_cache = MarketDataCache(data_path(settings.market_cache_path),
+                                                settings.market_cache_max_mb * 1024 * 1024)
+    return _market_cache
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from collections import defaultdict
+from typing import Iterable
+
+# Minimal Prometheus text-format instruments. Counters and histograms are
+# recorded as things happen; the services' existing stats() dicts are turned
+# into gauges when /metrics is scraped.
+
+_PREFIX = "tradingagents"
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = f"{_PREFIX}_{name}"
+        self.help = help
+        self.label_names = labels
+        self._values: dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] += amount
+
+    def drain(self) -> dict[tuple, float]:
+        with self._lock:
+            values, self._values = dict(self._values), defaultdict(float)
+        return values
+
+    def merge(self, values: dict[tuple, float]) -> None:
+        with self._lock:
+            for labels, value in values.items():
+                self._values[labels] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for labels, value in self._values.items():
+                yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                                               0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)) -> None:
+        self.name = f"{_PREFIX}_{name}"
+        self.help = help
+        self.label_names = labels
+        self.buckets = buckets
+        # labels → [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def drain(self) -> dict[tuple, list[float]]:
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series: dict[tuple, list[float]]) -> None:
+        with self._lock:
+            for labels, counts in series.items():
+                mine = self._series.setdefault(labels, [0.0] * len(counts))
+                for i, count in enumerate(counts):
+                    mine[i] += count
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for labels, series in self._series.items():
+                names = self.label_names + ("le",)
+                running = 0.0
+                for bound, count in zip(self.buckets, series):
+                    running += count
+                    yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {running}"
+                running += series[len(self.buckets)]
+                yield f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {running}"
+                yield f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}"
+                yield f"{self.name}_count{_labels(self.label_names, labels)} {running}"
+
+
+def _gauges(section: str, stats: dict) -> Iterable[str]:
+    """Numeric stats as gauges; one level of nested dicts becomes a `key` label."""
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            yield f"{_PREFIX}_{section}_{key} {value}"
+        elif isinstance(value, dict):
+            for sub, inner in value.items():
+                if isinstance(inner, dict):
+                    for field, v in inner.items():
+                        if isinstance(v, (int, float)) and not isinstance(v, bool):
+                            yield f'{_PREFIX}_{section}_{key}_{field}{{key="{sub}"}} {v}'
+
+
+# ── Instruments ──────────────────────────────────────────────────────────────
+
+http_latency = Histogram(
+    "http_request_duration_seconds", "API request latency",
+    ("method", "route", "status"),
+)
+node_latency = Histogram(
+    "graph_node_duration_seconds", "Wall time of a TradingAgents graph node", ("node",),
+)
+tool_latency = Histogram(
+    "tool_call_duration_seconds", "Latency of agent tool calls", ("tool",),
+)
+graph_build = Histogram(
+    "graph_build_duration_seconds", "Construction of a TradingAgents graph (pool miss)",
+    ("graph",),
+)
+llm_calls = Counter("llm_calls_total", "LLM calls made by graph runs", ("model",))
+llm_tokens = Counter("llm_tokens_total", "LLM tokens used by graph runs", ("model", "kind"))
+llm_cost = Counter("llm_cost_usd_total", "Estimated LLM spend in USD", ("model",))
+llm_retries = Counter("llm_retries_total", "Retried LLM calls", ("model",))
+
+_INSTRUMENTS = (http_latency, node_latency, tool_latency, graph_build,
+                llm_calls, llm_tokens, llm_cost, llm_retries)
+
+
+def drain() -> dict[str, dict]:
+    """Take everything recorded since the last drain (worker processes ship this to the API)."""
+    return {i.name: i.drain() for i in _INSTRUMENTS}
+
+
+def merge(recorded: dict[str, dict]) -> None:
+    """Add what a worker process recorded into this process's instruments."""
+    for instrument in _INSTRUMENTS:
+        if instrument.name in recorded:
+            instrument.merge(recorded[instrument.name])
+
+
+def render(sections: dict[str, dict]) -> str:
+    """Exposition text: recorded instruments plus a gauge per numeric stat."""
+    lines: list[str] = []
+    for instrument in _INSTRUMENTS:
+        lines.extend(instrument.render())
+    for section, stats in sections.items():
+        lines.extend(_gauges(section, stats or {}))
+    return "\n".join(lines) + "\n"
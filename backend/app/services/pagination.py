@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import base64
+import json
+
+# Job history is paged by keyset on (created_at, id), newest first. The
+# cursor handed to clients is the position of the last row they saw, opaque
+# so its shape can change without breaking them.
+
+
+def encode_cursor(created_at: str, job_id: str) -> str:
+    raw = json.dumps([str(created_at), job_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """(created_at, id) of a cursor; ValueError if it wasn't made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(created_at, str) or not isinstance(job_id, str):
+        raise ValueError("invalid cursor")
+    return created_at, job_id
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from app.config import settings
+from app.models import StepMetrics, StepStatus
+from app.services import metrics
+from app.services.progress_store import ProgressStore
+
+if TYPE_CHECKING:
+    from app.models import AnalysisJob
+
+logger = logging.getLogger(__name__)
+
+
+# ── Worker process ───────────────────────────────────────────────────────────
+
+def _worker_main(conn: Any) -> None:
+    """Pool process: import the engine once, then run the jobs the API sends.
+
+    Protocol (tuples over a duplex pipe). API → worker: ("run", job, steps),
+    ("stop", reason, by_user), ("exit",). Worker → API: ("progress", event)
+    for every ProgressStore change, ("metrics", recorded) after each job,
+    then one of ("done", result), ("cancelled",) or ("error", traceback).
+    """
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(processName)s %(name)s: %(message)s")
+    from app.models import AnalysisJob, ProgressStep
+    from app.services.analysis_service import _Cancelled, _CancelToken, analysis_service
+    from app.services.engine import load_engine
+
+    load_engine()
+    send_lock = threading.Lock()
+    inbox: queue.Queue = queue.Queue()
+    current: list[Optional[_CancelToken]] = [None]
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    def read() -> None:
+        # Beside the graph thread, so a stop can land mid-run
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = ("exit",)
+            if message[0] == "stop":
+                if current[0] is not None:
+                    current[0].stop(message[1], message[2])
+                continue
+            token = current[0] = _CancelToken() if message[0] == "run" else None
+            inbox.put((message, token))
+            if message[0] == "exit":
+                return
+
+    threading.Thread(target=read, name="pool-reader", daemon=True).start()
+    while True:
+        message, token = inbox.get()
+        if message[0] == "exit":
+            return
+        _, job_data, steps = message
+        progress = ProgressStore(
+            [ProgressStep.model_validate(s) for s in steps],
+            on_change=lambda event: send(("progress", event)),
+        )
+        try:
+            result = analysis_service._run_sync(AnalysisJob.model_validate(job_data),
+                                                progress, token)
+            reply: tuple = ("done", result.model_dump())
+        except _Cancelled:
+            reply = ("cancelled",)
+        except Exception:
+            reply = ("error", traceback.format_exc())
+        send(("metrics", metrics.drain()))
+        send(reply)
+
+
+def _apply(progress: ProgressStore, event: dict) -> None:
+    """Replay a worker's ProgressStore change on the API's copy."""
+    key = event["key"]
+    if "metrics" in event:
+        progress.set_metrics(key, StepMetrics.model_validate(event["metrics"]))
+        return
+    content = event.get("content")
+    if "append" in event:
+        content = (progress.content_of(key) or "")[:event["offset"]] + event["append"]
+    progress.update(key, StepStatus(event["status"]), content)
+
+
+# ── Pool ─────────────────────────────────────────────────────────────────────
+
+class _Worker:
+    def __init__(self, ctx: Any, number: int) -> None:
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,),
+                                   name=f"analysis-proc-{number}", daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+        self.killed = False
+
+    def close(self, timeout: float = 5.0) -> None:
+        try:
+            self.conn.send(("exit",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessPool:
+    """Graph runs in worker processes instead of the API process's threads.
+
+    Indicator math, JSON handling and LLM client work then no longer share a
+    GIL with request handling, and a run that crashes or leaks takes down
+    only its worker. Workers are spawned with the engine already imported
+    and are replaced after `max_jobs` runs to bound memory growth. Each run
+    keeps a ProgressStore replica in its worker; every change to it is sent
+    back and replayed on the API's store, so streaming, persistence and the
+    watchdog see the same events as a threaded run.
+    """
+
+    def __init__(self, size: int, max_jobs: int) -> None:
+        self.size = size
+        self.max_jobs = max_jobs
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: asyncio.Queue[_Worker] | None = None
+        self._busy: set[_Worker] = set()
+        # One thread per running job just relays its worker's messages
+        self._relays = ThreadPoolExecutor(max_workers=size, thread_name_prefix="proc-relay")
+        self.spawned = 0
+        self.recycled = 0
+        self.crashed = 0
+        self.killed = 0
+        self.runs = 0
+
+    def _spawn(self) -> _Worker:
+        self.spawned += 1
+        return _Worker(self._ctx, self.spawned)
+
+    def start(self) -> None:
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(self._spawn())
+        logger.info("Started %d analysis worker processes", self.size)
+
+    async def stop(self) -> None:
+        if self._idle is None:
+            return
+        workers = list(self._busy)
+        while not self._idle.empty():
+            workers.append(self._idle.get_nowait())
+        self._idle = None
+        self._busy.clear()
+        await asyncio.gather(*(asyncio.to_thread(w.close) for w in workers))
+        self._relays.shutdown(wait=False)
+
+    async def run(self, job: AnalysisJob, progress: ProgressStore, token: Any,
+                  on_start: Optional[Callable[[], None]] = None) -> Optional[dict]:
+        """Run a job in a worker; its result as a dict, or None if it stopped on `token`.
+
+        `token` is the job's cancel token. A worker that doesn't stop within
+        `cancel_grace` is killed. `on_start` is called once a worker has been
+        acquired and the job is about to be sent. Raises RuntimeError if the
+        run failed or its process died.
+        """
+        self.start()
+        worker = await self._idle.get()
+        if not worker.process.is_alive():
+            self.crashed += 1
+            worker = await asyncio.to_thread(self._spawn)
+        self._busy.add(worker)
+        worker.jobs += 1
+        self.runs += 1
+        try:
+            if on_start is not None:
+                on_start()
+            reply = await asyncio.get_running_loop().run_in_executor(
+                self._relays, self._relay, worker, job, progress, token,
+            )
+        finally:
+            self._busy.discard(worker)
+            await self._release(worker)
+        if reply[0] == "done":
+            return reply[1]
+        if reply[0] == "cancelled":
+            return None
+        raise RuntimeError(f"Analysis failed in worker process:\n{reply[1]}")
+
+    def _relay(self, worker: _Worker, job: AnalysisJob, progress: ProgressStore,
+               token: Any) -> tuple:
+        """Send the job, then apply the worker's messages until its final reply."""
+        worker.conn.send(("run", job.model_dump(mode="json"),
+                          [s.model_dump(mode="json") for s in progress.snapshot()]))
+        stopping_since = None
+        while True:
+            if token.is_set() and stopping_since is None:
+                worker.conn.send(("stop", token.reason, token.by_user))
+                stopping_since = time.monotonic()
+            if stopping_since is not None and time.monotonic() - stopping_since > settings.cancel_grace:
+                logger.warning("Job %s: killing unresponsive worker pid %s",
+                               job.id, worker.process.pid)
+                self.killed += 1
+                worker.killed = True
+                worker.process.kill()
+                return ("cancelled",)
+            try:
+                if not worker.conn.poll(0.5):
+                    if not worker.process.is_alive():
+                        raise EOFError
+                    continue
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join(1.0)
+                raise RuntimeError(f"Worker process {worker.process.pid} exited "
+                                   f"(code {worker.process.exitcode}) during the run")
+            if message[0] == "progress":
+                _apply(progress, message[1])
+            elif message[0] == "metrics":
+                metrics.merge(message[1])
+            else:
+                return message
+
+    async def _release(self, worker: _Worker) -> None:
+        if self._idle is None:  # shutting down
+            await asyncio.to_thread(worker.close)
+            return
+        if worker.process.is_alive() and worker.jobs < self.max_jobs:
+            self._idle.put_nowait(worker)
+            return
+        if worker.process.is_alive():
+            self.recycled += 1
+        elif not worker.killed:
+            self.crashed += 1
+        replacement = await asyncio.to_thread(self._spawn)
+        self._idle.put_nowait(replacement)
+        asyncio.get_running_loop().run_in_executor(None, worker.close)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "busy": len(self._busy),
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "runs": self.runs,
+            "spawned": self.spawned,
+            "recycled": self.recycled,
+            "crashed": self.crashed,
+            "killed": self.killed,
+        }
+
+
+# Singleton (None when graph runs stay on the API's thread pool)
+process_pool: ProcessPool | None = (
+    ProcessPool(settings.analysis_workers, settings.process_max_jobs)
+    if settings.analysis_executor == "process" else None
+)
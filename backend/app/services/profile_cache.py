@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+from app.config import settings
+from app.services.cache import TTLCache
+from app.services.repository import credit_repo, profile_repo
+
+logger = logging.getLogger(__name__)
+
+# The profile (credit balance included) and the credit history are read on
+# nearly every page load but change only when the user edits their profile or
+# a job charges or refunds a credit. Both are cached per user and dropped by
+# those writes. Every user also has a generation number, bumped by each
+# invalidation; an entry is stored with the generation read before its rows
+# were loaded and only served while that is still current, so a load that
+# raced a charge can never put the pre-charge balance back.
+
+
+class ProfileCacheBackend(Protocol):
+    """Where cached entries and per-user generations live."""
+
+    async def read(self, key: str, gen_key: str) -> tuple[Optional[str], int]: ...
+    async def write(self, key: str, value: str, ttl: float) -> None: ...
+    async def bump(self, gen_key: str, keys: list[str]) -> None: ...
+
+
+class MemoryProfileCache:
+    """Per-process: each uvicorn worker caches and invalidates on its own."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._entries: TTLCache[str] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Outlive any entry by far, so a generation is never forgotten while
+        # an entry or an in-flight load still depends on it
+        self._gens: TTLCache[int] = TTLCache(maxsize=maxsize, ttl=max(ttl * 10, 600))
+        self._lock = threading.Lock()
+
+    async def read(self, key: str, gen_key: str) -> tuple[Optional[str], int]:
+        return self._entries.get(key), self._gens.get(gen_key) or 0
+
+    async def write(self, key: str, value: str, ttl: float) -> None:
+        self._entries.set(key, value, ttl)
+
+    async def bump(self, gen_key: str, keys: list[str]) -> None:
+        with self._lock:
+            self._gens.set(gen_key, (self._gens.get(gen_key) or 0) + 1)
+        for key in keys:
+            self._entries.pop(key)
+
+
+class RedisProfileCache:
+    """Shared by every uvicorn worker: a charge seen by one is seen by all."""
+
+    def __init__(self, url: str, ttl: float) -> None:
+        import redis.asyncio as aredis
+
+        self._redis = aredis.Redis.from_url(url)
+        self._gen_ttl = int(max(ttl * 10, 600))
+
+    async def read(self, key: str, gen_key: str) -> tuple[Optional[str], int]:
+        value, gen = await self._redis.mget([key, gen_key])
+        return (value.decode() if value is not None else None), int(gen or 0)
+
+    async def write(self, key: str, value: str, ttl: float) -> None:
+        await self._redis.set(key, value, px=int(ttl * 1000))
+
+    async def bump(self, gen_key: str, keys: list[str]) -> None:
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.incr(gen_key)
+        pipe.expire(gen_key, self._gen_ttl)
+        pipe.delete(*keys)
+        await pipe.execute()
+
+
+def _etag(value: Any) -> str:
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+class ProfileCache:
+    """Read-through cache of GET /api/profile and GET /api/profile/credits.
+
+    Lookups return (etag, payload); the ETag is a hash of the payload, so it
+    stays the same across refills and workers until the data itself changes.
+    """
+
+    def __init__(self, backend: ProfileCacheBackend, ttl: float) -> None:
+        self._backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @staticmethod
+    def _keys(user_id: str) -> tuple[str, str, str]:
+        base = f"profile_cache:{user_id}"
+        return f"{base}:profile", f"{base}:credits", f"{base}:gen"
+
+    async def profile(self, user_id: str) -> Optional[tuple[str, dict]]:
+        key, _, gen_key = self._keys(user_id)
+        return await self._read(key, gen_key, lambda: profile_repo.get(user_id))
+
+    async def credits(self, user_id: str) -> tuple[str, list[dict]]:
+        _, key, gen_key = self._keys(user_id)
+        return await self._read(key, gen_key,
+                                lambda: credit_repo.list_for_user(user_id, limit=50))
+
+    async def _read(self, key: str, gen_key: str,
+                    load: Callable[[], Awaitable[Any]]) -> Optional[tuple[str, Any]]:
+        gen = 0
+        try:
+            raw, gen = await self._backend.read(key, gen_key)
+            if raw is not None:
+                entry = json.loads(raw)
+                if entry["gen"] == gen:
+                    self.hits += 1
+                    return entry["etag"], entry["value"]
+        except Exception:
+            # A cache outage must not take the profile page down with it
+            self.errors += 1
+            logger.exception("Profile cache read failed for %s", key)
+        self.misses += 1
+        value = await load()
+        if value is None:
+            return None
+        etag = _etag(value)
+        try:
+            await self._backend.write(key, json.dumps(
+                {"gen": gen, "etag": etag, "value": value}, default=str,
+            ), self.ttl)
+        except Exception:
+            self.errors += 1
+            logger.exception("Profile cache write failed for %s", key)
+        return etag, value
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached profile and credit history after a write."""
+        profile_key, credits_key, gen_key = self._keys(user_id)
+        self.invalidations += 1
+        try:
+            await self._backend.bump(gen_key, [profile_key, credits_key])
+        except Exception:
+            self.errors += 1
+            logger.exception("Profile cache invalidation failed for user %s", user_id)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": settings.profile_cache_backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def _make_backend() -> ProfileCacheBackend:
+    if settings.profile_cache_backend == "redis":
+        return RedisProfileCache(settings.redis_url, ttl=settings.profile_cache_ttl)
+    return MemoryProfileCache(settings.profile_cache_size, ttl=settings.profile_cache_ttl)
+
+
+# Singleton
+profile_cache = ProfileCache(_make_backend(), ttl=settings.profile_cache_ttl)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+
+from app.config import settings
+from app.services.progress_store import ProgressStore
+from app.services.repository import job_repo
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressPersister:
+    """Write-behind persistence of running jobs' progress to `analysis_jobs`.
+
+    Changes only mark a job dirty; a background task flushes dirty jobs every
+    `interval` seconds, or right away when a step completes or too many jobs
+    are waiting. Each flush sends just the steps touched since the previous
+    one, so a job costs one small write per interval no matter how many graph
+    chunks it produced.
+
+    Jobs that go quiet (a long LLM call) still get `progress_updated_at`
+    touched every `heartbeat` seconds, so a restarted worker can tell them
+    apart from runs orphaned by a crash.
+    """
+
+    def __init__(self, interval: float, max_dirty: int, heartbeat: float) -> None:
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.heartbeat = heartbeat
+        self._stores: Dict[str, ProgressStore] = {}
+        self._flushed: Dict[str, int] = {}  # job id → last persisted version
+        self._written: Dict[str, float] = {}  # job id → monotonic time of last write
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self.flushes = 0
+        self.failures = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="progress-persister")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def track(self, job_id: str, store: ProgressStore) -> None:
+        """Start following a job whose initial progress is already stored."""
+        with self._lock:
+            self._stores[job_id] = store
+            self._flushed[job_id] = store.version
+            self._written[job_id] = time.monotonic()
+
+    def untrack(self, job_id: str) -> None:
+        """Stop following a job (its final state is written by the runner)."""
+        with self._lock:
+            self._stores.pop(job_id, None)
+            self._flushed.pop(job_id, None)
+            self._written.pop(job_id, None)
+            self._dirty.discard(job_id)
+
+    def mark(self, job_id: str, urgent: bool = False) -> None:
+        """Note that a job changed. Thread-safe; never blocks on I/O."""
+        with self._lock:
+            if job_id not in self._stores:
+                return
+            self._dirty.add(job_id)
+            urgent = urgent or len(self._dirty) >= self.max_dirty
+        if urgent and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self, job_ids: list[str] | None = None) -> None:
+        """Write dirty jobs' changed steps — all of them, or just `job_ids`."""
+        with self._lock:
+            if job_ids is None:
+                dirty, self._dirty = self._dirty, set()
+            else:
+                dirty = self._dirty.intersection(job_ids)
+                self._dirty -= dirty
+            batch = [(jid, self._stores[jid], self._flushed[jid])
+                     for jid in dirty if jid in self._stores]
+
+        for job_id, store, since in batch:
+            version, steps = store.steps_since(since)
+            if not steps:
+                continue
+            try:
+                await job_repo.merge_progress(
+                    job_id, [s.model_dump(mode="json") for s in steps], version,
+                )
+                self.flushes += 1
+                with self._lock:
+                    if job_id in self._flushed:
+                        self._flushed[job_id] = max(self._flushed[job_id], version)
+                        self._written[job_id] = time.monotonic()
+            except Exception:
+                self.failures += 1
+                logger.exception("Progress flush failed for job %s", job_id)
+                with self._lock:
+                    if job_id in self._stores:
+                        self._dirty.add(job_id)  # retry next round
+
+        if job_ids is None:
+            await self._beat()
+
+    async def _beat(self) -> None:
+        cutoff = time.monotonic() - self.heartbeat
+        with self._lock:
+            quiet = [jid for jid, at in self._written.items() if at < cutoff]
+        for job_id in quiet:
+            try:
+                await job_repo.update(job_id, {"progress_updated_at": datetime.utcnow().isoformat()})
+                with self._lock:
+                    if job_id in self._written:
+                        self._written[job_id] = time.monotonic()
+            except Exception:
+                logger.exception("Heartbeat failed for job %s", job_id)
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._stores),
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+# Singleton
+progress_persister = ProgressPersister(
+    interval=settings.progress_flush_interval,
+    max_dirty=settings.progress_max_dirty,
+    heartbeat=settings.orphan_timeout / 3,
+)
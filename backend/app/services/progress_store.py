@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Callable, Optional
+
+from app.models import ProgressStep, StepMetrics, StepStatus
+
+
+class _Step:
+    __slots__ = ("key", "label", "status", "content", "metrics", "version", "marks", "replaced_at")
+
+    def __init__(self, step: ProgressStep) -> None:
+        self.key = step.key
+        self.label = step.label
+        self.status = step.status
+        self.content: Optional[str] = step.content
+        self.metrics: Optional[StepMetrics] = step.metrics
+        self.version = 0
+        # (version, content length) after each content change, for deltas
+        self.marks: list[tuple[int, int]] = []
+        # Last version at which content was rewritten rather than extended
+        self.replaced_at = 0
+
+
+class ProgressStore:
+    """Versioned progress for one running job.
+
+    Every change bumps a job-wide version and stamps the touched step with it.
+    Step content is treated as append-only: when new content extends the old
+    text only the length is recorded, so readers can ask for "changes since
+    version N" and receive just the appended tail. Updates touch a single
+    step under a lock — no copying of the step list.
+    """
+
+    def __init__(self, steps: list[ProgressStep],
+                 on_change: Callable[[dict], None] | None = None) -> None:
+        self._steps = {s.key: _Step(s) for s in steps}
+        self._order = [s.key for s in steps]
+        self._version = 0
+        self._lock = threading.Lock()
+        self._on_change = on_change
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def keys(self) -> list[str]:
+        return list(self._order)
+
+    def status_of(self, key: str) -> Optional[StepStatus]:
+        step = self._steps.get(key)
+        return step.status if step else None
+
+    def content_of(self, key: str) -> Optional[str]:
+        step = self._steps.get(key)
+        return step.content if step else None
+
+    def update(self, key: str, status: StepStatus, content: str | None = None) -> Optional[dict]:
+        """Apply a step change; returns the change as an event (None if no-op).
+
+        Events carry `offset` + `append` when the content grew, or the full
+        `content` when it was rewritten.
+        """
+        with self._lock:
+            step = self._steps.get(key)
+            if step is None:
+                return None
+            prev = step.content or ""
+            event: dict = {"key": key, "status": status.value}
+            content_changed = content is not None and content != prev
+            if content_changed:
+                if content.startswith(prev):
+                    event["offset"] = len(prev)
+                    event["append"] = content[len(prev):]
+                else:
+                    event["content"] = content
+            elif status == step.status:
+                return None
+
+            self._version += 1
+            step.version = self._version
+            step.status = status
+            if content_changed:
+                if "content" in event:
+                    step.replaced_at = self._version
+                step.content = content
+                step.marks.append((self._version, len(content)))
+            event["version"] = self._version
+
+        if self._on_change is not None:
+            self._on_change(event)
+        return event
+
+    def set_metrics(self, key: str, metrics: StepMetrics) -> Optional[dict]:
+        """Replace a step's tracing metrics; returns the change as an event."""
+        with self._lock:
+            step = self._steps.get(key)
+            if step is None:
+                return None
+            self._version += 1
+            step.version = self._version
+            step.metrics = metrics
+            event = {"key": key, "status": step.status.value,
+                     "metrics": metrics.model_dump(), "version": self._version}
+
+        if self._on_change is not None:
+            self._on_change(event)
+        return event
+
+    @staticmethod
+    def _model(s: _Step) -> ProgressStep:
+        return ProgressStep(key=s.key, label=s.label, status=s.status,
+                            content=s.content, metrics=s.metrics)
+
+    def snapshot(self) -> list[ProgressStep]:
+        with self._lock:
+            return [self._model(self._steps[k]) for k in self._order]
+
+    def steps_since(self, version: int) -> tuple[int, list[ProgressStep]]:
+        """(current version, full steps touched after `version`) — for persisting just those."""
+        with self._lock:
+            return self._version, [
+                self._model(s)
+                for s in (self._steps[k] for k in self._order)
+                if s.version > version
+            ]
+
+    def changes_since(self, version: int) -> list[dict]:
+        """Per-step changes after `version`, content reduced to the new tail."""
+        changes = []
+        with self._lock:
+            for key in self._order:
+                step = self._steps[key]
+                if step.version <= version:
+                    continue
+                change: dict = {
+                    "key": key,
+                    "status": step.status.value,
+                    "version": step.version,
+                }
+                text = step.content or ""
+                if step.replaced_at > version:
+                    change["content"] = text
+                else:
+                    i = bisect.bisect_right(step.marks, (version, float("inf")))
+                    offset = step.marks[i - 1][1] if i else 0
+                    if offset < len(text):
+                        change["offset"] = offset
+                        change["append"] = text[offset:]
+                if step.metrics is not None:
+                    change["metrics"] = step.metrics.model_dump()
+                changes.append(change)
+        return changes
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from app.config import settings
+
+
+@dataclass
+class ProgressEvent:
+    id: int
+    type: str  # "snapshot" | "job" | "step" | "end"
+    data: dict
+
+    def encode(self) -> str:
+        """Server-Sent Events wire format."""
+        payload = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+@dataclass
+class _Channel:
+    history: deque
+    seq: int = 0
+    closed: bool = False
+    end: Optional[ProgressEvent] = None
+    subscribers: set = field(default_factory=set)
+
+
+class ProgressBroker:
+    """Per-job fan-out of progress events to streaming subscribers.
+
+    Publishing is thread-safe (the graph runs in a worker thread); delivery
+    happens on the event loop. Each job keeps a bounded ring buffer of recent
+    events so a reconnecting client can resume from its Last-Event-ID.
+    """
+
+    def __init__(self, history: int, retain_closed: int = 256) -> None:
+        self._history = history
+        self._retain_closed = retain_closed
+        self._channels: OrderedDict[str, _Channel] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def open(self, job_id: str) -> None:
+        """Start a channel for a job. Must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            self._channels[job_id] = _Channel(history=deque(maxlen=self._history))
+
+    def publish(self, job_id: str, type: str, data: dict) -> None:
+        with self._lock:
+            ch = self._channels.get(job_id)
+            if ch is None or ch.closed:
+                return
+            ch.seq += 1
+            event = ProgressEvent(ch.seq, type, data)
+            ch.history.append(event)
+            subscribers = list(ch.subscribers)
+        self._deliver(subscribers, event)
+
+    def close(self, job_id: str, data: dict) -> None:
+        """Publish the terminal `end` event; subscribers stop after it."""
+        with self._lock:
+            ch = self._channels.get(job_id)
+            if ch is None or ch.closed:
+                return
+            ch.seq += 1
+            ch.end = ProgressEvent(ch.seq, "end", data)
+            ch.history.append(ch.end)
+            ch.closed = True
+            subscribers = list(ch.subscribers)
+            # Keep a few finished channels around for late resumes
+            self._channels.move_to_end(job_id)
+            closed = [k for k, c in self._channels.items() if c.closed]
+            for k in closed[:-self._retain_closed]:
+                del self._channels[k]
+        self._deliver(subscribers, ch.end)
+        self._deliver(subscribers, None)
+
+    def discard(self, job_id: str) -> None:
+        """Drop a job's channel without an `end` event (the run was interrupted).
+
+        Subscribers stop without being told the job ended; it will run again
+        here or on another worker.
+        """
+        with self._lock:
+            ch = self._channels.pop(job_id, None)
+            if ch is None or ch.closed:
+                return
+            subscribers = list(ch.subscribers)
+        self._deliver(subscribers, None)
+
+    def _deliver(self, subscribers: list, item: Optional[ProgressEvent]) -> None:
+        if not subscribers or self._loop is None:
+            return
+        for q in subscribers:
+            self._loop.call_soon_threadsafe(q.put_nowait, item)
+
+    def subscribe(self, job_id: str, last_event_id: int | None, keepalive: float = 15.0,
+                  ) -> tuple[int, bool, AsyncIterator[Optional[ProgressEvent]]] | None:
+        """Register a subscriber.
+
+        Returns (current seq, resumed, iterator) or None when the job has no
+        channel. The iterator yields None after `keepalive` idle seconds.
+        `resumed` is False when the client must start from a full
+        snapshot (first connect, or its Last-Event-ID fell out of the buffer).
+        """
+        q: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            ch = self._channels.get(job_id)
+            if ch is None:
+                return None
+            oldest = ch.history[0].id if ch.history else ch.seq + 1
+            resumed = (last_event_id is not None
+                       and oldest - 1 <= last_event_id <= ch.seq)
+            replay = [e for e in ch.history if resumed and e.id > last_event_id]
+            seq = ch.seq
+            closed = ch.closed
+            if closed and (not replay or replay[-1] is not ch.end):
+                # A finished job always ends the stream, even for a fresh connection
+                replay.append(ch.end)
+            if not closed:
+                ch.subscribers.add(q)
+
+        async def _iter() -> AsyncIterator[Optional[ProgressEvent]]:
+            try:
+                for e in replay:
+                    yield e
+                if closed:
+                    return
+                while True:
+                    try:
+                        item = await asyncio.wait_for(q.get(), keepalive)
+                    except asyncio.TimeoutError:
+                        yield None  # idle: caller sends a keep-alive comment
+                        continue
+                    if item is None:
+                        return
+                    yield item
+            finally:
+                with self._lock:
+                    ch.subscribers.discard(q)
+
+        return seq, resumed, _iter()
+
+
+# Singleton
+progress_broker = ProgressBroker(history=settings.progress_stream_history)
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from app.services import supabase_client as db
+from app.services.supabase_client import eq
+
+_SUMMARY_COLUMNS = (
+    "id, status, ticker, date, analysts, llm_provider, signal, "
+    "created_at, completed_at, error"
+)
+
+
+class JobRepository:
+    """analysis_jobs table."""
+
+    table = "analysis_jobs"
+
+    async def insert(self, row: dict) -> dict:
+        return (await db.insert(self.table, row))[0]
+
+    async def get(self, job_id: str, user_id: str | None = None) -> dict | None:
+        filters = {"id": eq(job_id)}
+        if user_id:
+            filters["user_id"] = eq(user_id)
+        rows = await db.select(self.table, filters=filters)
+        return rows[0] if rows else None
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: int,
+        after: tuple[str, str] | None = None,
+        *,
+        ticker: str | None = None,
+        status: str | None = None,
+        signal: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+    ) -> list[dict]:
+        """A page of a user's jobs, newest first, continuing after (created_at, id).
+
+        Keyset order matches idx_analysis_jobs_user_created (see 008 migration),
+        so every page is an index range scan however deep it is.
+        """
+        filters = {"user_id": eq(user_id)}
+        if after is not None:
+            created_at, job_id = after
+            # The plain bound gives the planner an index range to seek to
+            filters["created_at"] = f"lte.{created_at}"
+            filters["or"] = (f'(created_at.lt."{created_at}",'
+                             f'and(created_at.eq."{created_at}",id.lt."{job_id}"))')
+        if ticker:
+            filters["ticker"] = eq(ticker)
+        if status:
+            filters["status"] = eq(status)
+        if signal:
+            filters["signal"] = eq(signal)
+        if date_from or date_to:
+            bounds = [f"date.gte.{date_from}" if date_from else None,
+                      f"date.lte.{date_to}" if date_to else None]
+            filters["and"] = f"({','.join(b for b in bounds if b)})"
+        return await db.select(
+            self.table,
+            _SUMMARY_COLUMNS,
+            filters=filters,
+            order="created_at.desc,id.desc",
+            limit=limit,
+        )
+
+    async def update(self, job_id: str, values: dict) -> None:
+        await db.update(self.table, values, filters={"id": eq(job_id)}, returning=False)
+
+    async def merge_progress(self, job_id: str, steps: list[dict], version: int) -> None:
+        """Write only the given steps into the stored progress (see 003 migration)."""
+        await db.rpc("merge_job_progress", {
+            "p_job_id": job_id,
+            "p_steps": {s["key"]: s for s in steps},
+            "p_version": version,
+        })
+
+    async def find_completed(self, ticker: str, date: str, llm_provider: str) -> list[dict]:
+        """Completed analyses of a ticker/date, newest first (callers match the rest)."""
+        return await db.select(
+            self.table,
+            "analysts, max_debate_rounds, max_risk_discuss_rounds, llm_provider, "
+            "signal, result, progress",
+            filters={
+                "ticker": eq(ticker),
+                "date": eq(date),
+                "llm_provider": eq(llm_provider),
+                "status": eq("completed"),
+            },
+            order="completed_at.desc",
+            limit=10,
+        )
+
+    async def list_for_batch(self, batch_id: str) -> list[dict]:
+        return await db.select(
+            self.table,
+            _SUMMARY_COLUMNS,
+            filters={"batch_id": eq(batch_id)},
+            order="created_at.asc",
+        )
+
+    async def pending_window(self, limit: int) -> list[dict]:
+        """The `limit` oldest queued jobs with their owners, for the scheduler to choose from."""
+        return await db.select(
+            self.table,
+            "id, user_id, batch_id, created_at",
+            filters={"status": eq("pending")},
+            order="created_at.asc",
+            limit=limit,
+        )
+
+    async def count_active(self, user_id: str) -> int:
+        """A user's queued and running jobs, batch children included."""
+        return await db.count(self.table, filters={
+            "user_id": eq(user_id),
+            "status": "in.(pending,running)",
+        })
+
+    async def claim(self, job_id: str) -> bool:
+        """Atomically flip pending → running; False if another worker won."""
+        rows = await db.update(
+            self.table,
+            {"status": "running"},
+            filters={"id": eq(job_id), "status": eq("pending")},
+        )
+        return bool(rows)
+
+    async def count_pending(self) -> int:
+        return await db.count(self.table, filters={"status": eq("pending")})
+
+    async def list_stale_running(self, before: str) -> list[dict]:
+        """Running jobs whose progress hasn't been written since `before`."""
+        return await db.select(
+            self.table,
+            "id, user_id, batch_id, leader_id",
+            filters={
+                "status": eq("running"),
+                "or": f"(progress_updated_at.lt.{before},"
+                      f"and(progress_updated_at.is.null,created_at.lt.{before}))",
+            },
+        )
+
+    async def cancel(self, job_id: str, from_status: str) -> bool:
+        """Atomically flip `from_status` → cancelled; False if the job moved on."""
+        rows = await db.update(
+            self.table,
+            {"status": "cancelled", "completed_at": datetime.utcnow().isoformat()},
+            filters={"id": eq(job_id), "status": eq(from_status)},
+        )
+        return bool(rows)
+
+    async def statuses(self, job_ids: list[str]) -> list[dict]:
+        return await db.select(
+            self.table,
+            "id, status, completed_at",
+            filters={"id": f"in.({','.join(job_ids)})"},
+        )
+
+    async def requeue(self, job_id: str) -> bool:
+        """Atomically flip running → pending (progress is kept for the resume)."""
+        rows = await db.update(
+            self.table,
+            {"status": "pending"},
+            filters={"id": eq(job_id), "status": eq("running")},
+        )
+        return bool(rows)
+
+
+class BatchRepository:
+    """analysis_batches table."""
+
+    table = "analysis_batches"
+
+    async def insert(self, row: dict) -> dict:
+        return (await db.insert(self.table, row))[0]
+
+    async def get(self, batch_id: str, user_id: str | None = None) -> dict | None:
+        filters = {"id": eq(batch_id)}
+        if user_id:
+            filters["user_id"] = eq(user_id)
+        rows = await db.select(self.table, filters=filters)
+        return rows[0] if rows else None
+
+
+class ProfileRepository:
+    """profiles table."""
+
+    table = "profiles"
+
+    async def get(self, user_id: str) -> dict | None:
+        rows = await db.select(self.table, filters={"id": eq(user_id)})
+        return rows[0] if rows else None
+
+    async def update(self, user_id: str, values: dict) -> dict | None:
+        rows = await db.update(self.table, values, filters={"id": eq(user_id)})
+        return rows[0] if rows else None
+
+
+class CreditRepository:
+    """credit_transactions table."""
+
+    table = "credit_transactions"
+
+    async def list_for_user(self, user_id: str, limit: int = 50) -> list[dict]:
+        return await db.select(
+            self.table,
+            filters={"user_id": eq(user_id)},
+            order="created_at.desc",
+            limit=limit,
+        )
+
+
+class InsufficientCreditsError(Exception):
+    pass
+
+
+class JobNotResumableError(Exception):
+    pass
+
+
+class JobNotCancellableError(Exception):
+    pass
+
+
+class LedgerRepository:
+    """Job creation and refunds as single transactional RPCs (see 002_credit_ledger.sql)."""
+
+    async def create_job(self, row: dict, cost: int = 1) -> dict:
+        """Insert the job, append the ledger entry and debit the balance atomically."""
+        try:
+            return await db.rpc("create_analysis_job", {"p_job": row, "p_cost": cost})
+        except db.SupabaseError as e:
+            if "insufficient_credits" in e.message:
+                raise InsufficientCreditsError(row["user_id"]) from e
+            raise
+
+    async def refund(self, job_id: str, amount: int = 1) -> int | None:
+        """Credit a job's charge back; returns the new balance (None if nothing left to refund)."""
+        return await db.rpc("refund_analysis_job", {"p_job_id": job_id, "p_amount": amount})
+
+    async def resume_job(self, job_id: str, cost: int = 1) -> dict:
+        """Requeue a failed job and charge for the new attempt (see 004_job_resume.sql)."""
+        try:
+            return await db.rpc("resume_analysis_job", {"p_job_id": job_id, "p_cost": cost})
+        except db.SupabaseError as e:
+            if "insufficient_credits" in e.message:
+                raise InsufficientCreditsError(job_id) from e
+            if "not_resumable" in e.message:
+                raise JobNotResumableError(job_id) from e
+            raise
+
+
+class SqliteLedgerRepository:
+    """The ledger RPCs (002/004/007 migrations) on a local SQLite file.
+
+    Same interface and semantics as LedgerRepository, for exercising them
+    without Postgres. Each call is one `BEGIN IMMEDIATE` transaction on the
+    calling thread's own connection; the write lock it takes plays the part
+    of the profile row lock, so concurrent debits serialize.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            id TEXT PRIMARY KEY, credits INTEGER NOT NULL DEFAULT 5);
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id TEXT PRIMARY KEY, user_id TEXT NOT NULL, status TEXT NOT NULL,
+            row TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS credit_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+            amount INTEGER NOT NULL, reason TEXT NOT NULL, job_id TEXT,
+            created_at TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS credit_transactions_job_id ON credit_transactions (job_id);
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30,
+                                                      isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _transaction(self, fn, *args):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _debit(conn: sqlite3.Connection, user_id: str, cost: int, job_id: str) -> None:
+        cur = conn.execute("UPDATE profiles SET credits = credits - ? WHERE id = ? AND credits >= ?",
+                           (cost, user_id, cost))
+        if cur.rowcount != 1:
+            raise InsufficientCreditsError(user_id)
+        conn.execute("INSERT INTO credit_transactions (user_id, amount, reason, job_id, created_at)"
+                     " VALUES (?, ?, 'analysis', ?, ?)",
+                     (user_id, -cost, job_id, datetime.utcnow().isoformat()))
+
+    def _create_job(self, conn: sqlite3.Connection, row: dict, cost: int) -> dict:
+        self._debit(conn, row["user_id"], cost, row["id"])
+        job = {"status": "pending", **row}
+        conn.execute("INSERT INTO analysis_jobs (id, user_id, status, row) VALUES (?, ?, ?, ?)",
+                     (job["id"], job["user_id"], job["status"], json.dumps(job, default=str)))
+        return job
+
+    @staticmethod
+    def _refund(conn: sqlite3.Connection, job_id: str, amount: int) -> int | None:
+        found = conn.execute("SELECT user_id FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        if found is None:
+            raise KeyError(job_id)
+        user_id = found[0]
+        net = conn.execute("SELECT COALESCE(SUM(amount), 0) FROM credit_transactions"
+                           " WHERE job_id = ?", (job_id,)).fetchone()[0]
+        refund = min(amount, -net)
+        if refund <= 0:
+            return None
+        conn.execute("INSERT INTO credit_transactions (user_id, amount, reason, job_id, created_at)"
+                     " VALUES (?, ?, 'refund', ?, ?)",
+                     (user_id, refund, job_id, datetime.utcnow().isoformat()))
+        conn.execute("UPDATE profiles SET credits = credits + ? WHERE id = ?", (refund, user_id))
+        return conn.execute("SELECT credits FROM profiles WHERE id = ?", (user_id,)).fetchone()[0]
+
+    def _resume_job(self, conn: sqlite3.Connection, job_id: str, cost: int) -> dict:
+        found = conn.execute("SELECT user_id, row FROM analysis_jobs WHERE id = ?"
+                             " AND status IN ('failed', 'cancelled')", (job_id,)).fetchone()
+        if found is None:
+            raise JobNotResumableError(job_id)
+        job = {**json.loads(found[1]), "status": "pending", "error": None, "completed_at": None}
+        conn.execute("UPDATE analysis_jobs SET status = 'pending', row = ? WHERE id = ?",
+                     (json.dumps(job, default=str), job_id))
+        self._debit(conn, found[0], cost, job_id)
+        return job
+
+    async def create_job(self, row: dict, cost: int = 1) -> dict:
+        return await asyncio.to_thread(self._transaction, self._create_job, row, cost)
+
+    async def refund(self, job_id: str, amount: int = 1) -> int | None:
+        return await asyncio.to_thread(self._transaction, self._refund, job_id, amount)
+
+    async def resume_job(self, job_id: str, cost: int = 1) -> dict:
+        return await asyncio.to_thread(self._transaction, self._resume_job, job_id, cost)
+
+    # ── fixtures / inspection ─────────────────────────────────────────────
+
+    def add_profile(self, user_id: str, credits: int) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO profiles (id, credits) VALUES (?, ?)",
+                             (user_id, credits))
+
+    def set_status(self, job_id: str, status: str) -> None:
+        self._conn().execute("UPDATE analysis_jobs SET status = ? WHERE id = ?", (status, job_id))
+
+    def balance(self, user_id: str) -> int:
+        return self._conn().execute("SELECT credits FROM profiles WHERE id = ?",
+                                    (user_id,)).fetchone()[0]
+
+    def ledger_total(self, user_id: str) -> int:
+        return self._conn().execute("SELECT COALESCE(SUM(amount), 0) FROM credit_transactions"
+                                    " WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+# Singletons
+job_repo = JobRepository()
+batch_repo = BatchRepository()
+profile_repo = ProfileRepository()
+credit_repo = CreditRepository()
+ledger_repo = LedgerRepository()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+# Final decisions almost always state the call outright ("FINAL TRANSACTION
+# PROPOSAL: **BUY**", "our recommendation is to SELL", 「持有」…). Reading it
+# locally saves the extra LLM round trip process_signal() makes; the LLM is
+# only asked when the text is silent or contradicts itself.
+
+_WORDS = {
+    "buy": "BUY", "sell": "SELL", "hold": "HOLD",
+    "買入": "BUY", "买入": "BUY", "買進": "BUY", "买进": "BUY",
+    "賣出": "SELL", "卖出": "SELL",
+    "持有": "HOLD", "觀望": "HOLD", "观望": "HOLD",
+}
+# A word negated right before it ("do not buy", "avoid selling", 「不要買入」)
+# is not the decision. Look-behinds must be fixed-width, hence one per phrase.
+_NOT = "".join(f"(?<!{n})" for n in (
+    "(?i:not )", "(?i:not to )", "(?i:n't )", "(?i:never )", "(?i:no )",
+    "(?i:avoid )", "(?i:against )", "不", "別", "别", "勿", "不要", "不宜", "避免",
+))
+# English words must stand alone: not "buyback", "buy-side", "selling", and
+# not "hold off" / "buy back" / "sell off"
+_EN = r"(?<![A-Za-z-])(?:buy|sell|hold)(?![A-Za-z-])(?!\s+(?:off|back)\b)"
+_WORD = _NOT + r"(" + _EN + r"|買入|买入|買進|买进|賣出|卖出|持有|觀望|观望)"
+
+# Explicit statements of the decision, strongest first
+_EXPLICIT = [
+    re.compile(r"FINAL TRANSACTION PROPOSAL\s*[:：]\s*\W*" + _WORD, re.I),
+    re.compile(_NOT + r"\b(?:recommend(?:ation)?|decision|verdict|rating|signal|stance|final)\b"
+               r"[^.\n]{0,40}?" + _WORD, re.I),
+    re.compile(r"[「『“\"]\s*" + _WORD, re.I),
+    re.compile(_NOT + r"(?:建議|建议|決定|决定|決策|决策|結論|结论|評級|评级)[^。\n]{0,20}?" + _WORD, re.I),
+]
+# Bare upper-case BUY / SELL / HOLD anywhere in the text
+_SHOUTED = re.compile(_NOT + r"(?<![A-Za-z-])(BUY|SELL|HOLD)(?![A-Za-z-])(?!\s+(?i:off|back)\b)")
+
+
+def _normalize(word: str) -> str:
+    return _WORDS[word.lower()]
+
+
+def extract_signal(text: str) -> Optional[str]:
+    """BUY / SELL / HOLD stated in a final trade decision, or None if ambiguous."""
+    if not text:
+        return None
+    for pattern in _EXPLICIT:
+        found = {_normalize(m.group(1)) for m in pattern.finditer(text)}
+        if len(found) == 1:
+            return found.pop()
+        if found:
+            return None  # the text argues both ways — let the LLM read it
+    shouted = set(_SHOUTED.findall(text))
+    return shouted.pop() if len(shouted) == 1 else None
+
+
+class SignalExtractor:
+    """Local extraction with an LLM fallback, counting how often each path is taken."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallback = 0
+        self.local_seconds = 0.0
+        self.fallback_seconds = 0.0
+
+    def extract(self, text: str, fallback: Callable[[str], str]) -> str:
+        t0 = time.perf_counter()
+        signal = extract_signal(text)
+        if signal is not None:
+            with self._lock:
+                self.local += 1
+                self.local_seconds += time.perf_counter() - t0
+            return signal
+        signal = fallback(text)
+        with self._lock:
+            self.fallback += 1
+            self.fallback_seconds += time.perf_counter() - t0
+        return signal
+
+    def stats(self) -> dict:
+        with self._lock:
+            avg_fallback = self.fallback_seconds / self.fallback if self.fallback else None
+            return {
+                "local": self.local,
+                "fallback": self.fallback,
+                "local_seconds": round(self.local_seconds, 4),
+                "fallback_seconds": round(self.fallback_seconds, 3),
+                # Each local hit skipped one LLM call of roughly this cost
+                "estimated_seconds_saved": (round(avg_fallback * self.local, 3)
+                                            if avg_fallback is not None else None),
+            }
+
+
+# Singleton
+signal_extractor = SignalExtractor()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import base64
+import json
+import threading
+import time
+import zlib
+from typing import Any
+
+from app.models import AnalysisResult, ProgressStep
+
+# A finished job's progress repeats its result almost verbatim: the analyst
+# steps hold the reports, the debate steps the histories, the final step the
+# decision, and a debate's `current_response` is its `judge_decision`. Each
+# distinct long text is stored once in a string table and the whole record is
+# compressed — the repeats sit further apart than zlib's 32 KB window, so
+# deduplicating first is what makes the compression count.
+
+_FORMAT = 1
+_MIN_SHARED = 64  # shorter strings stay inline
+
+
+def _share(value: Any, strings: list[str], index: dict[str, int]) -> Any:
+    if isinstance(value, dict):
+        return {k: _share(v, strings, index) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_share(v, strings, index) for v in value]
+    if isinstance(value, str) and len(value) >= _MIN_SHARED:
+        i = index.get(value)
+        if i is None:
+            i = index[value] = len(strings)
+            strings.append(value)
+        return {"$": i}
+    return value
+
+
+def _resolve(value: Any, strings: list[str]) -> Any:
+    if isinstance(value, dict):
+        if value.keys() == {"$"}:
+            return strings[value["$"]]
+        return {k: _resolve(v, strings) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, strings) for v in value]
+    return value
+
+
+def is_packed(stored: Any) -> bool:
+    """True for a `result` column written by pack() (older rows hold the plain model)."""
+    return isinstance(stored, dict) and "format" in stored and "data" in stored
+
+
+class StorageCodec:
+    """Packs a finished job's result and progress into one compact `result` value.
+
+    The unpacked size behind the compression ratio costs a full extra
+    serialization, so only one pack in `sample_every` measures it.
+    """
+
+    def __init__(self, sample_every: int = 16) -> None:
+        self._lock = threading.Lock()
+        self.sample_every = max(1, sample_every)
+        self.packed = 0
+        self.unpacked = 0
+        self.sampled_raw_bytes = 0
+        self.sampled_stored_bytes = 0
+        self.stored_bytes = 0
+        self.pack_seconds = 0.0
+        self.unpack_seconds = 0.0
+
+    def pack(self, result: AnalysisResult, progress: list[ProgressStep] | None) -> dict:
+        t0 = time.perf_counter()
+        strings: list[str] = []
+        index: dict[str, int] = {}
+        body = {
+            "result": _share(result.model_dump(mode="json"), strings, index),
+            "progress": _share([s.model_dump(mode="json") for s in progress or []],
+                               strings, index),
+        }
+        raw = json.dumps({"strings": strings, **body}, ensure_ascii=False,
+                         separators=(",", ":")).encode()
+        data = base64.b64encode(zlib.compress(raw)).decode("ascii")
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.packed += 1
+            self.stored_bytes += len(data)
+            self.pack_seconds += elapsed
+            sample = self.packed % self.sample_every == 1 % self.sample_every
+        if sample:
+            plain = len(json.dumps({
+                "result": result.model_dump(mode="json"),
+                "progress": [s.model_dump(mode="json") for s in progress or []],
+            }, ensure_ascii=False).encode())
+            with self._lock:
+                self.sampled_raw_bytes += plain
+                self.sampled_stored_bytes += len(data)
+        return {"format": _FORMAT, "codec": "zlib", "data": data}
+
+    def unpack(self, stored: dict) -> tuple[AnalysisResult, list[ProgressStep]]:
+        t0 = time.perf_counter()
+        if stored.get("format") != _FORMAT or stored.get("codec") != "zlib":
+            raise ValueError(f"Unknown stored result format: {stored.get('format')}/{stored.get('codec')}")
+        body = json.loads(zlib.decompress(base64.b64decode(stored["data"])))
+        strings = body["strings"]
+        result = AnalysisResult(**_resolve(body["result"], strings))
+        progress = [ProgressStep(**p) for p in _resolve(body["progress"], strings)]
+        with self._lock:
+            self.unpacked += 1
+            self.unpack_seconds += time.perf_counter() - t0
+        return result, progress
+
+    def stats(self) -> dict:
+        with self._lock:
+            ratio = (self.sampled_raw_bytes / self.sampled_stored_bytes
+                     if self.sampled_stored_bytes else None)
+            return {
+                "packed": self.packed,
+                "unpacked": self.unpacked,
+                # Estimated from the sampled packs
+                "raw_bytes": round(self.stored_bytes * ratio) if ratio else None,
+                "stored_bytes": self.stored_bytes,
+                "ratio": round(ratio, 2) if ratio else None,
+                "avg_pack_ms": round(self.pack_seconds / self.packed * 1000, 3) if self.packed else None,
+                "avg_unpack_ms": (round(self.unpack_seconds / self.unpacked * 1000, 3)
+                                  if self.unpacked else None),
+            }
+
+
+# Singleton
+storage_codec = StorageCodec()
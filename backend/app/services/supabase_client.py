@@ -1,18 +1,132 @@
 from __future__ import annotations
 
-from supabase import create_client, Client
+from typing import Any
+
+import httpx
 
 from app.config import settings
 
-# Service-role client — bypasses RLS for backend operations
-_client: Client | None = None
+# Service-role HTTP client — bypasses RLS for backend operations.
+# One pooled AsyncClient per process: keep-alive connections to PostgREST/Auth
+# are reused across requests and the pool size bounds concurrent round trips.
+_client: httpx.AsyncClient | None = None
+
+
+class SupabaseError(Exception):
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(f"Supabase {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
 
 
-def get_supabase() -> Client:
+def get_http() -> httpx.AsyncClient:
     global _client
     if _client is None:
-        _client = create_client(
-            settings.supabase_url,
-            settings.supabase_service_role_key,
+        key = settings.supabase_service_role_key
+        _client = httpx.AsyncClient(
+            base_url=settings.supabase_url.rstrip("/"),
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            timeout=settings.supabase_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.supabase_pool_size,
+                max_keepalive_connections=settings.supabase_pool_size,
+                keepalive_expiry=settings.supabase_keepalive_expiry,
+            ),
         )
     return _client
+
+
+async def close_http() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def eq(value: Any) -> str:
+    """PostgREST equality filter value."""
+    return f"eq.{value}"
+
+
+def _check(resp: httpx.Response) -> httpx.Response:
+    if resp.is_error:
+        try:
+            message = resp.json().get("message", resp.text)
+        except ValueError:
+            message = resp.text
+        raise SupabaseError(resp.status_code, message)
+    return resp
+
+
+# ── PostgREST ────────────────────────────────────────────────────────────────
+
+async def select(
+    table: str,
+    columns: str = "*",
+    *,
+    filters: dict[str, str] | None = None,
+    order: str | None = None,
+    limit: int | None = None,
+) -> list[dict]:
+    params: dict[str, Any] = {"select": columns, **(filters or {})}
+    if order:
+        params["order"] = order
+    if limit is not None:
+        params["limit"] = limit
+    resp = await get_http().get(f"/rest/v1/{table}", params=params)
+    return _check(resp).json()
+
+
+async def count(table: str, *, filters: dict[str, str] | None = None) -> int:
+    resp = await get_http().head(
+        f"/rest/v1/{table}",
+        params={"select": "*", **(filters or {})},
+        headers={"Prefer": "count=exact"},
+    )
+    _check(resp)
+    # Content-Range: 0-24/3573  (or */0 when empty)
+    return int(resp.headers.get("content-range", "*/0").rsplit("/", 1)[1])
+
+
+async def insert(table: str, row: dict) -> list[dict]:
+    resp = await get_http().post(
+        f"/rest/v1/{table}",
+        json=row,
+        headers={"Prefer": "return=representation"},
+    )
+    return _check(resp).json()
+
+
+async def update(
+    table: str,
+    values: dict,
+    *,
+    filters: dict[str, str],
+    returning: bool = True,
+) -> list[dict]:
+    resp = await get_http().patch(
+        f"/rest/v1/{table}",
+        params=filters,
+        json=values,
+        headers={"Prefer": "return=representation" if returning else "return=minimal"},
+    )
+    _check(resp)
+    return resp.json() if returning else []
+
+
+async def rpc(fn: str, params: dict) -> Any:
+    resp = await get_http().post(f"/rest/v1/rpc/{fn}", json=params)
+    return _check(resp).json()
+
+
+# ── Auth ─────────────────────────────────────────────────────────────────────
+
+async def get_auth_user(token: str) -> dict | None:
+    """Resolve an access token via Supabase Auth; None if it is rejected."""
+    resp = await get_http().get(
+        "/auth/v1/user",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    if resp.status_code in (401, 403):
+        return None
+    return _check(resp).json()
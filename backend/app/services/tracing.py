@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.models import StepMetrics
+from app.services import metrics
+from app.services.progress_store import ProgressStore
+
+# USD per million (prompt, completion) tokens, matched by model-name prefix
+_PRICES = {
+    "gpt-4o-mini":      (0.15, 0.60),
+    "gpt-4o":           (2.50, 10.00),
+    "gpt-4.1-mini":     (0.40, 1.60),
+    "gpt-4.1":          (2.00, 8.00),
+    "o4-mini":          (1.10, 4.40),
+    "o3-mini":          (1.10, 4.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+
+# Graph node name fragments → progress step, most specific first
+_NODE_STEPS = [
+    ("risk judge",        "final_decision"),
+    ("bull",              "invest_debate"),
+    ("bear",              "invest_debate"),
+    ("research manager",  "research_manager"),
+    ("trader",            "trader"),
+    ("risky",             "risk_debate"),
+    ("aggressive",        "risk_debate"),
+    ("safe",              "risk_debate"),
+    ("conservative",      "risk_debate"),
+    ("neutral",           "risk_debate"),
+    ("market",            "market_analyst"),
+    ("social",            "social_analyst"),
+    ("news",              "news_analyst"),
+    ("fundamentals",      "fundamentals_analyst"),
+]
+
+
+def step_for_node(node: str) -> Optional[str]:
+    name = node.lower()
+    for fragment, step in _NODE_STEPS:
+        if fragment in name:
+            return step
+    return None
+
+
+def _price(model: str) -> tuple[float, float]:
+    for prefix in sorted(_PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            return _PRICES[prefix]
+    return 0.0, 0.0
+
+
+def _usage(response: Any) -> tuple[int, int]:
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    prompt = usage.get("prompt_tokens", 0) or 0
+    completion = usage.get("completion_tokens", 0) or 0
+    if not (prompt or completion):
+        for generations in getattr(response, "generations", []):
+            for gen in generations:
+                meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                prompt += meta.get("input_tokens", 0)
+                completion += meta.get("output_tokens", 0)
+    return prompt, completion
+
+
+class JobTracer(BaseCallbackHandler):
+    """Per-step wall time, LLM calls, tokens, cost, tool latency and retries.
+
+    Passed as a LangChain callback to every graph stream of a job. Events are
+    attributed to progress steps by their `langgraph_node`; each step's
+    totals are pushed into the ProgressStore when one of its nodes finishes,
+    so they stream with progress and are stored with the job.
+    """
+
+    raise_error = False
+
+    def __init__(self, progress: ProgressStore) -> None:
+        self._progress = progress
+        self._lock = threading.Lock()
+        self._steps: dict[str, StepMetrics] = {}
+        # run id → (step, started, node / model / tool name)
+        self._runs: dict[UUID, tuple[Optional[str], float, str]] = {}
+        self._builds: list[tuple[float, float]] = []  # (started, ended) per graph built
+        self._job_build = 0.0
+
+    def _metrics(self, step: str) -> StepMetrics:
+        found = self._steps.get(step)
+        if found is None:
+            found = self._steps[step] = StepMetrics()
+        return found
+
+    def _begin(self, run_id: UUID, metadata: Optional[dict], name: str) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            self._runs[run_id] = (step_for_node(node) if node else None, time.perf_counter(), name)
+
+    def _end(self, run_id: UUID) -> tuple[Optional[str], float, str] | None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        step, started, name = run
+        return step, time.perf_counter() - started, name
+
+    # ── graph nodes ───────────────────────────────────────────────────────
+
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id: UUID,
+                       metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:  # the node itself, not its inner chains
+            self._begin(run_id, metadata, node)
+
+    def _node_done(self, run_id: UUID, failed: bool) -> None:
+        run = self._end(run_id)
+        if run is None:
+            return
+        step, elapsed, node = run
+        metrics.node_latency.observe(elapsed, node)
+        if step is None:
+            return
+        with self._lock:
+            m = self._metrics(step)
+            m.wall_seconds = round(m.wall_seconds + elapsed, 3)
+            m.errors += failed
+            snapshot = m.model_copy()
+        self._progress.set_metrics(step, snapshot)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._node_done(run_id, failed=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._node_done(run_id, failed=True)
+
+    # ── LLM calls ─────────────────────────────────────────────────────────
+
+    def _llm_start(self, serialized: Any, run_id: UUID, metadata: Optional[dict],
+                   invocation_params: Optional[dict]) -> None:
+        params = invocation_params or {}
+        model = (params.get("model") or params.get("model_name")
+                 or ((serialized or {}).get("kwargs") or {}).get("model") or "unknown")
+        self._begin(run_id, metadata, str(model))
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID,
+                            metadata: Optional[dict] = None,
+                            invocation_params: Optional[dict] = None, **kwargs: Any) -> None:
+        self._llm_start(serialized, run_id, metadata, invocation_params)
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID,
+                     metadata: Optional[dict] = None,
+                     invocation_params: Optional[dict] = None, **kwargs: Any) -> None:
+        self._llm_start(serialized, run_id, metadata, invocation_params)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._end(run_id)
+        if run is None:
+            return
+        step, _, model = run
+        prompt, completion = _usage(response)
+        in_price, out_price = _price(model)
+        cost = (prompt * in_price + completion * out_price) / 1_000_000
+
+        metrics.llm_calls.inc(model)
+        metrics.llm_tokens.inc(model, "prompt", amount=prompt)
+        metrics.llm_tokens.inc(model, "completion", amount=completion)
+        metrics.llm_cost.inc(model, amount=cost)
+        if step is None:
+            return
+        with self._lock:
+            m = self._metrics(step)
+            m.llm_calls += 1
+            m.prompt_tokens += prompt
+            m.completion_tokens += completion
+            m.cost_usd = round(m.cost_usd + cost, 6)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._end(run_id)
+        if run is not None and run[0] is not None:
+            with self._lock:
+                self._metrics(run[0]).errors += 1
+
+    def on_retry(self, retry_state: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return
+            if run[0] is not None:
+                self._metrics(run[0]).retries += 1
+        metrics.llm_retries.inc(run[2])
+
+    # ── tools ─────────────────────────────────────────────────────────────
+
+    def on_tool_start(self, serialized: Any, input_str: str, *, run_id: UUID,
+                      metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._begin(run_id, metadata, str(name))
+
+    def _tool_done(self, run_id: UUID, failed: bool) -> None:
+        run = self._end(run_id)
+        if run is None:
+            return
+        step, elapsed, tool = run
+        metrics.tool_latency.observe(elapsed, tool)
+        if step is None:
+            return
+        with self._lock:
+            m = self._metrics(step)
+            m.tool_calls += 1
+            m.tool_seconds = round(m.tool_seconds + elapsed, 3)
+            m.errors += failed
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_done(run_id, failed=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_done(run_id, failed=True)
+
+    # ── graph construction ────────────────────────────────────────────────
+
+    def graph_built(self, step: Optional[str], seconds: float) -> None:
+        """Record building a graph instance as its own span, outside any node.
+
+        `step` is the analyst step a single-analyst graph was built for
+        (parallel mode), None for the job's main graph. Pool hits (0s) are
+        not recorded.
+        """
+        if not seconds:
+            return
+        ended = time.perf_counter()
+        metrics.graph_build.observe(seconds, "analyst" if step else "job")
+        with self._lock:
+            self._builds.append((ended - seconds, ended))
+            if step is None:
+                self._job_build += seconds
+                return
+            m = self._metrics(step)
+            m.build_seconds = round(m.build_seconds + seconds, 3)
+            snapshot = m.model_copy()
+        self._progress.set_metrics(step, snapshot)
+
+    def build_wall(self) -> float:
+        """Wall time during which at least one of the job's graphs was being
+        built; concurrent analyst builds count once."""
+        with self._lock:
+            spans = sorted(self._builds)
+        total = 0.0
+        end = float("-inf")
+        for started, ended in spans:
+            if ended > end:
+                total += ended - max(started, end)
+                end = ended
+        return total
+
+    # ── totals ────────────────────────────────────────────────────────────
+
+    def flush(self) -> StepMetrics:
+        """Push every step's final numbers into progress; returns the job total."""
+        with self._lock:
+            steps = {k: m.model_copy() for k, m in self._steps.items()}
+        total = StepMetrics(build_seconds=round(self._job_build, 3))
+        for key, m in steps.items():
+            self._progress.set_metrics(key, m)
+            for field in StepMetrics.model_fields:
+                setattr(total, field, getattr(total, field) + getattr(m, field))
+        return total
@@ -0,0 +1,103 @@
+# Load test without a database: python -m benchmarks.job_queue
+# A free-tier burst lands just before paid users start submitting; queue
+# waits are compared for a plain FIFO and for the plan-aware scheduler.
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+
+from app.config import settings
+from app.services.job_queue import JobScheduler
+
+RUN = 0.05  # seconds per simulated analysis
+WORKERS = 4
+
+
+class _MemoryStore:
+    def __init__(self) -> None:
+        self._jobs: dict[str, list] = {}  # job_id → [user_id, enqueued_at, claimed]
+
+    async def recover(self) -> None:
+        return None
+
+    async def enqueue(self, job_id: str, user_id: str, batch_id: str | None = None) -> None:
+        self._jobs[job_id] = [user_id, time.monotonic(), False]
+
+    async def candidates(self, limit: int) -> list[tuple[str, str, str | None, float]]:
+        now = time.monotonic()
+        queued = sorted((j for j in self._jobs.items() if not j[1][2]), key=lambda j: j[1][1])
+        return [(job_id, user_id, None, now - t) for job_id, (user_id, t, _) in queued[:limit]]
+
+    async def claim(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job[2]:
+            return False
+        job[2] = True
+        return True
+
+    async def complete(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+
+    async def depth(self) -> int:
+        return sum(not j[2] for j in self._jobs.values())
+
+
+async def _scenario(plan_aware: bool) -> dict[str, list[float]]:
+    users = {f"free-{i}": "free" for i in range(30)}
+    users.update({f"pro-{i}": "pro" for i in range(6)})
+    users.update({f"max-{i}": "pro_max" for i in range(3)})
+    if plan_aware:
+        scheduler = JobScheduler(WORKERS, RUN / 5, 200, settings.plan_weights,
+                                 settings.plan_max_share, settings.user_max_running,
+                                 settings.user_max_active)
+    else:  # everyone in one class, no caps: first come, first served
+        scheduler = JobScheduler(WORKERS, RUN / 5, 200, {}, {}, {"all": WORKERS}, {})
+    scheduler._store = _MemoryStore()
+    for user_id, plan in users.items():
+        scheduler._plans.set(user_id, plan if plan_aware else "all")
+
+    submitted: dict[str, tuple[str, float]] = {}
+    waits: dict[str, list[float]] = defaultdict(list)
+    done = asyncio.Event()
+
+    async def run(job_id: str) -> None:
+        plan, t = submitted[job_id]
+        waits[plan].append(time.monotonic() - t)
+        await asyncio.sleep(RUN)
+        if sum(map(len, waits.values())) == len(submitted):
+            done.set()
+
+    async def submit(user_id: str) -> None:
+        job_id = f"{user_id}/{len(submitted)}"
+        submitted[job_id] = (users[user_id], time.monotonic())
+        await scheduler.submit(job_id, user_id)
+
+    await scheduler.start(run)
+    for user_id, plan in users.items():  # the burst: two jobs per free account
+        if plan == "free":
+            await submit(user_id)
+            await submit(user_id)
+    for i in range(18):  # paid users trickle in while it drains
+        await asyncio.sleep(RUN / 2)
+        await submit([u for u, p in users.items() if p != "free"][i % 9])
+    await done.wait()
+    await scheduler.stop()
+    return waits
+
+
+def _report(name: str, waits: dict[str, list[float]]) -> None:
+    print(name)
+    for plan in ("free", "pro", "pro_max"):
+        w = sorted(waits.get(plan, []))
+        if w:
+            p95 = w[min(len(w) - 1, int(len(w) * 0.95))]
+            print(f"  {plan:>8}  n={len(w):<3} p50={statistics.median(w) / RUN:5.1f}"
+                  f"  p95={p95 / RUN:5.1f}  max={w[-1] / RUN:5.1f}  (× run time)")
+
+
+async def _main() -> None:
+    _report("FIFO", await _scenario(plan_aware=False))
+    _report("plan-aware", await _scenario(plan_aware=True))
+
+
+asyncio.run(_main())
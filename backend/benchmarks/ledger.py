@@ -0,0 +1,79 @@
+# Ledger debits on SQLite: python -m benchmarks.ledger
+# Concurrent submissions from one user through the single-transaction RPC,
+# against the old four-round-trip sequence it replaced. Correctness of the
+# RPCs themselves is covered by tests/test_ledger.py.
+import asyncio
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from app.services.repository import InsufficientCreditsError, SqliteLedgerRepository
+
+RTT = 0.005  # simulated PostgREST round trip
+SUBMISSIONS = 60
+CREDITS = 40
+
+
+def job_row(user_id: str) -> dict:
+    return {"id": uuid.uuid4().hex[:12], "user_id": user_id, "ticker": "NVDA",
+            "date": "2025-01-02", "created_at": datetime.utcnow().isoformat()}
+
+
+async def atomic_create(ledger: SqliteLedgerRepository, user_id: str) -> bool:
+    await asyncio.sleep(RTT)  # one RPC
+    try:
+        await ledger.create_job(job_row(user_id))
+        return True
+    except InsufficientCreditsError:
+        return False
+
+
+async def naive_create(ledger: SqliteLedgerRepository, user_id: str) -> bool:
+    # insert job → insert ledger row → read balance → write balance
+    def run(sql: str, args: tuple):
+        return ledger._conn().execute(sql, args).fetchone()
+
+    row = job_row(user_id)
+    await asyncio.sleep(RTT)
+    await asyncio.to_thread(run, "INSERT INTO analysis_jobs (id, user_id, status, row)"
+                            " VALUES (?, ?, 'pending', '{}')", (row["id"], user_id))
+    await asyncio.sleep(RTT)
+    await asyncio.to_thread(run, "INSERT INTO credit_transactions"
+                            " (user_id, amount, reason, job_id, created_at)"
+                            " VALUES (?, -1, 'analysis', ?, '')", (user_id, row["id"]))
+    await asyncio.sleep(RTT)
+    credits = (await asyncio.to_thread(run, "SELECT credits FROM profiles WHERE id = ?",
+                                       (user_id,)))[0]
+    await asyncio.sleep(RTT)
+    await asyncio.to_thread(run, "UPDATE profiles SET credits = ? WHERE id = ?",
+                            (credits - 1, user_id))
+    return True
+
+
+async def _main(path: str) -> None:
+    ledger = SqliteLedgerRepository(path)
+    print(f"{SUBMISSIONS} concurrent submissions, {CREDITS} credits:")
+
+    ledger.add_profile("u-atomic", CREDITS)
+    t0 = time.perf_counter()
+    created = sum(await asyncio.gather(*(atomic_create(ledger, "u-atomic")
+                                         for _ in range(SUBMISSIONS))))
+    atomic_s = time.perf_counter() - t0
+    atomic_debited = CREDITS - ledger.balance("u-atomic")
+
+    ledger.add_profile("u-naive", CREDITS)
+    t0 = time.perf_counter()
+    naive = sum(await asyncio.gather(*(naive_create(ledger, "u-naive")
+                                       for _ in range(SUBMISSIONS))))
+    naive_s = time.perf_counter() - t0
+    debited = CREDITS - ledger.balance("u-naive")
+    print(f"\n  {'':<22} {'wall':>8} {'jobs':>5} {'debited':>8}")
+    print(f"  {'one transaction':<22} {atomic_s * 1000:6.0f}ms {created:>5} {atomic_debited:>8}")
+    print(f"  {'four round trips':<22} {naive_s * 1000:6.0f}ms {naive:>5} {debited:>8}"
+          f"   ({naive - debited} debits lost, balance never checked)")
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    asyncio.run(_main(str(Path(tmp) / "ledger.db")))
@@ -0,0 +1,81 @@
+# History paging on a synthetic 100k-job table: python -m benchmarks.pagination
+# SQLite stands in for Postgres; the query shapes and the index are the same.
+import json
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.services.analysis_service import _row_to_summary
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.repository import _SUMMARY_COLUMNS
+
+conn = sqlite3.connect(":memory:")
+conn.row_factory = sqlite3.Row
+conn.execute(
+    "CREATE TABLE analysis_jobs (id TEXT PRIMARY KEY, user_id TEXT, status TEXT,"
+    " ticker TEXT, date TEXT, analysts TEXT, llm_provider TEXT, signal TEXT,"
+    " created_at TEXT, completed_at TEXT, error TEXT, result TEXT)"
+)
+rng = random.Random(7)
+heavy = "heavy-user"
+others = [f"user-{i}" for i in range(400)]
+start = datetime(2025, 1, 1)
+rows = []
+for n in range(100_000):
+    created = (start + timedelta(minutes=n * 3)).isoformat() + "+00:00"
+    rows.append((
+        str(uuid.uuid4()), heavy if n % 10 < 3 else rng.choice(others), "completed",
+        rng.choice(["AAPL", "NVDA", "TSLA", "2330.TW", "MSFT"]), created[:10],
+        '["market","news"]', "openai", rng.choice(["BUY", "SELL", "HOLD"]),
+        created, created, None, "x" * 2000,
+    ))
+conn.executemany("INSERT INTO analysis_jobs VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+conn.execute("CREATE INDEX idx_analysis_jobs_user_created"
+             " ON analysis_jobs(user_id, created_at DESC, id DESC)")
+total = conn.execute("SELECT COUNT(*) FROM analysis_jobs WHERE user_id = ?",
+                     (heavy,)).fetchone()[0]
+print(f"100000 jobs, {total} owned by the heavy user")
+
+
+def summaries(cursor: sqlite3.Cursor) -> int:
+    out = []
+    for r in cursor:
+        row = dict(r)
+        row["analysts"] = json.loads(row["analysts"])
+        out.append(_row_to_summary(row))
+    return len(out)
+
+
+def timed(label: str, fn, repeat: int = 20) -> None:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        n = fn()
+    print(f"  {label:<34} {n:>6} rows  {(time.perf_counter() - t0) / repeat * 1000:8.2f} ms")
+
+
+page = 50
+keyset = (f"SELECT {_SUMMARY_COLUMNS} FROM analysis_jobs WHERE user_id = ?"
+          " AND created_at <= ? AND (created_at < ? OR (created_at = ? AND id < ?))"
+          " ORDER BY created_at DESC, id DESC LIMIT ?")
+deep = conn.execute("SELECT created_at, id FROM analysis_jobs WHERE user_id = ?"
+                    " ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET 10000",
+                    (heavy,)).fetchone()
+cursor = decode_cursor(encode_cursor(deep[0], deep[1]))
+
+timed("before: whole history", lambda: summaries(conn.execute(
+    f"SELECT {_SUMMARY_COLUMNS} FROM analysis_jobs WHERE user_id = ?"
+    " ORDER BY created_at DESC", (heavy,))), repeat=3)
+timed("first page", lambda: summaries(conn.execute(
+    f"SELECT {_SUMMARY_COLUMNS} FROM analysis_jobs WHERE user_id = ?"
+    " ORDER BY created_at DESC, id DESC LIMIT ?", (heavy, page + 1))))
+timed("page after row 10000 (keyset)", lambda: summaries(conn.execute(
+    keyset, (heavy, cursor[0], cursor[0], cursor[0], cursor[1], page + 1))))
+timed("page after row 10000 (offset)", lambda: summaries(conn.execute(
+    f"SELECT {_SUMMARY_COLUMNS} FROM analysis_jobs WHERE user_id = ?"
+    " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET 10000", (heavy, page + 1))))
+timed("filtered page (ticker + signal)", lambda: summaries(conn.execute(
+    f"SELECT {_SUMMARY_COLUMNS} FROM analysis_jobs WHERE user_id = ? AND ticker = ?"
+    " AND signal = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+    (heavy, "NVDA", "BUY", page + 1))))
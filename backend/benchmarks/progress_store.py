@@ -0,0 +1,66 @@
+# Debate-heavy run, old vs new progress handling: python -m benchmarks.progress_store
+# "before" replays the replaced _update_step (copy every step on each
+# change) with a poller re-reading the whole list; "after" uses the store
+# with a poller asking only for changes since its last version.
+import time
+import tracemalloc
+
+from app.models import ProgressStep, StepStatus
+from app.services.progress_store import ProgressStore
+
+ROUNDS = 400  # debate turns
+TURN = "Bull: the margin expansion story still holds because ... " * 25  # ~1.5 KB
+POLL_EVERY = 4  # updates between client polls
+
+
+def steps() -> list[ProgressStep]:
+    keys = ["market_analyst", "social_analyst", "news_analyst", "fundamentals_analyst",
+            "invest_debate", "research_manager", "trader", "risk_debate", "final_decision"]
+    return [ProgressStep(key=k, label=k) for k in keys]
+
+
+def before() -> int:
+    progress = steps()
+    sent = 0
+    history = ""
+    for i in range(ROUNDS):
+        history += TURN
+        new = [s.model_copy() for s in progress]
+        for s in new:
+            if s.key == "invest_debate":
+                s.status = StepStatus.running
+                s.content = history
+        progress = new
+        if i % POLL_EVERY == 0:
+            sent += sum(len(s.model_dump_json()) for s in progress)
+    return sent
+
+
+def after() -> int:
+    store = ProgressStore(steps())
+    sent = 0
+    seen = 0
+    history = ""
+    for i in range(ROUNDS):
+        history += TURN
+        store.update("invest_debate", StepStatus.running, history)
+        if i % POLL_EVERY == 0:
+            changes = store.changes_since(seen)
+            seen = store.version
+            sent += sum(len(c.get("append") or c.get("content") or "") for c in changes)
+    return sent
+
+
+for name, fn in (("before (copy list)", before), ("after (ProgressStore)", after)):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    sent = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # CPU without tracemalloc's overhead
+    t0 = time.perf_counter()
+    fn()
+    cpu = time.perf_counter() - t0
+    print(f"{name:<22} {cpu * 1000:8.1f} ms  peak {peak / 1e6:6.1f} MB"
+          f"  polled {sent / 1e6:7.1f} MB  ({elapsed * 1000:.0f} ms traced)")
@@ -0,0 +1,18 @@
+# Replay stored decisions through the local signal parser and count how
+# many still need the LLM: python -m benchmarks.signal_replay eval_results/
+import json
+import sys
+from pathlib import Path
+
+from app.services.signal import extract_signal
+
+roots = [Path(p) for p in sys.argv[1:]] or [Path("eval_results")]
+total = resolved = 0
+for root in roots:
+    for path in sorted(root.rglob("full_states_log_*.json")):
+        for date, state in json.loads(path.read_text(encoding="utf-8")).items():
+            signal = extract_signal(state.get("final_trade_decision", ""))
+            total += 1
+            resolved += signal is not None
+            print(f"{path.parent.parent.name:>8} {date}  {signal or '(llm)'}")
+print(f"{resolved}/{total} decisions resolved locally")
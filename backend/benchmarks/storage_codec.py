@@ -0,0 +1,32 @@
+# Size and speed on stored decisions: python -m benchmarks.storage_codec eval_results/
+import json
+import sys
+from pathlib import Path
+
+from app.models import AnalystType
+from app.services.analysis_service import _build_progress, _detect_and_apply, _extract_result
+from app.services.progress_store import ProgressStore
+from app.services.storage_codec import StorageCodec
+
+roots = [Path(p) for p in sys.argv[1:]] or [Path("eval_results")]
+codec = StorageCodec(sample_every=1)
+rounds = 200
+for root in roots:
+    for path in sorted(root.rglob("full_states_log_*.json")):
+        for date, state in json.loads(path.read_text(encoding="utf-8")).items():
+            # The logs name the trader's output differently from the graph state
+            state.setdefault("trader_investment_plan", state.get("trader_investment_decision", ""))
+            result = _extract_result(state, "HOLD")
+            store = ProgressStore(_build_progress(list(AnalystType)))
+            _detect_and_apply(store, {}, state, set())
+            progress = store.snapshot()
+            for _ in range(rounds):
+                packed = codec.pack(result, progress)
+                assert codec.unpack(packed) == (result, progress)
+            print(f"{path.parent.parent.name:>8} {date}  "
+                  f"{codec.sampled_raw_bytes // codec.packed:>7} → {len(packed['data']):>6} bytes")
+stats = codec.stats()
+mb = codec.sampled_raw_bytes / 1e6
+print(f"ratio {stats['ratio']}x, pack {stats['avg_pack_ms']} ms "
+      f"({mb / codec.pack_seconds:.0f} MB/s), unpack {stats['avg_unpack_ms']} ms "
+      f"({mb / codec.unpack_seconds:.0f} MB/s)")
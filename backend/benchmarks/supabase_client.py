@@ -0,0 +1,89 @@
+# Concurrent job polling against a local stand-in for PostgREST that
+# answers after a fixed delay: python -m benchmarks.supabase_client
+# "before" is the old pattern — a synchronous client called straight from
+# async handlers; "after" is the pooled AsyncClient in app.services.supabase_client. Each poller
+# polls on a fixed schedule, so latency includes time spent waiting for a
+# blocked event loop.
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.config import settings
+from app.services.supabase_client import close_http, eq, select
+
+DELAY = 0.02  # seconds per PostgREST round trip
+POLLERS = 100
+INTERVAL = 1.0  # seconds between one poller's polls
+POLLS = 5
+body = json.dumps([{"id": "job-1", "status": "running", "progress": []}]).encode()
+
+
+class _PostgREST(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        time.sleep(DELAY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), _PostgREST)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+settings.supabase_url = f"http://127.0.0.1:{server.server_port}"
+settings.supabase_service_role_key = settings.supabase_service_role_key or "bench"
+filters = {"id": eq("job-1")}
+
+
+async def _poll(fetch) -> list[float]:
+    latencies: list[float] = []
+    start = time.perf_counter()
+
+    async def poller(n: int) -> None:
+        for i in range(POLLS):
+            due = start + i * INTERVAL + n * INTERVAL / POLLERS
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await fetch()
+            latencies.append(time.perf_counter() - due)
+
+    await asyncio.gather(*(poller(n) for n in range(POLLERS)))
+    return latencies
+
+
+async def _main() -> None:
+    sync_client = httpx.Client(base_url=settings.supabase_url)
+
+    async def before() -> None:
+        sync_client.get("/rest/v1/analysis_jobs",
+                        params={"select": "*", **filters}).raise_for_status()
+
+    async def after() -> None:
+        await select("analysis_jobs", filters=filters)
+
+    for name, fetch in (("before (sync client)", before), ("after (pooled async)", after)):
+        t0 = time.perf_counter()
+        latencies = sorted(await _poll(fetch))
+        elapsed = time.perf_counter() - t0
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:<22} p50 {statistics.median(latencies) * 1000:8.1f} ms"
+              f"  p99 {p99 * 1000:8.1f} ms  {len(latencies) / elapsed:6.0f} req/s")
+    sync_client.close()
+    await close_http()
+
+
+print(f"{POLLERS} pollers every {INTERVAL:g}s, {DELAY * 1000:.0f} ms per round trip, "
+      f"pool size {settings.supabase_pool_size}")
+asyncio.run(_main())
+server.shutdown()
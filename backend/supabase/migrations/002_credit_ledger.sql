@@ -0,0 +1,91 @@
+-- ============================================================================
+-- TradingAgents App — Atomic credit ledger
+-- ============================================================================
+-- Creating a job used to take four round trips (insert job, insert ledger
+-- row, read balance, write balance) with a racy read-modify-write on
+-- profiles.credits. These functions do the whole thing in one transaction;
+-- the conditional UPDATE takes the profile row lock, so concurrent
+-- submissions from the same user serialize instead of losing deductions.
+
+-- Create a job and charge for it. Raises 'insufficient_credits' (P0001)
+-- without side effects when the balance is too low.
+CREATE OR REPLACE FUNCTION public.create_analysis_job(p_job jsonb, p_cost integer DEFAULT 1)
+RETURNS public.analysis_jobs AS $$
+DECLARE
+    v_user uuid := (p_job->>'user_id')::uuid;
+    v_job  public.analysis_jobs;
+BEGIN
+    UPDATE public.profiles
+       SET credits = credits - p_cost
+     WHERE id = v_user
+       AND credits >= p_cost;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'insufficient_credits' USING ERRCODE = 'P0001';
+    END IF;
+
+    INSERT INTO public.analysis_jobs (
+        id, user_id, status, ticker, date, analysts,
+        max_debate_rounds, max_risk_discuss_rounds, llm_provider,
+        signal, result, progress, created_at, completed_at
+    ) VALUES (
+        p_job->>'id',
+        v_user,
+        COALESCE(p_job->>'status', 'pending'),
+        p_job->>'ticker',
+        p_job->>'date',
+        COALESCE(p_job->'analysts', '["market","social","news","fundamentals"]'::jsonb),
+        COALESCE((p_job->>'max_debate_rounds')::integer, 1),
+        COALESCE((p_job->>'max_risk_discuss_rounds')::integer, 1),
+        COALESCE(p_job->>'llm_provider', 'openai'),
+        p_job->>'signal',
+        p_job->'result',
+        p_job->'progress',
+        COALESCE((p_job->>'created_at')::timestamptz, now()),
+        (p_job->>'completed_at')::timestamptz
+    )
+    RETURNING * INTO v_job;
+
+    INSERT INTO public.credit_transactions (user_id, amount, reason, job_id)
+    VALUES (v_user, -p_cost, 'analysis', v_job.id);
+
+    RETURN v_job;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Refund a job's charge. Idempotent: a job is refunded at most once.
+-- Returns the new balance, or NULL if the job was already refunded.
+CREATE OR REPLACE FUNCTION public.refund_analysis_job(p_job_id text, p_amount integer DEFAULT 1)
+RETURNS integer AS $$
+DECLARE
+    v_user    uuid;
+    v_credits integer;
+BEGIN
+    SELECT user_id INTO v_user FROM public.analysis_jobs WHERE id = p_job_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'job_not_found' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM public.credit_transactions
+         WHERE job_id = p_job_id AND reason = 'refund'
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.credit_transactions (user_id, amount, reason, job_id)
+    VALUES (v_user, p_amount, 'refund', p_job_id);
+
+    UPDATE public.profiles
+       SET credits = credits + p_amount
+     WHERE id = v_user
+    RETURNING credits INTO v_credits;
+
+    RETURN v_credits;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Backend (service role) only
+REVOKE EXECUTE ON FUNCTION public.create_analysis_job(jsonb, integer) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.refund_analysis_job(text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_analysis_job(jsonb, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION public.refund_analysis_job(text, integer) TO service_role;
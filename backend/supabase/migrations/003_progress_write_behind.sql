@@ -0,0 +1,32 @@
+-- ============================================================================
+-- TradingAgents App — Write-behind progress persistence
+-- ============================================================================
+-- Running jobs flush their progress periodically (and on step completion)
+-- instead of only at start/end. Only the steps that changed are sent; this
+-- function merges them into the stored progress array by step key.
+
+ALTER TABLE public.analysis_jobs
+    ADD COLUMN progress_version    integer NOT NULL DEFAULT 0,
+    ADD COLUMN progress_updated_at timestamptz;
+
+CREATE OR REPLACE FUNCTION public.merge_job_progress(
+    p_job_id  text,
+    p_steps   jsonb,    -- {"<step key>": {key, label, status, content}, ...}
+    p_version integer
+)
+RETURNS void AS $$
+    UPDATE public.analysis_jobs
+       SET progress = (
+               SELECT jsonb_agg(COALESCE(p_steps -> (s.step ->> 'key'), s.step) ORDER BY s.ord)
+                 FROM jsonb_array_elements(progress) WITH ORDINALITY AS s(step, ord)
+           ),
+           progress_version    = p_version,
+           progress_updated_at = now()
+     WHERE id = p_job_id
+       AND status = 'running'
+       AND progress IS NOT NULL
+       AND progress_version < p_version;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+REVOKE EXECUTE ON FUNCTION public.merge_job_progress(text, jsonb, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.merge_job_progress(text, jsonb, integer) TO service_role;
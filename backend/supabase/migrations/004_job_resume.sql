@@ -0,0 +1,77 @@
+-- ============================================================================
+-- TradingAgents App — Resumable jobs
+-- ============================================================================
+-- Graph runs are checkpointed after every node, so a failed or orphaned job
+-- can continue from its last completed step instead of starting over.
+
+ALTER TABLE public.analysis_jobs
+    ADD COLUMN attempts integer NOT NULL DEFAULT 0;
+
+-- Refunds are now bounded by what a job was actually charged: a resumed job
+-- is charged again, so it may be refunded again if it fails again.
+CREATE OR REPLACE FUNCTION public.refund_analysis_job(p_job_id text, p_amount integer DEFAULT 1)
+RETURNS integer AS $$
+DECLARE
+    v_user    uuid;
+    v_net     integer;
+    v_refund  integer;
+    v_credits integer;
+BEGIN
+    SELECT user_id INTO v_user FROM public.analysis_jobs WHERE id = p_job_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'job_not_found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT COALESCE(SUM(amount), 0) INTO v_net
+      FROM public.credit_transactions
+     WHERE job_id = p_job_id;
+
+    v_refund := LEAST(p_amount, -v_net);
+    IF v_refund <= 0 THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.credit_transactions (user_id, amount, reason, job_id)
+    VALUES (v_user, v_refund, 'refund', p_job_id);
+
+    UPDATE public.profiles
+       SET credits = credits + v_refund
+     WHERE id = v_user
+    RETURNING credits INTO v_credits;
+
+    RETURN v_credits;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Put a failed job back in the queue and charge for the new attempt.
+CREATE OR REPLACE FUNCTION public.resume_analysis_job(p_job_id text, p_cost integer DEFAULT 1)
+RETURNS public.analysis_jobs AS $$
+DECLARE
+    v_job public.analysis_jobs;
+BEGIN
+    UPDATE public.analysis_jobs
+       SET status = 'pending', error = NULL, completed_at = NULL
+     WHERE id = p_job_id
+       AND status = 'failed'
+    RETURNING * INTO v_job;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'not_resumable' USING ERRCODE = 'P0001';
+    END IF;
+
+    UPDATE public.profiles
+       SET credits = credits - p_cost
+     WHERE id = v_job.user_id
+       AND credits >= p_cost;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'insufficient_credits' USING ERRCODE = 'P0001';
+    END IF;
+
+    INSERT INTO public.credit_transactions (user_id, amount, reason, job_id)
+    VALUES (v_job.user_id, -p_cost, 'analysis', p_job_id);
+
+    RETURN v_job;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+REVOKE EXECUTE ON FUNCTION public.resume_analysis_job(text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.resume_analysis_job(text, integer) TO service_role;
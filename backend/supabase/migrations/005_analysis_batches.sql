@@ -0,0 +1,76 @@
+-- ============================================================================
+-- TradingAgents App — Batch analysis
+-- ============================================================================
+-- A batch is a parent over one child analysis job per ticker. Children are
+-- ordinary analysis_jobs rows (charged, cached and stored as usual) tagged
+-- with batch_id. They go through the shared job queue like any other job,
+-- held to the batch's concurrency as well as the owner's running and active
+-- job limits.
+
+CREATE TABLE public.analysis_batches (
+    id          text PRIMARY KEY,
+    user_id     uuid NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    date        text NOT NULL,
+    tickers     jsonb NOT NULL,
+    concurrency integer NOT NULL DEFAULT 4,
+    created_at  timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX idx_analysis_batches_user_id ON public.analysis_batches(user_id);
+
+ALTER TABLE public.analysis_jobs
+    ADD COLUMN batch_id text REFERENCES public.analysis_batches(id) ON DELETE CASCADE;
+
+CREATE INDEX idx_analysis_jobs_batch_id ON public.analysis_jobs(batch_id)
+    WHERE batch_id IS NOT NULL;
+
+ALTER TABLE public.analysis_batches ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own batches"
+    ON public.analysis_batches FOR SELECT
+    USING (auth.uid() = user_id);
+
+-- create_analysis_job now carries batch_id through
+CREATE OR REPLACE FUNCTION public.create_analysis_job(p_job jsonb, p_cost integer DEFAULT 1)
+RETURNS public.analysis_jobs AS $$
+DECLARE
+    v_user uuid := (p_job->>'user_id')::uuid;
+    v_job  public.analysis_jobs;
+BEGIN
+    UPDATE public.profiles
+       SET credits = credits - p_cost
+     WHERE id = v_user
+       AND credits >= p_cost;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'insufficient_credits' USING ERRCODE = 'P0001';
+    END IF;
+
+    INSERT INTO public.analysis_jobs (
+        id, user_id, status, ticker, date, analysts,
+        max_debate_rounds, max_risk_discuss_rounds, llm_provider,
+        signal, result, progress, created_at, completed_at, batch_id
+    ) VALUES (
+        p_job->>'id',
+        v_user,
+        COALESCE(p_job->>'status', 'pending'),
+        p_job->>'ticker',
+        p_job->>'date',
+        COALESCE(p_job->'analysts', '["market","social","news","fundamentals"]'::jsonb),
+        COALESCE((p_job->>'max_debate_rounds')::integer, 1),
+        COALESCE((p_job->>'max_risk_discuss_rounds')::integer, 1),
+        COALESCE(p_job->>'llm_provider', 'openai'),
+        p_job->>'signal',
+        p_job->'result',
+        p_job->'progress',
+        COALESCE((p_job->>'created_at')::timestamptz, now()),
+        (p_job->>'completed_at')::timestamptz,
+        p_job->>'batch_id'
+    )
+    RETURNING * INTO v_job;
+
+    INSERT INTO public.credit_transactions (user_id, amount, reason, job_id)
+    VALUES (v_user, -p_cost, 'analysis', v_job.id);
+
+    RETURN v_job;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
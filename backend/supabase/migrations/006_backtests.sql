@@ -0,0 +1,14 @@
+-- ============================================================================
+-- TradingAgents App — Backtests
+-- ============================================================================
+-- A backtest is a batch over trading dates for one ticker: one child
+-- analysis job per date, evaluated together against realized prices.
+
+ALTER TABLE public.analysis_batches
+    ADD COLUMN kind   text NOT NULL DEFAULT 'watchlist' CHECK (kind IN ('watchlist', 'backtest')),
+    ADD COLUMN params jsonb,    -- backtest: start_date, end_date, step_days, horizon_days
+    ALTER COLUMN date DROP NOT NULL;
+
+-- Completed analyses of past dates are reused instead of re-run
+CREATE INDEX idx_analysis_jobs_reuse ON public.analysis_jobs(ticker, date)
+    WHERE status = 'completed';
@@ -0,0 +1,39 @@
+-- ============================================================================
+-- TradingAgents App — Job cancellation
+-- ============================================================================
+-- Users can cancel pending or running jobs. Cancelled jobs are refunded in
+-- full until their first step finishes and, like failed ones, can be resumed
+-- later.
+
+ALTER TABLE public.analysis_jobs DROP CONSTRAINT analysis_jobs_status_check;
+ALTER TABLE public.analysis_jobs ADD CONSTRAINT analysis_jobs_status_check
+    CHECK (status IN ('pending', 'running', 'completed', 'failed', 'cancelled'));
+
+CREATE OR REPLACE FUNCTION public.resume_analysis_job(p_job_id text, p_cost integer DEFAULT 1)
+RETURNS public.analysis_jobs AS $$
+DECLARE
+    v_job public.analysis_jobs;
+BEGIN
+    UPDATE public.analysis_jobs
+       SET status = 'pending', error = NULL, completed_at = NULL
+     WHERE id = p_job_id
+       AND status IN ('failed', 'cancelled')
+    RETURNING * INTO v_job;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'not_resumable' USING ERRCODE = 'P0001';
+    END IF;
+
+    UPDATE public.profiles
+       SET credits = credits - p_cost
+     WHERE id = v_job.user_id
+       AND credits >= p_cost;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'insufficient_credits' USING ERRCODE = 'P0001';
+    END IF;
+
+    INSERT INTO public.credit_transactions (user_id, amount, reason, job_id)
+    VALUES (v_job.user_id, -p_cost, 'analysis', p_job_id);
+
+    RETURN v_job;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,12 @@
+-- ============================================================================
+-- TradingAgents App — Paginated job history
+-- ============================================================================
+-- GET /api/analysis pages a user's jobs newest first by keyset on
+-- (created_at, id). This index serves every page as a range scan, however
+-- far back the cursor points; its user_id prefix also covers every lookup
+-- the single-column index served.
+
+CREATE INDEX idx_analysis_jobs_user_created
+    ON public.analysis_jobs(user_id, created_at DESC, id DESC);
+
+DROP INDEX IF EXISTS public.idx_analysis_jobs_user_id;
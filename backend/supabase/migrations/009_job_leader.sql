@@ -0,0 +1,10 @@
+-- ============================================================================
+-- TradingAgents App — Single-flight followers
+-- ============================================================================
+-- A job identical to one already running is attached to that run instead of
+-- starting its own. It is stored as `running` but writes no progress of its
+-- own, so the orphan sweep needs to know whose run it is waiting on: a
+-- follower is only orphaned once its leader is.
+
+ALTER TABLE public.analysis_jobs
+    ADD COLUMN leader_id text REFERENCES public.analysis_jobs(id) ON DELETE SET NULL;
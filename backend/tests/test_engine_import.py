@@ -0,0 +1,49 @@
+"""API startup stays cheap: importing app.main must not pull in the engine.
+
+The import runs in a fresh interpreter under -X importtime, so modules this
+test process already loaded don't hide anything.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+BUDGET = float(os.environ.get("IMPORT_BUDGET", "1.5"))  # seconds
+HEAVY = ("tradingagents", "langchain", "langchain_core", "langgraph", "chromadb",
+         "pandas", "yfinance", "stockstats")
+
+
+@pytest.fixture(scope="module")
+def timings() -> dict[str, int]:
+    """Cumulative import time in µs of every module `import app.main` loads."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    # "import time: self [us] | cumulative | imported package"
+    out: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        out[name.strip()] = int(cumulative)
+    return out
+
+
+def test_no_engine_modules_at_startup(timings: dict[str, int]) -> None:
+    loaded = sorted(n for n in timings if n.split(".")[0] in HEAVY)
+    assert not loaded, f"engine modules imported at startup: {', '.join(loaded[:10])}"
+
+
+def test_startup_within_budget(timings: dict[str, int]) -> None:
+    total = timings["app.main"] / 1e6
+    top = sorted((n for n in timings if "." not in n and n != "app"),
+                 key=timings.get, reverse=True)[:8]
+    slowest = ", ".join(f"{n} {timings[n] / 1e6:.3f}s" for n in top)
+    assert total <= BUDGET, f"import app.main took {total:.3f}s (budget {BUDGET:.3f}s): {slowest}"
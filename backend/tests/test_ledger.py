@@ -0,0 +1,77 @@
+"""Credit ledger semantics, on the SQLite port of the ledger RPCs."""
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.services.repository import (
+    InsufficientCreditsError,
+    JobNotResumableError,
+    SqliteLedgerRepository,
+)
+
+
+@pytest.fixture
+def ledger(tmp_path) -> SqliteLedgerRepository:
+    return SqliteLedgerRepository(str(tmp_path / "ledger.db"))
+
+
+def job_row(user_id: str) -> dict:
+    return {"id": uuid.uuid4().hex[:12], "user_id": user_id, "ticker": "NVDA",
+            "date": "2025-01-02", "created_at": datetime.utcnow().isoformat()}
+
+
+def test_concurrent_submissions_never_overdraw(ledger: SqliteLedgerRepository) -> None:
+    ledger.add_profile("u", 40)
+
+    async def submit() -> bool:
+        try:
+            await ledger.create_job(job_row("u"))
+            return True
+        except InsufficientCreditsError:
+            return False
+
+    async def burst() -> list[bool]:
+        return await asyncio.gather(*(submit() for _ in range(60)))
+
+    assert sum(asyncio.run(burst())) == 40
+    assert ledger.balance("u") == 0
+    assert ledger.ledger_total("u") == -40
+
+
+def test_refund_at_most_once(ledger: SqliteLedgerRepository) -> None:
+    ledger.add_profile("u", 1)
+    job = asyncio.run(ledger.create_job(job_row("u")))
+    assert asyncio.run(ledger.refund(job["id"])) == 1
+    assert asyncio.run(ledger.refund(job["id"])) is None
+    assert ledger.balance("u") == 1
+
+
+def test_resume_without_credits_leaves_job_failed(ledger: SqliteLedgerRepository) -> None:
+    ledger.add_profile("u", 1)
+    job = asyncio.run(ledger.create_job(job_row("u")))
+    ledger.set_status(job["id"], "failed")
+    with pytest.raises(InsufficientCreditsError):
+        asyncio.run(ledger.resume_job(job["id"]))
+    status = ledger._conn().execute("SELECT status FROM analysis_jobs WHERE id = ?",
+                                    (job["id"],)).fetchone()[0]
+    assert status == "failed"
+
+
+def test_resumed_job_can_be_refunded_again(ledger: SqliteLedgerRepository) -> None:
+    ledger.add_profile("u", 1)
+    job = asyncio.run(ledger.create_job(job_row("u")))
+    assert asyncio.run(ledger.refund(job["id"])) == 1
+    ledger.set_status(job["id"], "failed")
+    asyncio.run(ledger.resume_job(job["id"]))
+    assert asyncio.run(ledger.refund(job["id"])) == 1
+
+
+def test_only_failed_or_cancelled_jobs_resume(ledger: SqliteLedgerRepository) -> None:
+    ledger.add_profile("u", 2)
+    job = asyncio.run(ledger.create_job(job_row("u")))
+    with pytest.raises(JobNotResumableError):
+        asyncio.run(ledger.resume_job(job["id"]))
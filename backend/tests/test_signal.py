@@ -0,0 +1,36 @@
+"""extract_signal on known phrasings: explicit calls resolve locally,
+ambiguous ones (None) are left to the LLM."""
+from __future__ import annotations
+
+import pytest
+
+from app.services.signal import extract_signal
+
+CASES = [
+    ("FINAL TRANSACTION PROPOSAL: **BUY**", "BUY"),
+    ("FINAL TRANSACTION PROPOSAL: **HOLD**", "HOLD"),
+    ("After weighing both sides, our recommendation is to SELL the position.", "SELL"),
+    ("Rating: Hold. Valuation is stretched but momentum is intact.", "HOLD"),
+    ("Recommendation: BUY NVDA shares, staggered over four price levels.", "BUY"),
+    ("Our recommendation: Hold off on buying the dip for now; final: SELL", "SELL"),
+    ('The company announced a "buyback program" worth $10B.', None),
+    ("Management's buy-back and the sell-side consensus are both supportive.", None),
+    ("We would not buy at these levels; we recommend a reduced weight.", None),
+    ("The decision is: don't sell into weakness. FINAL TRANSACTION PROPOSAL: HOLD", "HOLD"),
+    ("Recommendation: avoid selling now, SELL only below the 200-day line.", "SELL"),
+    ("Bulls say BUY, bears say SELL.", None),
+    ("Decision: BUY. Risk desk disagrees and says the rating should be SELL.", None),
+    ("A sell off in tech could hit the name; our stance: HOLD.", "HOLD"),
+    ("結論：強烈建議採取「Sell（分階段減碼）」策略，並保留約 30% 的核心部位。", "SELL"),
+    ("這次「Sell」決策建立在過去錯失最佳出場點的經驗教訓之上。", "SELL"),
+    ("綜合以上分析，建議買入並長期持有核心部位。", "BUY"),
+    ("我們的決定是持有，等待財報公布。", "HOLD"),
+    ("不建議買入，決策：觀望。", "HOLD"),
+    ("建议不要卖出，结论：买入。", "BUY"),
+    ("", None),
+]
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_extract_signal(text: str, expected: str | None) -> None:
+    assert extract_signal(text) == expected